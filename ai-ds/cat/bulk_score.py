@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Bulk Offline Scoring
+Re-scores a JSON Lines export of cat health records (the CatHealthRecord
+documents HealthRecordsService stores, see health_records.py) in fixed-size
+chunks, writing one JSON result per record as it goes.
+
+Memory is bounded by the chunk size. After every chunk the output is flushed
+and a checkpoint (input byte offset, output size) is written atomically next
+to the output; rerunning the same command after a crash or kill truncates
+the output to the last checkpoint and resumes from there.
+
+Usage:
+  python bulk_score.py export.jsonl scores.jsonl
+  python bulk_score.py export.jsonl scores.jsonl --chunk-size 20000 --model new_model.pkl --dataset new.csv
+  python bulk_score.py export.jsonl scores.jsonl --restart    (ignore an existing checkpoint)
+
+Each output line: {"record_id", "pet_id", "model_version", "success", "status",
+"confidence_scores", ...} or the validation errors for rejected records.
+"""
+
+import os
+import json
+import time
+import argparse
+from pathlib import Path
+
+from ml_inference import load_model_assets, predict_batch
+from health_records import iter_export, flatten_cat_record, record_id, record_pet_id
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def checkpoint_path(output):
+    return Path(f"{output}.checkpoint.json")
+
+
+def load_checkpoint(output, input_path, version):
+    """Returns the checkpoint for this input/model, or None to start from scratch."""
+    path = checkpoint_path(output)
+    if not path.exists() or not Path(output).exists():
+        return None
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("input") != str(Path(input_path).resolve()) or checkpoint.get("model_version") != version:
+        raise SystemExit(f"❌ {path} belongs to a different input or model; use --restart to overwrite.")
+    return checkpoint
+
+
+def save_checkpoint(output, checkpoint):
+    path = checkpoint_path(output)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def score_chunk(docs, assets, version):
+    """Scores one chunk of export documents; returns (output lines, rejected count)."""
+    records = [flatten_cat_record(doc) if isinstance(doc, dict) else doc for doc in docs]
+    results = predict_batch(records, assets)
+    lines = []
+    for doc, result in zip(docs, results):
+        if isinstance(doc, dict):
+            meta = {"record_id": record_id(doc), "pet_id": record_pet_id(doc)}
+        else:
+            meta = {"record_id": None, "pet_id": None}
+        lines.append(json.dumps({**meta, "model_version": version, **result}) + "\n")
+    return lines, sum(not result["success"] for result in results)
+
+
+def bulk_score(input_path, output, assets, version, chunk_size=DEFAULT_CHUNK_SIZE, restart=False):
+    """Scores input_path into output, resuming from its checkpoint; returns the final checkpoint."""
+    checkpoint = None if restart else load_checkpoint(output, input_path, version)
+    if checkpoint is None:
+        checkpoint = {"input": str(Path(input_path).resolve()), "model_version": version,
+                      "input_offset": 0, "output_size": 0, "records": 0, "failed": 0, "done": False}
+    elif checkpoint["done"]:
+        print(f"Already complete: {checkpoint['records']} records in {output}")
+        return checkpoint
+    else:
+        print(f"Resuming at byte {checkpoint['input_offset']} ({checkpoint['records']} records scored)")
+
+    start = time.perf_counter()
+    scored_here = 0
+    with open(output, "r+" if checkpoint["output_size"] else "w") as out:
+        # Drop anything written after the last checkpoint
+        out.truncate(checkpoint["output_size"])
+        out.seek(checkpoint["output_size"])
+
+        def flush_chunk(docs, end_offset):
+            nonlocal scored_here
+            lines, failed = score_chunk(docs, assets, version)
+            out.writelines(lines)
+            out.flush()
+            os.fsync(out.fileno())
+            checkpoint.update({
+                "input_offset": end_offset,
+                "output_size": out.tell(),
+                "records": checkpoint["records"] + len(lines),
+                "failed": checkpoint["failed"] + failed,
+            })
+            save_checkpoint(output, checkpoint)
+            scored_here += len(lines)
+            rate = scored_here / (time.perf_counter() - start)
+            print(f"  {checkpoint['records']} records scored ({rate:.0f} records/s)", flush=True)
+
+        docs, end_offset = [], checkpoint["input_offset"]
+        for end_offset, doc in iter_export(input_path, checkpoint["input_offset"]):
+            docs.append(doc)
+            if len(docs) >= chunk_size:
+                flush_chunk(docs, end_offset)
+                docs = []
+        if docs:
+            flush_chunk(docs, end_offset)
+
+    checkpoint["done"] = True
+    save_checkpoint(output, checkpoint)
+    return checkpoint
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score an exported set of cat health records in resumable chunks.")
+    parser.add_argument("export", help="JSON Lines export of CatHealthRecord documents")
+    parser.add_argument("output", help="JSON Lines results file")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--model", default=None, help="Pickled model (default: the deployed cat model)")
+    parser.add_argument("--dataset", default=None, help="Training CSV used to reconstruct columns for --model")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    assets = load_model_assets(args.model, args.dataset)
+    version = assets["version"]
+    print(f"Scoring {args.export} with {version} ...")
+
+    checkpoint = bulk_score(args.export, args.output, assets, version, args.chunk_size, args.restart)
+    print(f"\n✅ {checkpoint['records']} records scored ({checkpoint['failed']} rejected) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
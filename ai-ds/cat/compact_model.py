@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Compact Model Format
+Converts the pickled XGBClassifier into a small, numpy-only representation
+for low-memory inference workers.
+
+Every split threshold is replaced by its index in the sorted list of
+thresholds used for that feature. Inputs are binned once per record
+(uint8, or uint16 if a feature has more than 254 distinct thresholds), and
+tree traversal then only compares small integers held in flat node arrays.
+Loading the result needs numpy alone, so xgboost is never imported.
+
+Usage:
+  python compact_model.py                     # build from MODEL_FILE
+  python compact_model.py --model other.pkl --output other.compact.npz
+  python compact_model.py --model build/model.pkl --data build/combined.csv
+
+Build writes <output> plus a parity report (<output>.parity.json) that
+compares probabilities and accuracy against the original model on the
+training dataset. The build fails if predicted classes disagree.
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+SCRIPT_DIR = Path(__file__).parent
+DEFAULT_MODEL_FILE = SCRIPT_DIR / "cat_health_model_20251127.pkl"
+
+MISSING_BIN_UINT8 = np.iinfo(np.uint8).max
+MISSING_BIN_UINT16 = np.iinfo(np.uint16).max
+
+# Maximum absolute probability difference accepted by the parity check
+PARITY_TOLERANCE = 1e-5
+
+# Records traversed per block (bounds the n x trees node-index matrix)
+PREDICT_BLOCK_SIZE = 4096
+
+
+class CompactModel:
+    """Numpy-only gradient boosted tree ensemble over binned inputs."""
+
+    def __init__(self, arrays, metadata):
+        self.feature_names = metadata["feature_names"]
+        self.classes = metadata["classes"]
+        self.categorical_levels = metadata.get("categorical_levels", {})
+        self.source_model = metadata.get("source_model")
+        self.num_class = len(self.classes)
+
+        self.thresholds = arrays["thresholds"]
+        self.threshold_offsets = arrays["threshold_offsets"]
+        self.node_feature = arrays["node_feature"]
+        self.node_bin = arrays["node_bin"]
+        self.node_left = arrays["node_left"]
+        self.node_right = arrays["node_right"]
+        self.node_default_left = arrays["node_default_left"]
+        self.node_value = arrays["node_value"]
+        self.tree_root = arrays["tree_root"]
+        self.tree_class = arrays["tree_class"]
+        self.base_margin = arrays["base_margin"]
+        self.max_depth = int(arrays["max_depth"])
+
+        self.is_leaf = self.node_left < 0
+        self.bin_dtype = self.node_bin.dtype
+        self.missing_bin = MISSING_BIN_UINT8 if self.bin_dtype == np.uint8 else MISSING_BIN_UINT16
+
+        # Tree -> class one-hot, used to sum leaf values per class with one matmul
+        self._class_matrix = np.zeros((len(self.tree_root), self.num_class), dtype=np.float32)
+        self._class_matrix[np.arange(len(self.tree_root)), self.tree_class] = 1.0
+
+    @property
+    def nbytes(self):
+        """Approximate resident size of the model arrays."""
+        return sum(a.nbytes for a in (
+            self.thresholds, self.threshold_offsets, self.node_feature, self.node_bin,
+            self.node_left, self.node_right, self.node_default_left, self.node_value,
+            self.tree_root, self.tree_class, self.base_margin, self._class_matrix,
+        ))
+
+    def bin_inputs(self, X):
+        """Maps raw feature values to per-feature threshold bin indices."""
+        X = np.asarray(X, dtype=np.float32)
+        binned = np.empty(X.shape, dtype=self.bin_dtype)
+        for j in range(X.shape[1]):
+            lo, hi = self.threshold_offsets[j], self.threshold_offsets[j + 1]
+            column = X[:, j]
+            binned[:, j] = np.searchsorted(self.thresholds[lo:hi], column, side='right')
+            binned[np.isnan(column), j] = self.missing_bin
+        return binned
+
+    def predict_margin(self, X):
+        """Returns raw (pre-softmax) margins, shape (n_records, n_classes)."""
+        binned = self.bin_inputs(X)
+        margins = np.empty((len(binned), self.num_class), dtype=np.float32)
+        for start in range(0, len(binned), PREDICT_BLOCK_SIZE):
+            block = binned[start:start + PREDICT_BLOCK_SIZE]
+            margins[start:start + len(block)] = self._traverse(block) @ self._class_matrix
+        return margins + self.base_margin
+
+    def _traverse(self, binned):
+        """Walks every tree for every record; returns leaf values (n_records, n_trees)."""
+        rows = np.arange(len(binned))[:, None]
+        node = np.broadcast_to(self.tree_root, (len(binned), len(self.tree_root))).copy()
+        for _ in range(self.max_depth):
+            leaf = self.is_leaf[node]
+            if leaf.all():
+                break
+            value_bin = binned[rows, self.node_feature[node]]
+            go_left = np.where(value_bin == self.missing_bin,
+                               self.node_default_left[node],
+                               value_bin <= self.node_bin[node])
+            next_node = np.where(go_left, self.node_left[node], self.node_right[node])
+            node = np.where(leaf, node, next_node)
+        return self.node_value[node]
+
+    def predict_proba(self, X):
+        """Softmax class probabilities, matching XGBClassifier.predict_proba."""
+        if hasattr(X, "columns"):
+            X = X[self.feature_names].to_numpy(dtype=np.float32)
+        margins = self.predict_margin(X)
+        margins -= margins.max(axis=1, keepdims=True)
+        exp = np.exp(margins)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        return self.predict_proba(X).argmax(axis=1)
+
+    def save(self, path):
+        metadata = {
+            "feature_names": self.feature_names,
+            "classes": self.classes,
+            "categorical_levels": self.categorical_levels,
+            "source_model": self.source_model,
+        }
+        np.savez(
+            path,
+            metadata=np.frombuffer(json.dumps(metadata).encode(), dtype=np.uint8),
+            thresholds=self.thresholds,
+            threshold_offsets=self.threshold_offsets,
+            node_feature=self.node_feature,
+            node_bin=self.node_bin,
+            node_left=self.node_left,
+            node_right=self.node_right,
+            node_default_left=self.node_default_left,
+            node_value=self.node_value,
+            tree_root=self.tree_root,
+            tree_class=self.tree_class,
+            base_margin=self.base_margin,
+            max_depth=np.int32(self.max_depth),
+        )
+
+
+def load_compact_model(path):
+    """Loads a model written by CompactModel.save."""
+    with np.load(path) as data:
+        arrays = {key: data[key] for key in data.files}
+    metadata = json.loads(arrays.pop("metadata").tobytes().decode())
+    return CompactModel(arrays, metadata)
+
+
+def _tree_depth(left, right):
+    """Depth (edges from root to deepest leaf) of one tree in xgboost array form."""
+    depth = np.zeros(len(left), dtype=np.int32)
+    for node in range(len(left)):  # children always have larger ids than their parent
+        if left[node] >= 0:
+            depth[left[node]] = depth[node] + 1
+            depth[right[node]] = depth[node] + 1
+    return int(depth.max())
+
+
+def build_compact_model(xgb_model, classes, categorical_levels=None, source_model=None):
+    """Converts a fitted XGBClassifier into a CompactModel.
+
+    The base margin is left at zero here; calibrate_base_margin sets it from
+    the booster's own margins.
+    """
+    booster = xgb_model.get_booster()
+    feature_names = list(booster.feature_names)
+    raw = json.loads(booster.save_raw('json'))
+    trees = raw['learner']['gradient_booster']['model']['trees']
+    tree_info = raw['learner']['gradient_booster']['model']['tree_info']
+
+    # 1. Collect the distinct thresholds used for each feature
+    per_feature = [set() for _ in feature_names]
+    for tree in trees:
+        left = tree['left_children']
+        for node, feature in enumerate(tree['split_indices']):
+            if left[node] >= 0:
+                per_feature[feature].add(np.float32(tree['split_conditions'][node]))
+    sorted_thresholds = [np.array(sorted(t), dtype=np.float32) for t in per_feature]
+
+    max_thresholds = max(len(t) for t in sorted_thresholds)
+    bin_dtype = np.uint8 if max_thresholds < MISSING_BIN_UINT8 else np.uint16
+
+    threshold_offsets = np.zeros(len(feature_names) + 1, dtype=np.int32)
+    threshold_offsets[1:] = np.cumsum([len(t) for t in sorted_thresholds])
+    thresholds = np.concatenate(sorted_thresholds) if max_thresholds else np.zeros(0, dtype=np.float32)
+
+    # 2. Flatten all trees into shared node arrays
+    node_feature, node_bin, node_left, node_right, node_default_left, node_value = [], [], [], [], [], []
+    tree_root = []
+    max_depth = 0
+    offset = 0
+    for tree in trees:
+        left = np.asarray(tree['left_children'], dtype=np.int32)
+        right = np.asarray(tree['right_children'], dtype=np.int32)
+        features = np.asarray(tree['split_indices'], dtype=np.int32)
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        is_leaf = left < 0
+
+        bins = np.zeros(len(left), dtype=np.int64)
+        for node in np.flatnonzero(~is_leaf):
+            # x < threshold  <=>  bin(x) <= index of threshold
+            bins[node] = np.searchsorted(sorted_thresholds[features[node]], conditions[node])
+
+        tree_root.append(offset)
+        node_feature.append(np.where(is_leaf, 0, features))
+        node_bin.append(bins)
+        node_left.append(np.where(is_leaf, -1, left + offset))
+        node_right.append(np.where(is_leaf, -1, right + offset))
+        node_default_left.append(np.asarray(tree['default_left'], dtype=bool))
+        node_value.append(np.where(is_leaf, conditions, 0.0))
+        max_depth = max(max_depth, _tree_depth(left, right))
+        offset += len(left)
+
+    arrays = {
+        "thresholds": thresholds,
+        "threshold_offsets": threshold_offsets,
+        "node_feature": np.concatenate(node_feature).astype(np.uint16),
+        "node_bin": np.concatenate(node_bin).astype(bin_dtype),
+        "node_left": np.concatenate(node_left).astype(np.int32),
+        "node_right": np.concatenate(node_right).astype(np.int32),
+        "node_default_left": np.concatenate(node_default_left),
+        "node_value": np.concatenate(node_value).astype(np.float32),
+        "tree_root": np.asarray(tree_root, dtype=np.int32),
+        "tree_class": np.asarray(tree_info, dtype=np.uint8),
+        "base_margin": np.zeros(len(classes), dtype=np.float32),
+        "max_depth": max_depth,
+    }
+    metadata = {
+        "feature_names": feature_names,
+        "classes": list(classes),
+        "categorical_levels": categorical_levels or {},
+        "source_model": source_model,
+    }
+    return CompactModel(arrays, metadata)
+
+
+def calibrate_base_margin(compact, xgb_model, X):
+    """Sets the compact model's base margin from the booster's output margins.
+
+    X is the encoded feature DataFrame.
+
+    Returns the spread (max - min) of the per-record offsets, which should be
+    ~0 if the trees were converted exactly.
+    """
+    from xgboost import DMatrix
+
+    compact.base_margin = np.zeros(compact.num_class, dtype=np.float32)
+    booster_margin = xgb_model.get_booster().predict(DMatrix(X), output_margin=True)
+    offsets = booster_margin - compact.predict_margin(X[compact.feature_names].to_numpy(dtype=np.float32))
+    compact.base_margin = offsets.mean(axis=0).astype(np.float32)
+    return float((offsets.max(axis=0) - offsets.min(axis=0)).max())
+
+
+def parity_report(compact, xgb_model, X, y_true, classes, model_file, compact_file, base_margin_spread):
+    """Compares the compact model against the original on (X, y_true), X being a DataFrame."""
+    start = time.perf_counter()
+    original_probs = xgb_model.predict_proba(X)
+    original_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compact_probs = compact.predict_proba(X)
+    compact_seconds = time.perf_counter() - start
+
+    original_pred = original_probs.argmax(axis=1)
+    compact_pred = compact_probs.argmax(axis=1)
+    abs_diff = np.abs(original_probs - compact_probs)
+
+    return {
+        "source_model": Path(model_file).name,
+        "compact_model": Path(compact_file).name,
+        "records": int(len(X)),
+        "classes": list(classes),
+        "max_abs_probability_diff": float(abs_diff.max()),
+        "mean_abs_probability_diff": float(abs_diff.mean()),
+        "class_agreement": float((original_pred == compact_pred).mean()),
+        "original_accuracy": float((original_pred == y_true).mean()),
+        "compact_accuracy": float((compact_pred == y_true).mean()),
+        "base_margin_spread": base_margin_spread,
+        "original_file_bytes": Path(model_file).stat().st_size,
+        "compact_file_bytes": Path(compact_file).stat().st_size,
+        "compact_array_bytes": int(compact.nbytes),
+        "bin_dtype": str(compact.bin_dtype),
+        "num_trees": int(len(compact.tree_root)),
+        "num_nodes": int(len(compact.node_left)),
+        "max_depth": compact.max_depth,
+        "original_predict_seconds": original_seconds,
+        "compact_predict_seconds": compact_seconds,
+        "verified": bool((original_pred == compact_pred).all()
+                         and abs_diff.max() <= PARITY_TOLERANCE),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a compact numpy-only model from the pickled XGBClassifier.")
+    parser.add_argument("--model", default=str(DEFAULT_MODEL_FILE), help="Pickled XGBClassifier")
+    parser.add_argument("--output", default=None, help="Output .npz (default: <model>.compact.npz)")
+    parser.add_argument("--data", default=None, help="Training CSV of --model (default: the bundled dataset)")
+    args = parser.parse_args()
+
+    import pandas as pd
+    from ml_inference import DATASET_FILE, load_model_assets, preprocess_and_align_data
+
+    model_file = Path(args.model)
+    compact_file = Path(args.output) if args.output else model_file.with_suffix(".compact.npz")
+    report_file = Path(str(compact_file) + ".parity.json")
+
+    dataset_file = Path(args.data) if args.data else DATASET_FILE
+    assets = load_model_assets(model_file, dataset_file)
+    xgb_model = assets["model"]
+
+    df = pd.read_csv(dataset_file)
+    X = preprocess_and_align_data(df.drop(columns='health_status'), assets["training_cols"]).astype(np.float32)
+    y_true = np.searchsorted(assets["classes"], df['health_status'].to_numpy())
+
+    compact = build_compact_model(xgb_model, assets["classes"], assets["categorical_levels"], model_file.name)
+    spread = calibrate_base_margin(compact, xgb_model, X)
+    compact.save(compact_file)
+
+    report = parity_report(compact, xgb_model, X, y_true, assets["classes"], model_file, compact_file, spread)
+    with open(report_file, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(report, indent=2))
+    if not report["verified"]:
+        print(f"Parity check FAILED; see {report_file}", file=sys.stderr)
+        sys.exit(1)
+    print(f"\nCompact model written to {compact_file}")
+
+
+if __name__ == "__main__":
+    main()
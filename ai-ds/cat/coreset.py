@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Stratified Coreset Sampling
+Builds small, deterministic training subsets for fast feature iteration.
+
+Each class receives a share of the subset proportional to its row count
+times its CUSTOM_CLASS_WEIGHTS importance (train_model.py), so the minority
+At Risk / Unhealthy classes are over-represented rather than sampled away.
+Every sampled row carries `coreset_weight` = its class's rows / sampled rows
+(normalized to mean 1), so weighted training on the subset targets the same
+class balance as training on the full data.
+
+Usage:
+  python coreset.py sample big.csv subset.csv --size 20000 --seed 42
+  python train_model.py --data subset.csv           (coreset_weight is applied automatically)
+  python coreset.py converge big.csv --sizes 1000,5000,20000 --repeats 3 --output convergence.json
+
+`converge` encodes the data once, holds out the same stratified test split
+train_model.py uses, trains on subsets of increasing size and reports how
+their test metrics approach those of the full-data model.
+"""
+
+import json
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
+from sklearn.metrics import accuracy_score, f1_score, recall_score
+
+from train_model import CUSTOM_CLASS_WEIGHTS, encode_dataset, build_sample_weights, build_model
+
+LABEL_COL = 'health_status'
+WEIGHT_COL = 'coreset_weight'
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def allocate(class_counts, size, class_weights=CUSTOM_CLASS_WEIGHTS):
+    """Rows to sample per class: proportional to count x importance, capped at the class size."""
+    labels = list(class_counts)
+    counts = np.array([class_counts[c] for c in labels], dtype=float)
+    mass = counts * np.array([class_weights.get(c, 1.0) for c in labels])
+    quota = np.zeros(len(labels), dtype=np.int64)
+    remaining = min(size, int(counts.sum()))
+    open_ = counts > 0
+    # Hand out the budget; classes that run out of rows pass their share on
+    while remaining > 0 and open_.any():
+        share = mass * open_ / (mass * open_).sum() * remaining
+        extra = np.minimum(np.floor(share).astype(np.int64), counts.astype(np.int64) - quota)
+        if extra.sum() == 0:
+            # Rounding left a few rows: give them to the largest open shares
+            for i in np.argsort(-share):
+                if remaining and open_[i] and quota[i] < counts[i]:
+                    quota[i] += 1
+                    remaining -= 1
+            break
+        quota += extra
+        remaining -= int(extra.sum())
+        open_ = quota < counts
+    return dict(zip(labels, quota.tolist()))
+
+
+def stratified_coreset(labels, size, seed=42, class_weights=CUSTOM_CLASS_WEIGHTS):
+    """Returns (sorted row indices, per-row weights) of a seeded stratified subset of `labels`."""
+    labels = np.asarray(labels)
+    classes, inverse, counts = np.unique(labels, return_inverse=True, return_counts=True)
+    quota = allocate(dict(zip(classes, counts)), size, class_weights)
+
+    rng = np.random.default_rng(seed)
+    indices, weights = [], []
+    for c_idx, c in enumerate(classes):
+        k = quota[c]
+        if not k:
+            continue
+        members = np.flatnonzero(inverse == c_idx)
+        chosen = rng.choice(members, size=k, replace=False)
+        indices.append(chosen)
+        weights.append(np.full(k, counts[c_idx] / k))
+
+    indices = np.concatenate(indices)
+    weights = np.concatenate(weights)
+    order = np.argsort(indices)
+    weights = weights[order]
+    return indices[order], weights / weights.mean()
+
+
+def read_labels(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Reads only the label column of a CSV."""
+    return np.concatenate([
+        chunk[LABEL_COL].astype(str).to_numpy()
+        for chunk in pd.read_csv(path, usecols=[LABEL_COL], chunksize=chunk_size)
+    ])
+
+
+def read_coreset_weights(path):
+    """The coreset_weight column of a CSV written by `coreset.py sample`, or None."""
+    header = pd.read_csv(path, nrows=0).columns
+    if WEIGHT_COL not in header:
+        return None
+    return pd.read_csv(path, usecols=[WEIGHT_COL])[WEIGHT_COL].to_numpy()
+
+
+def write_coreset(input_path, output_path, size, seed=42, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Two streaming passes: labels to choose rows, then the chosen rows with their weights."""
+    labels = read_labels(input_path, chunk_size)
+    indices, weights = stratified_coreset(labels, size, seed)
+
+    offset = 0
+    header = True
+    for chunk in pd.read_csv(input_path, chunksize=chunk_size):
+        lo, hi = np.searchsorted(indices, [offset, offset + len(chunk)])
+        if hi > lo:
+            subset = chunk.iloc[indices[lo:hi] - offset].copy()
+            subset[WEIGHT_COL] = weights[lo:hi]
+            subset.to_csv(output_path, mode='w' if header else 'a', header=header, index=False)
+            header = False
+        offset += len(chunk)
+
+    chosen = labels[indices]
+    return {
+        "rows_in": int(len(labels)),
+        "rows_out": int(len(indices)),
+        "per_class": {c: {"rows": int((labels == c).sum()), "sampled": int((chosen == c).sum())}
+                      for c in np.unique(labels)},
+    }
+
+
+def _metrics(model, X_test, y_test, class_names):
+    y_pred = model.predict(X_test)
+    recall = recall_score(y_test, y_pred, average=None, labels=range(len(class_names)), zero_division=0)
+    return {
+        "accuracy": float(accuracy_score(y_test, y_pred)),
+        "macro_f1": float(f1_score(y_test, y_pred, average='macro')),
+        "recall": dict(zip(class_names, recall.astype(float).tolist())),
+    }
+
+
+def _fit(X, y, weights, le):
+    model = build_model(len(le.classes_))
+    start = time.perf_counter()
+    model.fit(X, y, sample_weight=build_sample_weights(y, le) * weights)
+    return model, time.perf_counter() - start
+
+
+def convergence(data_path, sizes, repeats=3, seed=42):
+    """Trains on coresets of each size and compares their test metrics with the full-data model."""
+    # A coreset CSV's weight column is not a feature (same as train_model.py)
+    X, y = encode_dataset(pd.read_csv(data_path).drop(columns=[WEIGHT_COL], errors='ignore'))
+    le = LabelEncoder()
+    y_encoded = le.fit_transform(y)
+    class_names = le.classes_.tolist()
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y_encoded, test_size=0.2, random_state=42, stratify=y_encoded
+    )
+
+    full_model, full_seconds = _fit(X_train, y_train, np.ones(len(y_train)), le)
+    full = {"rows": int(len(y_train)), "train_seconds": full_seconds,
+            **_metrics(full_model, X_test, y_test, class_names)}
+    print(f"full  {full['rows']:>9} rows | acc {full['accuracy']:.4f} | macro-F1 {full['macro_f1']:.4f} "
+          f"| {full_seconds:.2f} s")
+
+    steps = []
+    for size in sizes:
+        runs = []
+        for r in range(repeats):
+            idx, weights = stratified_coreset(le.inverse_transform(y_train), size, seed + r)
+            model, seconds = _fit(X_train.iloc[idx], y_train[idx], weights, le)
+            runs.append({"train_seconds": seconds, **_metrics(model, X_test, y_test, class_names)})
+        accuracy = np.array([run["accuracy"] for run in runs])
+        macro_f1 = np.array([run["macro_f1"] for run in runs])
+        step = {
+            "size": int(min(size, len(y_train))),
+            "accuracy_mean": float(accuracy.mean()),
+            "accuracy_std": float(accuracy.std()),
+            "macro_f1_mean": float(macro_f1.mean()),
+            "macro_f1_gap": float(full["macro_f1"] - macro_f1.mean()),
+            "recall_mean": {c: float(np.mean([run["recall"][c] for run in runs])) for c in class_names},
+            "train_seconds_mean": float(np.mean([run["train_seconds"] for run in runs])),
+        }
+        steps.append(step)
+        print(f"{step['size']:>15} rows | acc {step['accuracy_mean']:.4f} ± {step['accuracy_std']:.4f} "
+              f"| macro-F1 gap {step['macro_f1_gap']:+.4f} | {step['train_seconds_mean']:.2f} s")
+
+    return {"data": str(data_path), "test_rows": int(len(y_test)), "repeats": repeats,
+            "full": full, "coresets": steps}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stratified, class-weight-aware training subsets.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sample = sub.add_parser("sample", help="Write a coreset CSV")
+    sample.add_argument("input")
+    sample.add_argument("output")
+    sample.add_argument("--size", type=int, required=True)
+    sample.add_argument("--seed", type=int, default=42)
+    sample.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+
+    converge = sub.add_parser("converge", help="Compare coreset-trained models with the full-data model")
+    converge.add_argument("input")
+    converge.add_argument("--sizes", default="500,1000,5000,20000")
+    converge.add_argument("--repeats", type=int, default=3)
+    converge.add_argument("--seed", type=int, default=42)
+    converge.add_argument("--output", default=None, help="Write the JSON report here")
+    args = parser.parse_args()
+
+    if args.command == "sample":
+        summary = write_coreset(args.input, args.output, args.size, args.seed, args.chunk_size)
+        print(json.dumps(summary, indent=2))
+        print(f"\n✅ Coreset of {summary['rows_out']} rows written to {args.output}")
+        return
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    report = convergence(args.input, sizes, args.repeats, args.seed)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Dataset Deduplication
+Removes redundant rows from a (generated) training CSV in one streaming pass.
+
+The generators draw names from a short list and most fields from small
+discrete distributions, so large runs repeat the same feature rows. Rows are
+compared on their canonical feature values (what train_model.py feeds the
+model: vitals, categoricals, symptom flags and list counts, plus the label);
+names, dates of birth and free text are ignored.
+
+  exact   rows whose canonical features + label hash identically
+  --near  also rows falling in the same bucket of quantized vitals
+          (see QUANTIZE_STEPS) with identical remaining features + label
+
+Split-aware mode (--test-output) assigns every row to train or test by a
+hash of its near-duplicate bucket (label excluded), so near-identical rows
+can never land on both sides; train_model.py --test-data uses the result.
+
+Usage:
+  python dedup_dataset.py cat_health_dataset_supplemented.csv deduped.csv
+  python dedup_dataset.py big.csv train.csv --near --test-output test.csv --test-size 0.2
+"""
+
+import json
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from train_model import COMPLEX_COLS, get_item_count, get_overdue_vaccine_count
+
+LABEL_COL = 'health_status'
+IGNORED_COLS = ['species', 'name', 'date_of_birth', 'diagnosis_text', 'treatment_text']
+DEFAULT_CHUNK_SIZE = 100_000
+SPLIT_RESOLUTION = 10_000
+
+# Bucket widths for near-duplicate signatures
+QUANTIZE_STEPS = {
+    'age_in_months': 6,
+    'weight_kg': 0.5,
+    'temperature': 0.2,
+    'heart_rate': 10,
+    'respiratory_rate': 4,
+    'blood_pressure_systolic': 10,
+    'blood_pressure_diastolic': 10,
+}
+
+
+def canonical_features(chunk):
+    """Feature columns as the model sees them (list columns reduced to counts), label excluded."""
+    df = chunk.drop(columns=IGNORED_COLS + COMPLEX_COLS + [LABEL_COL], errors='ignore')
+    for col in COMPLEX_COLS:
+        df[f'num_{col}'] = chunk[col].apply(get_item_count)
+    df['num_vaccines_overdue'] = chunk['vaccinations'].apply(get_overdue_vaccine_count)
+    # Fixed dtypes so equal values hash equally whatever pandas inferred per chunk
+    for col in df.columns:
+        if df[col].dtype == bool or pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = df[col].astype(np.float64)
+        else:
+            df[col] = df[col].astype(str)
+    return df
+
+
+def quantize(features):
+    """Replaces vitals by their bucket index."""
+    quantized = features.copy()
+    for col, step in QUANTIZE_STEPS.items():
+        if col in quantized:
+            quantized[col] = np.floor(quantized[col].astype(float) / step).astype(np.int64)
+    return quantized
+
+
+def row_hashes(df):
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def combine_hashes(a, b):
+    return pd.util.hash_array(a ^ (b * np.uint64(0x9E3779B97F4A7C15)))
+
+
+class Deduplicator:
+    """Streaming dedup state; feed chunks in file order."""
+
+    def __init__(self, near=False, test_size=None):
+        self.near = near
+        self.test_size = test_size
+        self.seen = set()
+        self.feature_labels = {}
+        self.counts = {"rows_in": 0, "exact_duplicates": 0, "near_duplicates": 0,
+                       "label_conflicts": 0, "rows_out": 0, "rows_test": 0}
+
+    def process(self, chunk):
+        """Returns (kept rows, is_test mask) for one chunk."""
+        chunk = chunk.reset_index(drop=True)
+        features = canonical_features(chunk)
+        labels = row_hashes(chunk[[LABEL_COL]])
+        exact_features = row_hashes(features)
+        exact = combine_hashes(exact_features, labels)
+        bucket = row_hashes(quantize(features))
+
+        self.counts["rows_in"] += len(chunk)
+        for h, label in zip(exact_features.tolist(), labels.tolist()):
+            first = self.feature_labels.setdefault(h, label)
+            if first != label:
+                self.counts["label_conflicts"] += 1
+
+        exact_dup = self._mark_seen(exact)
+        self.counts["exact_duplicates"] += int(exact_dup.sum())
+        drop = exact_dup
+        if self.near:
+            near_dup = self._mark_seen(combine_hashes(bucket, labels)) & ~exact_dup
+            self.counts["near_duplicates"] += int(near_dup.sum())
+            drop = drop | near_dup
+
+        kept = chunk[~drop]
+        if self.test_size:
+            is_test = (bucket[~drop] % SPLIT_RESOLUTION) < self.test_size * SPLIT_RESOLUTION
+        else:
+            is_test = np.zeros(len(kept), dtype=bool)
+        self.counts["rows_out"] += len(kept)
+        self.counts["rows_test"] += int(is_test.sum())
+        return kept, is_test
+
+    def _mark_seen(self, hashes):
+        """Flags hashes already seen (earlier chunks or earlier in this chunk) and records the rest."""
+        dup = pd.Series(hashes).duplicated().to_numpy(copy=True)
+        dup |= np.fromiter((h in self.seen for h in hashes.tolist()), dtype=bool, count=len(hashes))
+        self.seen.update(hashes[~dup].tolist())
+        return dup
+
+
+def deduplicate(input_path, output_path, near=False, test_output=None, test_size=0.2,
+                chunk_size=DEFAULT_CHUNK_SIZE):
+    """Streams input_path into output_path (and test_output) and returns the counts."""
+    dedup = Deduplicator(near, test_size if test_output else None)
+    start = time.perf_counter()
+    header = True
+    for chunk in pd.read_csv(input_path, chunksize=chunk_size):
+        kept, is_test = dedup.process(chunk)
+        kept[~is_test].to_csv(output_path, mode='w' if header else 'a', header=header, index=False)
+        if test_output:
+            kept[is_test].to_csv(test_output, mode='w' if header else 'a', header=header, index=False)
+        header = False
+
+    counts = dict(dedup.counts)
+    counts["rows_train"] = counts["rows_out"] - counts["rows_test"]
+    counts["removed_share"] = 1 - counts["rows_out"] / counts["rows_in"] if counts["rows_in"] else 0.0
+    counts["seconds"] = round(time.perf_counter() - start, 3)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remove exact / near-duplicate rows from a training CSV.")
+    parser.add_argument("input")
+    parser.add_argument("output", help="Deduplicated CSV (the train side in split-aware mode)")
+    parser.add_argument("--near", action="store_true", help="Also drop near-duplicates (quantized vitals)")
+    parser.add_argument("--test-output", default=None, help="Write a leakage-free test split here")
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    counts = deduplicate(args.input, args.output, args.near, args.test_output, args.test_size, args.chunk_size)
+    print(json.dumps(counts, indent=2))
+    print(f"\n✅ Kept {counts['rows_out']} of {counts['rows_in']} rows "
+          f"({counts['exact_duplicates']} exact, {counts['near_duplicates']} near duplicates removed)")
+
+
+if __name__ == "__main__":
+    main()
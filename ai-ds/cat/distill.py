@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Model Slimming and Distillation
+Builds smaller, faster variants of a trained cat health model and reports
+accuracy against latency, so a model can be picked for a latency budget.
+
+Variants:
+  rounds_<r>           the trained model truncated to its first r boosting rounds
+  depth<d>_<n>         retrained on the hard labels with max_depth d, n rounds
+  distill_depth<d>_<n> trained on the teacher's soft labels: each training row
+                       is repeated once per class, weighted by the teacher's
+                       probability for that class (times the usual class weight);
+                       --augment adds generator rows labelled only by the teacher
+
+Every variant is scored on the same stratified held-out split train_model.py
+uses: accuracy, macro-F1, per-class recall, agreement with the teacher, and
+median single-record and 1000-record batch latency. Variants no other variant
+beats on both accuracy and batch latency are marked as the Pareto front.
+
+Usage:
+  python distill.py
+  python distill.py --model cat_health_model_20251127.pkl --rounds 10,25,50 --depths 2,3 --augment 20000
+  python distill.py --save-dir variants/      (pickles every variant)
+
+The report is written to reports/distill_<model version>.json.
+"""
+
+import copy
+import json
+import time
+import pickle
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
+from sklearn.metrics import accuracy_score, f1_score, recall_score
+
+from train_model import FILE_PATH, encode_dataset, build_sample_weights, build_model
+from ml_inference import model_version
+
+SCRIPT_DIR = Path(__file__).parent
+REPORT_DIR = SCRIPT_DIR / "reports"
+DEFAULT_MODEL = SCRIPT_DIR / "cat_health_model_20251127.pkl"
+LATENCY_BATCH = 1000
+LATENCY_REPEATS = 50
+
+
+def truncated(model, rounds):
+    """A copy of the classifier using only its first `rounds` boosting rounds."""
+    variant = copy.copy(model)
+    variant._Booster = model.get_booster()[:rounds]
+    variant.set_params(n_estimators=rounds)
+    return variant
+
+
+def retrained(X, y, weights, le, max_depth, n_estimators):
+    model = build_model(len(le.classes_))
+    model.set_params(max_depth=max_depth, n_estimators=n_estimators)
+    model.fit(X, y, sample_weight=weights)
+    return model
+
+
+def distilled(X, teacher_probs, class_weights, le, max_depth, n_estimators):
+    """Student fitted to the teacher's soft labels via per-class replicated, probability-weighted rows."""
+    k = len(le.classes_)
+    n = len(X)
+    X_rep = pd.concat([X] * k, ignore_index=True)
+    y_rep = np.repeat(np.arange(k), n)
+    w_rep = teacher_probs.T.reshape(-1) * np.tile(class_weights, k)
+    keep = w_rep > 1e-4  # drop rows the teacher gives (almost) no mass
+    return retrained(X_rep[keep], y_rep[keep], w_rep[keep], le, max_depth, n_estimators)
+
+
+def augment_rows(n, training_cols, seed=42):
+    """n generator records encoded to the training columns (labels come from the teacher)."""
+    from synthetic import generate_payloads
+    from ml_inference import preprocess_and_align_data
+    return preprocess_and_align_data(generate_payloads(n, seed=seed, unhealthy_fraction=0.1), training_cols)
+
+
+def measure_latency(model, X_test, repeats=LATENCY_REPEATS):
+    """Median seconds for one single-record call and one LATENCY_BATCH-record call."""
+    single = X_test.iloc[[0]]
+    batch = X_test.iloc[np.arange(LATENCY_BATCH) % len(X_test)]
+    model.predict_proba(batch)  # warm up
+
+    def median_time(X):
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            model.predict_proba(X)
+            times.append(time.perf_counter() - start)
+        return float(np.median(times))
+
+    return median_time(single), median_time(batch)
+
+
+def evaluate_variant(name, model, X_test, y_test, teacher_pred, class_names):
+    probs = model.predict_proba(X_test)
+    pred = probs.argmax(axis=1)
+    recall = recall_score(y_test, pred, average=None, labels=range(len(class_names)), zero_division=0)
+    single_s, batch_s = measure_latency(model, X_test)
+    booster = model.get_booster()
+    return {
+        "variant": name,
+        "trees": len(booster.get_dump()),
+        "accuracy": float(accuracy_score(y_test, pred)),
+        "macro_f1": float(f1_score(y_test, pred, average='macro')),
+        "recall": dict(zip(class_names, recall.astype(float).tolist())),
+        "teacher_agreement": float((pred == teacher_pred).mean()),
+        "single_record_ms": single_s * 1000,
+        "batch_per_record_us": batch_s / LATENCY_BATCH * 1e6,
+    }
+
+
+def mark_pareto(results):
+    """Flags results not dominated on (accuracy up, batch latency down)."""
+    for r in results:
+        r["pareto"] = not any(
+            o is not r
+            and o["accuracy"] >= r["accuracy"] and o["batch_per_record_us"] <= r["batch_per_record_us"]
+            and (o["accuracy"] > r["accuracy"] or o["batch_per_record_us"] < r["batch_per_record_us"])
+            for o in results
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build faster model variants and report accuracy vs latency.")
+    parser.add_argument("--model", default=str(DEFAULT_MODEL))
+    parser.add_argument("--data", default=str(SCRIPT_DIR / FILE_PATH))
+    parser.add_argument("--rounds", default="10,25,50", help="Truncated boosting rounds")
+    parser.add_argument("--depths", default="2,3,4", help="max_depth values for retrained/distilled variants")
+    parser.add_argument("--estimators", type=int, default=40, help="Boosting rounds of retrained/distilled variants")
+    parser.add_argument("--augment", type=int, default=0, help="Extra generator rows labelled by the teacher")
+    parser.add_argument("--save-dir", default=None, help="Pickle every variant here")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    with open(args.model, "rb") as f:
+        teacher = pickle.load(f)
+
+    X, y = encode_dataset(pd.read_csv(args.data))
+    le = LabelEncoder()
+    y_encoded = le.fit_transform(y)
+    class_names = le.classes_.tolist()
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y_encoded, test_size=0.2, random_state=42, stratify=y_encoded
+    )
+    train_weights = build_sample_weights(y_train, le)
+    teacher_pred = teacher.predict_proba(X_test).argmax(axis=1)
+
+    variants = [("teacher", teacher)]
+    for r in (int(v) for v in args.rounds.split(",") if v.strip()):
+        variants.append((f"rounds_{r}", truncated(teacher, r)))
+
+    # Distillation set: training rows (plus optional teacher-labelled generator rows)
+    X_distill = X_train
+    if args.augment:
+        X_distill = pd.concat([X_train, augment_rows(args.augment, X.columns.tolist())], ignore_index=True)
+    teacher_probs = teacher.predict_proba(X_distill)
+    distill_weights = build_sample_weights(teacher_probs.argmax(axis=1), le)
+
+    for d in (int(v) for v in args.depths.split(",") if v.strip()):
+        print(f"Training depth-{d} variants ...")
+        variants.append((f"depth{d}_{args.estimators}",
+                         retrained(X_train, y_train, train_weights, le, d, args.estimators)))
+        variants.append((f"distill_depth{d}_{args.estimators}",
+                         distilled(X_distill, teacher_probs, distill_weights, le, d, args.estimators)))
+
+    results = [evaluate_variant(name, model, X_test, y_test, teacher_pred, class_names) for name, model in variants]
+    mark_pareto(results)
+
+    print(f"\n{'variant':<22} {'trees':>5} {'acc':>7} {'macroF1':>8} {'agree':>7} {'1-rec ms':>9} {'batch us/rec':>13}")
+    for r in results:
+        print(f"{r['variant']:<22} {r['trees']:>5} {r['accuracy']:>7.4f} {r['macro_f1']:>8.4f} "
+              f"{r['teacher_agreement']:>7.3f} {r['single_record_ms']:>9.3f} {r['batch_per_record_us']:>13.2f}"
+              f"{'  *' if r['pareto'] else ''}")
+    print("(* = Pareto front: no other variant is both as accurate and faster)")
+
+    if args.save_dir:
+        save_dir = Path(args.save_dir)
+        save_dir.mkdir(parents=True, exist_ok=True)
+        for name, model in variants[1:]:
+            with open(save_dir / f"{Path(args.model).stem}_{name}.pkl", "wb") as f:
+                pickle.dump(model, f)
+        print(f"Variants saved to {save_dir}")
+
+    output = Path(args.output) if args.output else REPORT_DIR / f"distill_{model_version(args.model)}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"model": str(args.model), "model_version": model_version(args.model), "test_rows": int(len(y_test)), "variants": results}, f, indent=2)
+    print(f"\n✅ Report written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Streaming Model Evaluation
+Scores an arbitrarily large labelled file in fixed-size chunks and
+accumulates the evaluation incrementally, so memory stays bounded by the
+chunk size rather than the file size.
+
+Accumulated per model version:
+  - confusion matrix, per-class precision / recall / F1 / support
+  - accuracy and multi-class log-loss
+  - calibration bins of the top-class confidence (and expected calibration error)
+
+Usage:
+  python evaluate_model.py holdout.csv
+  python evaluate_model.py holdout.jsonl --model cat_health_model_20251127.pkl --chunk-size 50000
+  PETVET_COMPACT_MODEL=cat_health_model_20251127.compact.npz python evaluate_model.py holdout.csv
+
+The input needs the raw record columns plus `health_status`. The report is
+written to reports/eval_<model version>.json unless --output is given.
+"""
+
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ml_inference import load_model_assets, preprocess_and_align_data
+
+SCRIPT_DIR = Path(__file__).parent
+REPORT_DIR = SCRIPT_DIR / "reports"
+LABEL_COL = 'health_status'
+DEFAULT_CHUNK_SIZE = 100_000
+CALIBRATION_BINS = 10
+LOG_LOSS_EPS = 1e-15
+
+
+class StreamingEvaluator:
+    """Accumulates classification metrics chunk by chunk."""
+
+    def __init__(self, classes, n_bins=CALIBRATION_BINS):
+        self.classes = list(classes)
+        self.k = len(self.classes)
+        self.n_bins = n_bins
+        self.confusion = np.zeros((self.k, self.k), dtype=np.int64)
+        self.log_loss_sum = 0.0
+        self.bin_count = np.zeros(n_bins, dtype=np.int64)
+        self.bin_confidence_sum = np.zeros(n_bins)
+        self.bin_correct = np.zeros(n_bins, dtype=np.int64)
+        self.unknown_labels = 0
+
+    def update(self, probs, labels):
+        """Adds one chunk: probs (n, k) and string labels (n,)."""
+        class_idx = {c: i for i, c in enumerate(self.classes)}
+        y = np.fromiter((class_idx.get(label, -1) for label in labels), dtype=np.int64, count=len(labels))
+        known = y >= 0
+        self.unknown_labels += int((~known).sum())
+        probs, y = probs[known], y[known]
+        if not len(y):
+            return
+
+        pred = probs.argmax(axis=1)
+        self.confusion += np.bincount(y * self.k + pred, minlength=self.k * self.k).reshape(self.k, self.k)
+
+        p_true = np.clip(probs[np.arange(len(y)), y], LOG_LOSS_EPS, 1.0)
+        self.log_loss_sum += float(-np.log(p_true).sum())
+
+        confidence = probs.max(axis=1)
+        bins = np.minimum((confidence * self.n_bins).astype(np.int64), self.n_bins - 1)
+        self.bin_count += np.bincount(bins, minlength=self.n_bins)
+        self.bin_confidence_sum += np.bincount(bins, weights=confidence, minlength=self.n_bins)
+        self.bin_correct += np.bincount(bins, weights=(pred == y), minlength=self.n_bins).astype(np.int64)
+
+    def report(self):
+        total = int(self.confusion.sum())
+        true_pos = np.diag(self.confusion).astype(float)
+        predicted = self.confusion.sum(axis=0)
+        actual = self.confusion.sum(axis=1)
+        precision = np.divide(true_pos, predicted, out=np.zeros(self.k), where=predicted > 0)
+        recall = np.divide(true_pos, actual, out=np.zeros(self.k), where=actual > 0)
+        f1 = np.divide(2 * precision * recall, precision + recall,
+                       out=np.zeros(self.k), where=(precision + recall) > 0)
+
+        bins = []
+        ece = 0.0
+        for b in range(self.n_bins):
+            count = int(self.bin_count[b])
+            mean_conf = self.bin_confidence_sum[b] / count if count else None
+            accuracy = self.bin_correct[b] / count if count else None
+            if count:
+                ece += count / total * abs(accuracy - mean_conf)
+            bins.append({
+                "range": [b / self.n_bins, (b + 1) / self.n_bins],
+                "count": count,
+                "mean_confidence": mean_conf,
+                "accuracy": accuracy,
+            })
+
+        return {
+            "records": total,
+            "unknown_labels": self.unknown_labels,
+            "accuracy": float(true_pos.sum() / total) if total else None,
+            "log_loss": self.log_loss_sum / total if total else None,
+            "per_class": {
+                c: {
+                    "precision": float(precision[i]),
+                    "recall": float(recall[i]),
+                    "f1": float(f1[i]),
+                    "support": int(actual[i]),
+                }
+                for i, c in enumerate(self.classes)
+            },
+            "confusion_matrix": {
+                "labels": self.classes,
+                "rows_true_cols_pred": self.confusion.tolist(),
+            },
+            "calibration": {
+                "expected_calibration_error": ece if total else None,
+                "bins": bins,
+            },
+        }
+
+
+def read_chunks(path, chunk_size):
+    """Yields DataFrame chunks from a CSV or JSON Lines file."""
+    path = Path(path)
+    if path.suffix in (".jsonl", ".ndjson"):
+        yield from pd.read_json(path, lines=True, chunksize=chunk_size)
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def evaluate(path, assets, chunk_size=DEFAULT_CHUNK_SIZE, progress=True):
+    """Streams `path` through the model and returns the accumulated report dict."""
+    evaluator = StreamingEvaluator(assets["classes"])
+    start = time.perf_counter()
+    for n, chunk in enumerate(read_chunks(path, chunk_size), start=1):
+        labels = chunk[LABEL_COL].astype(str).to_numpy()
+        X = preprocess_and_align_data(chunk.drop(columns=LABEL_COL), assets["training_cols"])
+        evaluator.update(assets["model"].predict_proba(X), labels)
+        if progress:
+            print(f"  chunk {n}: {int(evaluator.confusion.sum())} records scored", flush=True)
+
+    report = evaluator.report()
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate a model over a large labelled file in chunks.")
+    parser.add_argument("data", help="Labelled CSV or JSON Lines file")
+    parser.add_argument("--model", default=None, help="Pickled model (default: the deployed cat model)")
+    parser.add_argument("--dataset", default=None, help="Training CSV used to reconstruct columns for --model")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--output", default=None, help="Report path (default: reports/eval_<version>.json)")
+    args = parser.parse_args()
+
+    assets = load_model_assets(args.model, args.dataset)
+    version = assets["version"]
+
+    print(f"Evaluating {version} on {args.data} ...")
+    report = evaluate(args.data, assets, args.chunk_size)
+    report = {"model_version": version, "data": str(args.data), **report}
+
+    output = Path(args.output) if args.output else REPORT_DIR / f"eval_{version}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\nAccuracy: {report['accuracy']:.4f}  Log-loss: {report['log_loss']:.4f}  "
+          f"ECE: {report['calibration']['expected_calibration_error']:.4f}")
+    for c, m in report["per_class"].items():
+        print(f"  {c:<10} precision {m['precision']:.3f}  recall {m['recall']:.3f}  support {m['support']}")
+    print(f"\n✅ Report written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Encoded Feature Cache
+Caches the encoded training matrix, labels and column list produced by
+train_model.py so runs that only change hyperparameters skip preprocessing
+(literal_eval counts, get_dummies, bool casts).
+
+Entries are content-addressed: the key hashes the input file's bytes, the
+preprocessing variant (standard / low-memory), PREPROCESSING_VERSION and the
+source of the encoding functions and column constants in train_model.py.
+Editing the CSV or the encoding code therefore produces a new key; the stale entry for the same
+input file is removed when the new one is written.
+
+Each entry is a directory of .npy files, one 2-D block per column dtype
+(stored column-major, so every column is a contiguous slice), the labels and
+meta.json. Cached entries are opened with memory mapping, so a hit costs a
+hash of the input file plus page faults for the columns actually touched.
+
+Usage:
+  python train_model.py                 (uses the cache)
+  python train_model.py --no-cache
+  python feature_cache.py warm data.csv [--record encode.json]   (encode now, e.g. in pipeline.py)
+  python feature_cache.py list
+  python feature_cache.py clear
+"""
+
+import os
+import ast
+import json
+import shutil
+import hashlib
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SCRIPT_DIR = Path(__file__).parent
+CACHE_DIR = SCRIPT_DIR / "cache" / "features"
+CACHE_DIR_ENV = "PETVET_FEATURE_CACHE"
+TRAIN_SCRIPT = SCRIPT_DIR / "train_model.py"
+# Bump when encoding changes in a way the function sources below do not show
+PREPROCESSING_VERSION = 1
+HASH_BLOCK_BYTES = 1024 * 1024
+# Functions whose source is part of the cache key
+ENCODER_FUNCTIONS = [
+    'get_item_count', 'get_overdue_vaccine_count', 'encode_dataset',
+    '_reduce_chunk', 'encode_dataset_low_memory',
+]
+# Module-level constants the encoding functions read, also part of the key
+ENCODER_CONSTANTS = [
+    'COMPLEX_COLS', 'COLS_TO_DROP', 'NUMERIC_DTYPES', 'BOOLEAN_COLS', 'CATEGORICAL_COLS',
+]
+
+
+def cache_dir():
+    return Path(os.environ.get(CACHE_DIR_ENV, CACHE_DIR))
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def encoder_digest():
+    # Read from the file rather than importing train_model (and with it xgboost)
+    source = Path(TRAIN_SCRIPT).read_text()
+    segments = {}
+    for node in ast.parse(source).body:
+        if isinstance(node, ast.FunctionDef):
+            segments[node.name] = ast.get_source_segment(source, node)
+        elif isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    segments[target.id] = ast.get_source_segment(source, node)
+    h = hashlib.sha256(str(PREPROCESSING_VERSION).encode())
+    for name in ENCODER_FUNCTIONS + ENCODER_CONSTANTS:
+        h.update(segments[name].encode())
+    return h.hexdigest()
+
+
+def cache_key(data_path, variant):
+    h = hashlib.sha256()
+    for part in (file_digest(data_path), variant, encoder_digest()):
+        h.update(part.encode())
+        h.update(b"\0")
+    return h.hexdigest()[:32]
+
+
+def save_entry(entry, data_path, variant, X, y):
+    """Writes X (DataFrame) and y as per-dtype column blocks; atomic via rename."""
+    tmp = entry.with_name(entry.name + f".tmp{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    blocks = {}
+    for col in X.columns:
+        values = X[col].to_numpy()
+        blocks.setdefault(values.dtype.str, []).append((col, values))
+    layout = []
+    for n, (dtype, cols) in enumerate(blocks.items()):
+        np.save(tmp / f"block{n}.npy", np.stack([v for _, v in cols]))
+        layout.append({"file": f"block{n}.npy", "dtype": dtype, "columns": [c for c, _ in cols]})
+    np.save(tmp / "labels.npy", np.asarray(y).astype(str))
+
+    meta = {
+        "data": str(Path(data_path).resolve()),
+        "variant": variant,
+        "rows": int(len(X)),
+        "columns": X.columns.tolist(),
+        "blocks": layout,
+    }
+    with open(tmp / "meta.json", "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, entry)
+
+
+def load_entry(entry):
+    """(X DataFrame over memory-mapped columns, labels ndarray)."""
+    with open(entry / "meta.json") as f:
+        meta = json.load(f)
+    columns = {}
+    for block in meta["blocks"]:
+        values = np.load(entry / block["file"], mmap_mode="r")
+        for i, col in enumerate(block["columns"]):
+            columns[col] = values[i]
+    X = pd.DataFrame({col: columns[col] for col in meta["columns"]}, copy=False)
+    y = np.load(entry / "labels.npy", mmap_mode="r")
+    return X, y
+
+
+def prune_stale(data_path, variant, keep):
+    """Removes other entries built from the same input file and variant."""
+    source = str(Path(data_path).resolve())
+    for meta_file in cache_dir().glob("*/meta.json"):
+        if meta_file.parent.name == keep:
+            continue
+        try:
+            with open(meta_file) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if meta.get("data") == source and meta.get("variant") == variant:
+            shutil.rmtree(meta_file.parent, ignore_errors=True)
+
+
+def load_or_build(data_path, build, variant="standard"):
+    """Cached (X, y) for `data_path`; `build()` runs on a miss. Returns (X, y, hit)."""
+    key = cache_key(data_path, variant)
+    entry = cache_dir() / key
+    if (entry / "meta.json").exists():
+        X, y = load_entry(entry)
+        return X, y, True
+
+    X, y = build()
+    try:
+        save_entry(entry, data_path, variant, X, y)
+        prune_stale(data_path, variant, keep=key)
+    except OSError as e:
+        print(f"⚠️  Could not write feature cache: {e}")
+    return X, y, False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect, fill or clear the encoded feature cache.")
+    parser.add_argument("command", choices=["list", "clear", "warm"])
+    parser.add_argument("data", nargs="?", help="CSV to encode (warm)")
+    parser.add_argument("--record", default=None, help="warm: write the entry's key and shape here as JSON")
+    args = parser.parse_args()
+
+    if args.command == "warm":
+        if not args.data:
+            parser.error("warm needs a CSV")
+        from train_model import encode_dataset
+        X, _, hit = load_or_build(
+            args.data,
+            lambda: encode_dataset(pd.read_csv(args.data).drop(columns=['coreset_weight'], errors='ignore')))
+        info = {"key": cache_key(args.data, "standard"), "rows": int(X.shape[0]), "columns": X.columns.tolist()}
+        if args.record:
+            with open(args.record, "w") as f:
+                json.dump(info, f, indent=2)
+        print(f"✅ {'Already cached' if hit else 'Encoded'}: {info['rows']} rows, {len(info['columns'])} features "
+              f"({info['key']})")
+        return
+
+    entries = sorted(p.parent for p in cache_dir().glob("*/meta.json"))
+    if args.command == "clear":
+        for entry in entries:
+            shutil.rmtree(entry, ignore_errors=True)
+        print(f"✅ Removed {len(entries)} cache entries from {cache_dir()}")
+        return
+
+    for entry in entries:
+        with open(entry / "meta.json") as f:
+            meta = json.load(f)
+        size = sum(p.stat().st_size for p in entry.iterdir())
+        print(f"{entry.name}  {meta['variant']:<10} {meta['rows']:>9} rows  {len(meta['columns']):>3} cols  "
+              f"{size / 1e6:8.1f} MB  {meta['data']}")
+    if not entries:
+        print(f"No cache entries in {cache_dir()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Per-Pet Longitudinal Feature Store
+Maintains running aggregates of each pet's visit history so inference can
+look up longitudinal context in constant time instead of re-reading every
+past record.
+
+Each visit updates a fixed-size state in O(1):
+  - weight_kg / temperature: count, mean and variance (Welford), EWMA, last
+    value and least-squares trend over time (from running sums)
+  - vomiting: exponentially decayed episode count (30-day half-life) and a
+    bitmask of the last 8 visits
+
+States are packed into a fixed-size binary blob per pet in SQLite (WAL mode).
+
+Ingest applies each pet's records in visit order, whatever their order in
+the export, and is safe to repeat over overlapping exports: ids of ingested
+records are kept, and records without an id at or before the pet's last
+applied visit count as already seen. Incremental ingest also skips visits
+older than the pet's last applied one (they cannot be folded in out of
+order); run a backfill to include them.
+
+Usage:
+  python feature_store.py backfill export.jsonl [--store pet_features.sqlite]
+  python feature_store.py ingest new_records.jsonl
+  python feature_store.py show <pet_id>
+
+Exports are JSON Lines CatHealthRecord documents (see health_records.py).
+At inference time ml_inference.py attaches `history` for records carrying a
+`pet_id` when PETVET_FEATURE_STORE points at a store.
+"""
+
+import sys
+import json
+import math
+import time
+import struct
+import sqlite3
+import argparse
+from pathlib import Path
+
+from health_records import iter_export, record_id, record_pet_id, record_visit_ts, flatten_cat_record
+
+SCRIPT_DIR = Path(__file__).parent
+DEFAULT_STORE = SCRIPT_DIR / "pet_features.sqlite"
+FEATURE_STORE_ENV = "PETVET_FEATURE_STORE"
+
+DAY_SECONDS = 86400.0
+EWMA_ALPHA = 0.3
+VOMITING_HALF_LIFE_DAYS = 30.0
+RECENT_VISIT_WINDOW = 8
+
+TRACKED_VITALS = ['weight_kg', 'temperature']
+
+# Per-vital running state: n, mean, m2, ewma, last, sum_t, sum_tt, sum_ty
+_VITAL_FIELDS = 8
+# Header: first_ts, last_ts, visits, vomiting_decayed, vomiting_bits
+_STATE_FORMAT = "<ddIdB" + "d" * (_VITAL_FIELDS * len(TRACKED_VITALS))
+STATE_SIZE = struct.calcsize(_STATE_FORMAT)
+
+
+class PetState:
+    """Fixed-size running aggregates for one pet."""
+
+    __slots__ = ("first_ts", "last_ts", "visits", "vomiting_decayed", "vomiting_bits", "vitals")
+
+    def __init__(self):
+        self.first_ts = 0.0
+        self.last_ts = 0.0
+        self.visits = 0
+        self.vomiting_decayed = 0.0
+        self.vomiting_bits = 0
+        self.vitals = {name: [0.0] * _VITAL_FIELDS for name in TRACKED_VITALS}
+
+    # --- Serialization ---
+
+    def pack(self):
+        values = [self.first_ts, self.last_ts, self.visits, self.vomiting_decayed, self.vomiting_bits]
+        for name in TRACKED_VITALS:
+            values.extend(self.vitals[name])
+        return struct.pack(_STATE_FORMAT, *values)
+
+    @classmethod
+    def unpack(cls, blob):
+        values = struct.unpack(_STATE_FORMAT, blob)
+        state = cls()
+        state.first_ts, state.last_ts, state.visits, state.vomiting_decayed, state.vomiting_bits = values[:5]
+        for i, name in enumerate(TRACKED_VITALS):
+            start = 5 + i * _VITAL_FIELDS
+            state.vitals[name] = list(values[start:start + _VITAL_FIELDS])
+        return state
+
+    # --- O(1) update ---
+
+    def update(self, record, visit_ts):
+        """Folds one visit into the aggregates.
+
+        Visits are expected in time order; an out-of-order visit is applied
+        as if it happened at the latest visit time seen so far.
+        """
+        if self.visits == 0:
+            self.first_ts = self.last_ts = visit_ts
+        elapsed_days = max(visit_ts - self.last_ts, 0.0) / DAY_SECONDS
+        self.last_ts = max(visit_ts, self.last_ts)
+        t = (self.last_ts - self.first_ts) / DAY_SECONDS
+        self.visits += 1
+
+        vomiting = bool(record.get('vomiting'))
+        self.vomiting_decayed = self.vomiting_decayed * 0.5 ** (elapsed_days / VOMITING_HALF_LIFE_DAYS) + vomiting
+        self.vomiting_bits = ((self.vomiting_bits << 1) | vomiting) & ((1 << RECENT_VISIT_WINDOW) - 1)
+
+        for name in TRACKED_VITALS:
+            value = record.get(name)
+            if value is None or isinstance(value, bool):
+                continue
+            value = float(value)
+            if math.isnan(value):
+                continue
+            v = self.vitals[name]
+            n, mean, m2, ewma = v[0] + 1, v[1], v[2], v[3]
+            delta = value - mean
+            mean += delta / n
+            m2 += delta * (value - mean)
+            ewma = value if n == 1 else EWMA_ALPHA * value + (1 - EWMA_ALPHA) * ewma
+            self.vitals[name] = [n, mean, m2, ewma, value, v[5] + t, v[6] + t * t, v[7] + t * value]
+
+    # --- Features ---
+
+    def features(self, now=None):
+        now = time.time() if now is None else now
+        decay = 0.5 ** (max(now - self.last_ts, 0.0) / DAY_SECONDS / VOMITING_HALF_LIFE_DAYS)
+        out = {
+            "visits": self.visits,
+            "days_since_last_visit": round((now - self.last_ts) / DAY_SECONDS, 2) if self.visits else None,
+            "history_days": round((self.last_ts - self.first_ts) / DAY_SECONDS, 2),
+            "vomiting_recent_decayed": round(self.vomiting_decayed * decay, 4),
+            f"vomiting_last_{RECENT_VISIT_WINDOW}_visits": bin(self.vomiting_bits).count("1"),
+        }
+        for name in TRACKED_VITALS:
+            n, mean, m2, ewma, last, sum_t, sum_tt, sum_ty = self.vitals[name]
+            if n == 0:
+                continue
+            denom = n * sum_tt - sum_t * sum_t
+            slope = (n * sum_ty - sum_t * (mean * n)) / denom if denom > 1e-9 else 0.0
+            out.update({
+                f"{name}_mean": round(mean, 4),
+                f"{name}_std": round(math.sqrt(m2 / (n - 1)), 4) if n > 1 else 0.0,
+                f"{name}_ewma": round(ewma, 4),
+                f"{name}_last": last,
+                f"{name}_trend_per_30d": round(slope * 30.0, 4),
+            })
+        return out
+
+
+class FeatureStore:
+    """SQLite-backed map of pet_id -> packed PetState."""
+
+    def __init__(self, path=DEFAULT_STORE):
+        self.path = str(path)
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS pet_state (pet_id TEXT PRIMARY KEY, state BLOB NOT NULL)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS ingested (record_id TEXT PRIMARY KEY) WITHOUT ROWID")
+
+    def get_state(self, pet_id):
+        row = self.conn.execute("SELECT state FROM pet_state WHERE pet_id = ?", (str(pet_id),)).fetchone()
+        return PetState.unpack(row[0]) if row else None
+
+    def lookup(self, pet_id, now=None):
+        """Returns the pet's history features, or None if the pet has no visits."""
+        state = self.get_state(pet_id)
+        return state.features(now) if state else None
+
+    def record_visit(self, pet_id, record, visit_ts=None):
+        """Applies one new visit (O(1)) and persists the pet's state."""
+        state = self.get_state(pet_id) or PetState()
+        state.update(record, time.time() if visit_ts is None else visit_ts)
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO pet_state VALUES (?, ?)", (str(pet_id), state.pack()))
+        return state
+
+    def _ingested(self, rid):
+        return self.conn.execute("SELECT 1 FROM ingested WHERE record_id = ?", (rid,)).fetchone() is not None
+
+    def ingest(self, export_path, replace=False):
+        """Applies the export's new records; with replace=True rebuilds the store from scratch.
+
+        Records are grouped per pet and applied in visit-time order. States of
+        the pets touched are kept in memory during the pass and written, with
+        the ingested record ids, in a single transaction at the end.
+        """
+        visits = {}     # pet_id -> [(visit_ts, position in export, record id, vitals)]
+        new_ids = set()
+        skipped = duplicates = 0
+        for position, (_, doc) in enumerate(iter_export(export_path)):
+            pet_id = record_pet_id(doc) if doc else None
+            visit_ts = record_visit_ts(doc) if doc else None
+            if not pet_id or visit_ts is None:
+                skipped += 1
+                continue
+            rid = record_id(doc)
+            if rid is not None:
+                if rid in new_ids or (not replace and self._ingested(rid)):
+                    duplicates += 1
+                    continue
+                new_ids.add(rid)
+            record = flatten_cat_record(doc)
+            vitals = {k: record.get(k) for k in ['vomiting'] + TRACKED_VITALS}
+            visits.setdefault(pet_id, []).append((visit_ts, position, rid, vitals))
+
+        states = {}
+        late = 0
+        for pet_id, pet_visits in visits.items():
+            state = (None if replace else self.get_state(pet_id)) or PetState()
+            # Last visit applied by earlier ingests
+            high_water = state.last_ts if state.visits else None
+            applied = False
+            for visit_ts, _, rid, vitals in sorted(pet_visits, key=lambda v: (v[0], v[1])):
+                if high_water is not None and visit_ts <= high_water:
+                    if rid is None:
+                        duplicates += 1  # no id: anything up to the high-water mark counts as seen
+                        continue
+                    if visit_ts < high_water:
+                        late += 1
+                        new_ids.discard(rid)
+                        continue
+                state.update(vitals, visit_ts)
+                applied = True
+            if applied:
+                states[pet_id] = state
+
+        with self.conn:
+            if replace:
+                self.conn.execute("DELETE FROM pet_state")
+                self.conn.execute("DELETE FROM ingested")
+            self.conn.executemany("INSERT OR REPLACE INTO pet_state VALUES (?, ?)",
+                                  ((pet_id, s.pack()) for pet_id, s in states.items()))
+            self.conn.executemany("INSERT OR IGNORE INTO ingested VALUES (?)", ((rid,) for rid in new_ids))
+        return {"pets_updated": len(states), "records_skipped": skipped,
+                "records_already_ingested": duplicates, "records_out_of_order": late}
+
+    def close(self):
+        self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-pet longitudinal feature store.")
+    parser.add_argument("--store", default=str(DEFAULT_STORE))
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("backfill", help="Rebuild the store from a full export").add_argument("export")
+    sub.add_parser("ingest", help="Apply new records incrementally").add_argument("export")
+    sub.add_parser("show", help="Print a pet's history features").add_argument("pet_id")
+    args = parser.parse_args()
+
+    store = FeatureStore(args.store)
+    try:
+        if args.command in ("backfill", "ingest"):
+            start = time.perf_counter()
+            summary = store.ingest(args.export, replace=args.command == "backfill")
+            summary["seconds"] = round(time.perf_counter() - start, 3)
+            print(json.dumps(summary))
+        else:
+            features = store.lookup(args.pet_id)
+            if features is None:
+                print(f"No history for pet {args.pet_id}", file=sys.stderr)
+                sys.exit(1)
+            print(json.dumps(features, indent=2))
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Binary Framed Protocol
+Length-prefixed binary frames for `ml_inference.py --serve-binary`, an
+alternative to the JSON lines of --serve for large batches where JSON
+encoding/decoding costs as much as scoring itself.
+
+Every frame is a little-endian uint32 byte length followed by the body.
+Each body starts with a 16-byte header:
+
+  magic     4s   b"PVB1"
+  msg_type  u8   1 = score, 2 = layout
+  flags     u8   request: bit 0 = return documentation indices
+                 response: bit 0 = documentation indices present, bit 1 = error
+  key_len   u16  request: byte length of the model key that follows ("" = "cat")
+  n_rows    u32
+  n_cols    u32  request: features per row; response: classes per row
+
+Score request:   header, model key (utf-8), float32[n_rows * n_cols] features
+                 in the model's training column order (see the layout message)
+Score response:  header, float32[n_rows * n_cols] class probabilities,
+                 then uint8[n_rows] diagnosis indices and uint8[n_rows]
+                 treatment/prescription indices if requested
+Layout request:  header, model key
+Layout / error response: header, utf-8 JSON payload (feature columns,
+                 classes and documentation tables / error message)
+
+Binary requests carry already-encoded features, so the record-level input
+validation of the JSON path (input_schema.py) is skipped and becomes the
+client's responsibility, as does the feature encoding itself: MLService would
+have to reimplement preprocess_and_align_data (list counts, one-hot levels,
+column order) in Node before it could use this protocol.
+
+The benchmark reports the binary path end to end (client-side encoding plus
+round trip) next to the transport-only round trip; the speedup is computed
+from the end-to-end figure.
+
+Usage:
+  python framing.py bench --batch-sizes 1,100,1000,10000 --repeats 20
+"""
+
+import sys
+import json
+import time
+import struct
+import argparse
+import subprocess
+from pathlib import Path
+
+import numpy as np
+
+SCRIPT_DIR = Path(__file__).parent
+INFERENCE_SCRIPT = SCRIPT_DIR / "ml_inference.py"
+
+MAGIC = b"PVB1"
+HEADER = struct.Struct("<4sBBHII")
+LENGTH = struct.Struct("<I")
+
+MSG_SCORE = 1
+MSG_LAYOUT = 2
+
+FLAG_DOCUMENTATION = 0x01
+FLAG_ERROR = 0x02
+
+
+class FrameError(ValueError):
+    """Malformed frame."""
+
+
+# --- Frame I/O ---
+
+def read_frame(stream):
+    """Reads one frame body from a binary stream; returns None at EOF."""
+    prefix = stream.read(LENGTH.size)
+    if not prefix:
+        return None
+    if len(prefix) < LENGTH.size:
+        raise FrameError("truncated length prefix")
+    (length,) = LENGTH.unpack(prefix)
+    body = stream.read(length)
+    if len(body) < length:
+        raise FrameError("truncated frame")
+    return body
+
+
+def write_frame(stream, *parts):
+    stream.write(LENGTH.pack(sum(len(p) for p in parts)))
+    for part in parts:
+        stream.write(part)
+    stream.flush()
+
+
+def parse_header(body):
+    if len(body) < HEADER.size:
+        raise FrameError("frame shorter than header")
+    magic, msg_type, flags, key_len, n_rows, n_cols = HEADER.unpack_from(body)
+    if magic != MAGIC:
+        raise FrameError(f"bad magic {magic!r}")
+    return msg_type, flags, key_len, n_rows, n_cols
+
+
+# --- Requests ---
+
+def encode_score_request(features, model_key="", documentation=True):
+    """Frame parts for a score request over a (n_rows, n_features) array."""
+    features = np.ascontiguousarray(features, dtype=np.float32)
+    if features.ndim == 1:
+        features = features[None, :]
+    key = model_key.encode("utf-8")
+    header = HEADER.pack(MAGIC, MSG_SCORE, FLAG_DOCUMENTATION if documentation else 0,
+                         len(key), features.shape[0], features.shape[1])
+    return header, key, memoryview(features).cast("B")
+
+
+def encode_layout_request(model_key=""):
+    key = model_key.encode("utf-8")
+    return HEADER.pack(MAGIC, MSG_LAYOUT, 0, len(key), 0, 0), key
+
+
+def decode_request(body):
+    """Returns (msg_type, flags, model key, features array or None)."""
+    msg_type, flags, key_len, n_rows, n_cols = parse_header(body)
+    offset = HEADER.size
+    key = body[offset:offset + key_len].decode("utf-8")
+    offset += key_len
+    if msg_type != MSG_SCORE:
+        return msg_type, flags, key, None
+    expected = n_rows * n_cols * 4
+    if len(body) - offset != expected:
+        raise FrameError(f"expected {expected} feature bytes, got {len(body) - offset}")
+    features = np.frombuffer(body, dtype=np.float32, count=n_rows * n_cols, offset=offset)
+    return msg_type, flags, key, features.reshape(n_rows, n_cols)
+
+
+# --- Responses ---
+
+def encode_score_response(probs, diagnosis_idx=None, template_idx=None):
+    probs = np.ascontiguousarray(probs, dtype=np.float32)
+    flags = FLAG_DOCUMENTATION if diagnosis_idx is not None else 0
+    parts = [HEADER.pack(MAGIC, MSG_SCORE, flags, 0, probs.shape[0], probs.shape[1]),
+             memoryview(probs).cast("B")]
+    if diagnosis_idx is not None:
+        parts.append(np.asarray(diagnosis_idx, dtype=np.uint8).tobytes())
+        parts.append(np.asarray(template_idx, dtype=np.uint8).tobytes())
+    return parts
+
+
+def encode_json_response(msg_type, payload, error=False):
+    return HEADER.pack(MAGIC, msg_type, FLAG_ERROR if error else 0, 0, 0, 0), json.dumps(payload).encode("utf-8")
+
+
+def decode_response(body):
+    """Returns a dict: {"probs", "diagnosis_idx", "template_idx"} for scores, or the JSON payload."""
+    msg_type, flags, _, n_rows, n_cols = parse_header(body)
+    offset = HEADER.size
+    if flags & FLAG_ERROR or msg_type != MSG_SCORE:
+        payload = json.loads(body[offset:].decode("utf-8"))
+        if flags & FLAG_ERROR:
+            raise RuntimeError(payload.get("error", "inference error"))
+        return payload
+    probs = np.frombuffer(body, dtype=np.float32, count=n_rows * n_cols, offset=offset).reshape(n_rows, n_cols)
+    offset += n_rows * n_cols * 4
+    result = {"probs": probs, "diagnosis_idx": None, "template_idx": None}
+    if flags & FLAG_DOCUMENTATION:
+        result["diagnosis_idx"] = np.frombuffer(body, dtype=np.uint8, count=n_rows, offset=offset)
+        result["template_idx"] = np.frombuffer(body, dtype=np.uint8, count=n_rows, offset=offset + n_rows)
+    return result
+
+
+# --- Client ---
+
+class BinaryWorker:
+    """One `ml_inference.py --serve-binary` subprocess."""
+
+    def __init__(self, env=None):
+        self.proc = subprocess.Popen(
+            [sys.executable, str(INFERENCE_SCRIPT), "--serve-binary"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            cwd=SCRIPT_DIR, env=env,
+        )
+
+    def _call(self, parts):
+        write_frame(self.proc.stdin, *parts)
+        body = read_frame(self.proc.stdout)
+        if body is None:
+            raise RuntimeError("inference worker exited")
+        return decode_response(body)
+
+    def layout(self, model_key=""):
+        return self._call(encode_layout_request(model_key))
+
+    def score(self, features, model_key="", documentation=True):
+        return self._call(encode_score_request(features, model_key, documentation))
+
+    def close(self):
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=10)
+        except Exception:
+            self.proc.kill()
+
+
+# --- Benchmark ---
+
+def _time_calls(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def benchmark(batch_sizes, repeats, seed=42):
+    """Median time per batch, JSON (--serve) vs binary (--serve-binary) including client-side encoding."""
+    from synthetic import generate_payloads
+    from load_test import ServeWorker
+    from ml_inference import preprocess_and_align_data
+
+    payloads = generate_payloads(max(batch_sizes), seed=seed, unhealthy_fraction=0.1)
+    json_worker, binary_worker = ServeWorker(), BinaryWorker()
+    try:
+        training_cols = binary_worker.layout()["training_cols"]
+        results = []
+        for size in batch_sizes:
+            batch = payloads[:size]
+            request = batch if size > 1 else batch[0]
+            # The binary client sends pre-encoded features (as MLService would have to build them)
+            def encode():
+                return preprocess_and_align_data(batch, training_cols).to_numpy(dtype=np.float32)
+
+            features = encode()
+            json_worker.request(request)
+            binary_worker.score(features)
+            json_s = _time_calls(lambda: json_worker.request(request), repeats)
+            encode_s = _time_calls(encode, repeats)
+            transport_s = _time_calls(lambda: binary_worker.score(features), repeats)
+            binary_s = encode_s + transport_s
+            results.append({
+                "batch_size": size,
+                "json_ms": json_s * 1000,
+                "binary_ms": binary_s * 1000,
+                "binary_transport_ms": transport_s * 1000,
+                "client_encode_ms": encode_s * 1000,
+                "speedup": json_s / binary_s,
+                "transport_only_speedup": json_s / transport_s,
+                "json_records_per_s": size / json_s,
+                "binary_records_per_s": size / binary_s,
+            })
+            r = results[-1]
+            print(f"batch {size:>6} | json {r['json_ms']:9.2f} ms | binary {r['binary_ms']:9.2f} ms "
+                  f"(encode {r['client_encode_ms']:.1f} + transport {r['binary_transport_ms']:.1f}) "
+                  f"| x{r['speedup']:.1f} (transport only x{r['transport_only_speedup']:.1f})")
+        return results
+    finally:
+        json_worker.close()
+        binary_worker.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Binary inference protocol tools.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    bench = sub.add_parser("bench", help="Compare JSON and binary round trips")
+    bench.add_argument("--batch-sizes", default="1,100,1000,10000")
+    bench.add_argument("--repeats", type=int, default=20)
+    bench.add_argument("--output", default=None, help="Write the JSON report here")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.batch_sizes.split(",") if s.strip()]
+    results = benchmark(sizes, args.repeats)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
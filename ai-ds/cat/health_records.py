@@ -0,0 +1,140 @@
+"""
+Health Record Exports
+Reads JSON Lines exports of the cat health records stored by
+HealthRecordsService (backend/src/services/health-records.service.ts) and
+flattens them back into the ml_inference.py request layout.
+
+Each export line is a CatHealthRecord document. Mongo extended JSON
+({"$oid": ...}, {"$date": ...}) is accepted. The record's pet id and visit
+date come from the linked CommonHealthRecord, and are read from top-level
+`pet_id` / `visitDate` (falling back to `petId` / `createdAt`). The clinic
+used by rollups.py is `clinicName` where the export joins it in, else the vet id.
+
+A stored record's `prescriptions` are the model's own output from when the
+record was created (HealthRecordsService saves predictionResult.prescriptions),
+not what the clinician entered, and the clinician's list is not stored. So
+flattened records carry no prescriptions: feeding the old output back in as
+the `num_prescriptions` input would make re-scoring depend on the earlier
+prediction.
+"""
+
+import json
+from datetime import datetime, timezone
+
+
+def _unwrap(value):
+    """Unwraps Mongo extended JSON scalars."""
+    if isinstance(value, dict):
+        if "$oid" in value:
+            return value["$oid"]
+        if "$date" in value:
+            return _unwrap(value["$date"])
+        if "$numberLong" in value:
+            return int(value["$numberLong"])
+        if "$numberDouble" in value:
+            return float(value["$numberDouble"])
+    return value
+
+
+def _get(doc, *path, default=None):
+    for key in path:
+        if not isinstance(doc, dict):
+            return default
+        doc = doc.get(key)
+        if doc is None:
+            return default
+    return _unwrap(doc)
+
+
+def parse_timestamp(value):
+    """Returns a UTC epoch timestamp (seconds) for ISO strings / epoch millis, or None."""
+    value = _unwrap(value)
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return value / 1000.0
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def record_id(doc):
+    record = _get(doc, "_id")
+    return None if record is None else str(record)
+
+
+def record_pet_id(doc):
+    pet_id = _get(doc, "pet_id")
+    return str(pet_id if pet_id is not None else _get(doc, "petId", default="")) or None
+
+
+def record_clinic(doc):
+    """Clinic key: `clinicName` if the export joined it in, else the vet id (`vet_id` / `vetId`)."""
+    clinic = _get(doc, "clinicName") or _get(doc, "vet_id") or _get(doc, "vetId")
+    return str(clinic) if clinic is not None else None
+
+
+def record_visit_ts(doc):
+    return parse_timestamp(_get(doc, "visitDate") or _get(doc, "createdAt"))
+
+
+def flatten_cat_record(doc):
+    """Converts an exported CatHealthRecord into an ml_inference.py request record."""
+    vaccinations = [
+        {
+            "vaccine_name": _get(v, "vaccineName"),
+            "administered_date": _get(v, "administeredDate"),
+            "status": _get(v, "status"),
+        }
+        for v in doc.get("vaccinations") or []
+    ]
+    return {
+        "species": "cat",
+        "breed": _get(doc, "petSnapshot", "breed", default="Unknown"),
+        "age_in_months": _get(doc, "petSnapshot", "ageInMonths"),
+        "weight_kg": _get(doc, "vitals", "weight", "value"),
+        "temperature": _get(doc, "vitals", "temperature", "value"),
+        "heart_rate": _get(doc, "vitals", "heartRate", "value"),
+        "respiratory_rate": _get(doc, "vitals", "respiratoryRate", "value"),
+        "blood_pressure_systolic": _get(doc, "vitals", "bloodPressure", "systolic"),
+        "blood_pressure_diastolic": _get(doc, "vitals", "bloodPressure", "diastolic"),
+        "body_condition_score": _get(doc, "catMetrics", "bodyConditionScore"),
+        "hydration_status": _get(doc, "catMetrics", "hydrationStatus"),
+        "mucous_membrane_color": _get(doc, "catMetrics", "mucousMembraneColor"),
+        "coat_condition": _get(doc, "catMetrics", "coatCondition"),
+        "appetite": _get(doc, "behavior", "appetite"),
+        "energy_level": _get(doc, "behavior", "energyLevel"),
+        "aggression": _get(doc, "behavior", "aggression"),
+        "vomiting": _get(doc, "behavior", "vomiting"),
+        "diarrhea": _get(doc, "behavior", "diarrhea"),
+        "coughing": _get(doc, "behavior", "coughing"),
+        "limping": _get(doc, "behavior", "limping"),
+        "allergies": [_get(a, "allergen") or _get(a, "condition") for a in doc.get("allergies") or []],
+        "chronic_conditions": [_get(c, "condition") or _get(c, "allergen") for c in doc.get("chronicConditions") or []],
+        # Stored prescriptions are earlier model output, not clinician input (see module docstring)
+        "prescriptions": [],
+        "vaccinations": json.dumps(vaccinations),
+    }
+
+
+def iter_export(path, start_offset=0):
+    """Yields (end_offset, document) for each non-empty line of a JSON Lines export.
+
+    end_offset is the byte offset just past the line, usable to resume reading.
+    Lines that are not valid JSON are yielded as (end_offset, None).
+    """
+    with open(path, "rb") as f:
+        f.seek(start_offset)
+        offset = start_offset
+        for line in f:
+            offset += len(line)
+            if not line.strip():
+                continue
+            try:
+                yield offset, json.loads(line)
+            except json.JSONDecodeError:
+                yield offset, None
@@ -0,0 +1,218 @@
+"""
+Input Schema Validation
+Validates prediction requests before they reach preprocessing, mirroring
+MLService.validateInput on the Node side and the physiological limits used
+by the data generators (ai-ds/cat2).
+
+A schema is compiled once per model (allowed categorical levels come from
+the loaded model assets) and can then validate a single record with plain
+Python checks, or a whole batch DataFrame with vectorized masks.
+
+Errors are structured, one entry per failing field:
+  { "field": "temperature", "error": "out_of_range", "message": "..." }
+"""
+
+import numpy as np
+import pandas as pd
+
+# ABSOLUTE PHYSIOLOGICAL LIMITS (MUST MATCH ABS_MIN_*/ABS_MAX_* IN THE GENERATORS)
+ABS_MIN_TEMP = 35.0
+ABS_MAX_TEMP = 42.0
+ABS_MIN_HR = 50
+ABS_MAX_HR = 300
+ABS_MIN_RR = 5
+ABS_MAX_RR = 60
+ABS_MIN_SYS = 80
+ABS_MAX_SYS = 250
+ABS_MIN_DIA = 40
+ABS_MAX_DIA = 160
+
+# field -> (min, max, unit)
+NUMERIC_RANGES = {
+    'age_in_months': (0, 240, 'months'),
+    'weight_kg': (0.1, 100, 'kg'),
+    'temperature': (ABS_MIN_TEMP, ABS_MAX_TEMP, '°C'),
+    'heart_rate': (ABS_MIN_HR, ABS_MAX_HR, 'bpm'),
+    'respiratory_rate': (ABS_MIN_RR, ABS_MAX_RR, 'breaths/min'),
+    'blood_pressure_systolic': (ABS_MIN_SYS, ABS_MAX_SYS, 'mmHg'),
+    'blood_pressure_diastolic': (ABS_MIN_DIA, ABS_MAX_DIA, 'mmHg'),
+    'body_condition_score': (1, 9, ''),
+}
+
+BOOLEAN_FIELDS = ['vomiting', 'diarrhea', 'coughing', 'limping']
+
+# Closed categoricals: values must be one of the levels the model was trained on
+CATEGORICAL_FIELDS = [
+    'hydration_status', 'mucous_membrane_color', 'coat_condition',
+    'appetite', 'energy_level', 'aggression',
+]
+
+# Open categoricals: any non-empty string (unseen levels map to the baseline)
+OPEN_CATEGORICAL_FIELDS = ['breed']
+
+# List fields: a list, or a string representation of one (vaccinations arrive as JSON text).
+# Optional: an absent or null list counts as empty in preprocessing
+LIST_FIELDS = ['vaccinations', 'allergies', 'chronic_conditions', 'prescriptions']
+
+# Used when no model assets are available (matches the generator distributions)
+DEFAULT_CATEGORICAL_LEVELS = {
+    'hydration_status': ['mild_dehydration', 'moderate_dehydration', 'normal', 'severe_dehydration'],
+    'mucous_membrane_color': ['blue', 'pale', 'pink', 'red', 'white', 'yellow'],
+    'coat_condition': ['dull', 'greasy', 'healthy', 'matted', 'patchy'],
+    'appetite': ['absent', 'decreased', 'increased', 'normal'],
+    'energy_level': ['hyperactive', 'lethargic', 'normal'],
+    'aggression': ['mild', 'moderate', 'none', 'severe'],
+}
+
+
+def _error(field, code, message):
+    return {"field": field, "error": code, "message": message}
+
+
+def _range_message(field, lo, hi, unit):
+    return f"{field} must be between {lo} and {hi}{(' ' + unit) if unit else ''}"
+
+
+class CompiledSchema:
+    """Precompiled validator for prediction input records."""
+
+    def __init__(self, categorical_levels=None):
+        levels = dict(DEFAULT_CATEGORICAL_LEVELS)
+        if categorical_levels:
+            levels.update({k: v for k, v in categorical_levels.items() if k in CATEGORICAL_FIELDS})
+
+        self.categorical_levels = {field: frozenset(levels[field]) for field in CATEGORICAL_FIELDS}
+        self._numeric = [(field, lo, hi, _range_message(field, lo, hi, unit))
+                         for field, (lo, hi, unit) in NUMERIC_RANGES.items()]
+        self._categorical_messages = {
+            field: f"{field} must be one of: {', '.join(sorted(self.categorical_levels[field]))}"
+            for field in CATEGORICAL_FIELDS
+        }
+
+    # --- Single record ---
+
+    def validate_record(self, record):
+        """Validates one record (dict). Returns a list of field errors (empty if valid)."""
+        if not isinstance(record, dict):
+            return [_error(None, 'invalid_type', "record must be a JSON object")]
+
+        errors = []
+
+        for field, lo, hi, message in self._numeric:
+            value = record.get(field)
+            if value is None:
+                errors.append(_error(field, 'missing', f"{field} is required"))
+            elif isinstance(value, bool) or not isinstance(value, (int, float)) or value != value:
+                errors.append(_error(field, 'invalid_type', f"{field} must be a number"))
+            elif value < lo or value > hi:
+                errors.append(_error(field, 'out_of_range', message))
+
+        for field in BOOLEAN_FIELDS:
+            value = record.get(field)
+            if value is None:
+                errors.append(_error(field, 'missing', f"{field} is required"))
+            elif not isinstance(value, bool) and value not in (0, 1):
+                errors.append(_error(field, 'invalid_type', f"{field} must be a boolean"))
+
+        for field in CATEGORICAL_FIELDS:
+            value = record.get(field)
+            if value is None:
+                errors.append(_error(field, 'missing', f"{field} is required"))
+            elif not isinstance(value, str) or value not in self.categorical_levels[field]:
+                errors.append(_error(field, 'invalid_level', self._categorical_messages[field]))
+
+        for field in OPEN_CATEGORICAL_FIELDS:
+            value = record.get(field)
+            if not isinstance(value, str) or not value.strip():
+                errors.append(_error(field, 'missing', f"{field} is required"))
+
+        for field in LIST_FIELDS:
+            value = record.get(field)
+            if value is not None and not isinstance(value, (list, str)):
+                errors.append(_error(field, 'invalid_type', f"{field} must be a list"))
+
+        return errors
+
+    # --- Batch ---
+
+    def validate_frame(self, df):
+        """Validates every row of a DataFrame with vectorized checks.
+
+        Returns (valid_mask, errors) where valid_mask is a boolean array aligned
+        with the rows of `df` and errors maps row position -> list of field errors.
+        """
+        n = len(df)
+        errors = {}
+
+        def flag(mask, field, code, message):
+            for i in np.flatnonzero(mask):
+                errors.setdefault(int(i), []).append(_error(field, code, message))
+
+        for field, lo, hi, message in self._numeric:
+            if field not in df.columns:
+                flag(np.ones(n, dtype=bool), field, 'missing', f"{field} is required")
+                continue
+            col = df[field]
+            missing = col.isna().to_numpy()
+            if pd.api.types.is_bool_dtype(col):
+                wrong_type = ~missing
+            elif pd.api.types.is_numeric_dtype(col):
+                wrong_type = np.zeros(n, dtype=bool)
+            else:
+                # Mixed object column: only genuine numbers (not bools/strings) are accepted
+                wrong_type = ~missing & ~col.map(
+                    lambda v: isinstance(v, (int, float)) and not isinstance(v, bool)
+                ).to_numpy(dtype=bool)
+            values = pd.to_numeric(col.where(~wrong_type), errors='coerce').to_numpy(dtype=float)
+            out_of_range = ~missing & ~wrong_type & ((values < lo) | (values > hi))
+            flag(missing, field, 'missing', f"{field} is required")
+            flag(wrong_type, field, 'invalid_type', f"{field} must be a number")
+            flag(out_of_range, field, 'out_of_range', message)
+
+        for field in BOOLEAN_FIELDS:
+            if field not in df.columns:
+                flag(np.ones(n, dtype=bool), field, 'missing', f"{field} is required")
+                continue
+            col = df[field]
+            missing = col.isna().to_numpy()
+            wrong_type = ~missing & ~col.isin([True, False]).to_numpy()
+            flag(missing, field, 'missing', f"{field} is required")
+            flag(wrong_type, field, 'invalid_type', f"{field} must be a boolean")
+
+        for field in CATEGORICAL_FIELDS:
+            if field not in df.columns:
+                flag(np.ones(n, dtype=bool), field, 'missing', f"{field} is required")
+                continue
+            col = df[field]
+            missing = col.isna().to_numpy()
+            invalid = ~missing & ~col.isin(self.categorical_levels[field]).to_numpy()
+            flag(missing, field, 'missing', f"{field} is required")
+            flag(invalid, field, 'invalid_level', self._categorical_messages[field])
+
+        for field in OPEN_CATEGORICAL_FIELDS:
+            if field not in df.columns:
+                flag(np.ones(n, dtype=bool), field, 'missing', f"{field} is required")
+                continue
+            col = df[field]
+            is_str = col.map(lambda v: isinstance(v, str)).to_numpy(dtype=bool)
+            empty = ~is_str | (col.where(is_str, '').astype(str).str.strip() == '').to_numpy()
+            flag(empty, field, 'missing', f"{field} is required")
+
+        for field in LIST_FIELDS:
+            if field not in df.columns:
+                continue
+            col = df[field]
+            wrong_type = col.notna().to_numpy() & ~col.map(
+                lambda v: isinstance(v, (list, str))
+            ).to_numpy(dtype=bool)
+            flag(wrong_type, field, 'invalid_type', f"{field} must be a list")
+
+        valid_mask = np.ones(n, dtype=bool)
+        if errors:
+            valid_mask[list(errors.keys())] = False
+        return valid_mask, errors
+
+
+def compile_schema(categorical_levels=None):
+    """Builds a CompiledSchema, using the model's categorical levels when provided."""
+    return CompiledSchema(categorical_levels)
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Inference Load Test
+Replays synthetic analyzer traffic against ml_inference.py and reports
+throughput, latency percentiles and error rates for a series of offered
+request rates, so the knee of the latency curve can be located.
+
+Payloads come from the ai-ds/cat2 generator in the MLService request layout
+(see synthetic.py).
+
+Modes:
+  serve   a pool of long-running `ml_inference.py --serve` workers (default)
+  spawn   one `ml_inference.py` process per request, as MLService does today
+
+Usage:
+  python load_test.py --rates 5,10,20,40 --duration 10 --workers 4
+  python load_test.py --mode spawn --rates 1,2 --duration 20 --concurrency 8
+  python load_test.py --rates 50 --batch-size 100 --output report.json
+
+Latency is measured from each request's scheduled send time (open-loop), so
+queueing behind slow requests is included rather than hidden.
+"""
+
+import sys
+import json
+import time
+import queue
+import argparse
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from synthetic import generate_payloads
+
+SCRIPT_DIR = Path(__file__).parent
+INFERENCE_SCRIPT = SCRIPT_DIR / "ml_inference.py"
+
+# A step is past the knee when p99 exceeds this multiple of the first step's p99,
+# or when achieved throughput falls below this share of the offered rate.
+KNEE_P99_FACTOR = 2.0
+KNEE_THROUGHPUT_SHARE = 0.9
+
+
+class ServeWorker:
+    """One `ml_inference.py --serve` subprocess speaking JSON lines."""
+
+    def __init__(self, env=None):
+        self.proc = subprocess.Popen(
+            [sys.executable, str(INFERENCE_SCRIPT), "--serve"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, bufsize=1, cwd=SCRIPT_DIR, env=env,
+        )
+
+    def request(self, payload):
+        self.proc.stdin.write(json.dumps(payload) + "\n")
+        self.proc.stdin.flush()
+        line = self.proc.stdout.readline()
+        if not line:
+            raise RuntimeError("inference worker exited")
+        return json.loads(line)
+
+    def close(self):
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=10)
+        except Exception:
+            self.proc.kill()
+
+
+class ServePool:
+    """Fixed pool of ServeWorkers; each request takes a free worker."""
+
+    def __init__(self, size, env=None):
+        self.workers = [ServeWorker(env) for _ in range(size)]
+        self.free = queue.Queue()
+        for worker in self.workers:
+            self.free.put(worker)
+
+    def request(self, payload):
+        worker = self.free.get()
+        try:
+            return worker.request(payload)
+        finally:
+            self.free.put(worker)
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+
+
+def spawn_request(payload):
+    """One subprocess per request, mirroring MLService.predictCatHealth."""
+    proc = subprocess.run(
+        [sys.executable, str(INFERENCE_SCRIPT)],
+        input=json.dumps(payload), capture_output=True, text=True, cwd=SCRIPT_DIR,
+    )
+    return json.loads(proc.stdout) if proc.stdout.strip() else {"success": False, "error": proc.stderr}
+
+
+def is_success(output):
+    if not output.get("success"):
+        return False
+    results = output.get("results")
+    return results is None or all(r.get("success") for r in results)
+
+
+def run_step(send, payloads, rate, duration, concurrency, batch_size):
+    """Offers `rate` requests/s for `duration` seconds; returns the step's measurements."""
+    n_requests = max(1, int(rate * duration))
+    latencies = np.full(n_requests, np.nan)
+    service_times = np.full(n_requests, np.nan)
+    errors = np.zeros(n_requests, dtype=bool)
+
+    def fire(i, scheduled):
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        start = time.perf_counter()
+        if batch_size > 1:
+            payload = [payloads[(i * batch_size + k) % len(payloads)] for k in range(batch_size)]
+        else:
+            payload = payloads[i % len(payloads)]
+        try:
+            errors[i] = not is_success(send(payload))
+        except Exception:
+            errors[i] = True
+        end = time.perf_counter()
+        service_times[i] = end - start
+        latencies[i] = end - scheduled
+
+    t0 = time.perf_counter() + 0.05
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i in range(n_requests):
+            pool.submit(fire, i, t0 + i / rate)
+    elapsed = time.perf_counter() - t0
+
+    ms = latencies * 1000
+    return {
+        "offered_rps": rate,
+        "requests": n_requests,
+        "records_per_request": batch_size,
+        "achieved_rps": n_requests / elapsed,
+        "records_per_second": n_requests * batch_size / elapsed,
+        "error_rate": float(errors.mean()),
+        "latency_ms": {
+            "p50": float(np.nanpercentile(ms, 50)),
+            "p90": float(np.nanpercentile(ms, 90)),
+            "p99": float(np.nanpercentile(ms, 99)),
+            "max": float(np.nanmax(ms)),
+        },
+        "service_ms_p50": float(np.nanpercentile(service_times * 1000, 50)),
+    }
+
+
+def find_knee(steps):
+    """Returns the offered rate of the first step past the knee, or None."""
+    if not steps:
+        return None
+    baseline_p99 = steps[0]["latency_ms"]["p99"]
+    for step in steps[1:]:
+        if (step["latency_ms"]["p99"] > KNEE_P99_FACTOR * baseline_p99
+                or step["achieved_rps"] < KNEE_THROUGHPUT_SHARE * step["offered_rps"]):
+            return step["offered_rps"]
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Python inference path with synthetic traffic.")
+    parser.add_argument("--mode", choices=["serve", "spawn"], default="serve")
+    parser.add_argument("--rates", default="5,10,20,40", help="Comma-separated offered request rates (req/s)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per rate step")
+    parser.add_argument("--workers", type=int, default=2, help="Inference workers (serve mode)")
+    parser.add_argument("--concurrency", type=int, default=32, help="Max in-flight requests")
+    parser.add_argument("--batch-size", type=int, default=1, help="Records per request (JSON array if > 1)")
+    parser.add_argument("--payloads", type=int, default=2000, help="Distinct synthetic payloads to cycle through")
+    parser.add_argument("--unhealthy-fraction", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Write the JSON report here")
+    args = parser.parse_args()
+
+    payloads = generate_payloads(args.payloads, seed=args.seed, unhealthy_fraction=args.unhealthy_fraction)
+    rates = [float(r) for r in args.rates.split(",") if r.strip()]
+
+    pool = None
+    if args.mode == "serve":
+        pool = ServePool(args.workers)
+        send = pool.request
+        # Warm up: every worker loads its model before measurement starts
+        for worker in pool.workers:
+            worker.request(payloads[0])
+    else:
+        send = spawn_request
+
+    steps = []
+    try:
+        for rate in rates:
+            step = run_step(send, payloads, rate, args.duration, args.concurrency, args.batch_size)
+            steps.append(step)
+            lat = step["latency_ms"]
+            print(f"offered {rate:8.1f} req/s | achieved {step['achieved_rps']:8.1f} req/s "
+                  f"({step['records_per_second']:9.1f} rec/s) | p50 {lat['p50']:8.1f} ms "
+                  f"p90 {lat['p90']:8.1f} ms p99 {lat['p99']:8.1f} ms | errors {step['error_rate']:.1%}")
+    finally:
+        if pool:
+            pool.close()
+
+    report = {
+        "mode": args.mode,
+        "workers": args.workers if args.mode == "serve" else None,
+        "concurrency": args.concurrency,
+        "duration_per_step_s": args.duration,
+        "steps": steps,
+        "knee_offered_rps": find_knee(steps),
+    }
+    print(f"\nKnee of the latency curve: {report['knee_offered_rps'] or 'not reached'}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
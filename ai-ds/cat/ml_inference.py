@@ -6,6 +6,33 @@ This is called by Node.js backend as a subprocess.
 
 Usage:
   python ml_inference.py < input.json
+  python ml_inference.py < batch.json     (JSON array of records)
+  PETVET_COMPACT_MODEL=cat_health_model_20251127.compact.npz python ml_inference.py < input.json
+  python ml_inference.py --serve < requests.jsonl   (one JSON request per line, stays resident)
+  python ml_inference.py --serve-binary              (length-prefixed binary frames, see framing.py)
+
+Set PETVET_PROFILE=1 to profile requests; with PETVET_PROFILE_DIR set, a request
+can also ask for it with "_profile": true. See profiling.py for the output files
+and the --serve "profile" command.
+
+Records are routed by "species" (default "cat") and, where a breed-specific
+model is registered, by "breed" (see model_registry.py).
+
+With PETVET_FEATURE_STORE set, records carrying a "pet_id" also get the pet's
+longitudinal aggregates as "history" (see feature_store.py).
+
+With PETVET_SHADOW_MODELS set, candidate models score the same encoded
+features in the background and disagreements are logged (see shadow.py).
+Shadow scoring runs in the --serve modes only: a one-shot run would load the
+candidates and wait for them before exiting, delaying its response.
+With PETVET_PREDICTION_LOG=<dir>, every scored request is appended to a binary
+prediction log by a background writer (see prediction_log.py); one-shot runs
+append to a shared spool file instead, after the response has been printed.
+With PETVET_PREDICTION_CACHE=<file>, probabilities are cached on disk and
+shared by every worker on the node (see prediction_cache.py).
+
+A request of the form {"what_if": {"record": {...}, "sweeps": [...]}} returns
+probability curves for the record with single features varied (see what_if).
 
 Input JSON Format:
 {
@@ -25,10 +52,19 @@ Output JSON Format:
   "prescriptions": [...],
   "prediction_timestamp": "2025-11-29 10:30:00"
 }
+
+Batch Output JSON Format (input is a JSON array):
+{
+  "success": true,
+  "results": [ { "success": true, "status": "Healthy", ... }, ... ],
+  "prediction_timestamp": "2025-11-29 10:30:00"
+}
 """
 
+import os
 import sys
 import json
+import time
 import pickle
 import pandas as pd
 import numpy as np
@@ -36,11 +72,35 @@ import ast
 from pathlib import Path
 from datetime import datetime
 
+from input_schema import compile_schema, CATEGORICAL_FIELDS, OPEN_CATEGORICAL_FIELDS, NUMERIC_RANGES, BOOLEAN_FIELDS
+from profiling import maybe_profile, profile_mode_from_env, request_profiling_allowed
+
 # Configuration
 SCRIPT_DIR = Path(__file__).parent
 MODEL_FILE = SCRIPT_DIR / "cat_health_model_20251127.pkl"
 DATASET_FILE = SCRIPT_DIR / "cat_health_dataset_supplemented.csv"
 
+# Optional compact (numpy-only) model built by compact_model.py. When set, the
+# pickled model and the training CSV are not loaded at all.
+COMPACT_MODEL_ENV = "PETVET_COMPACT_MODEL"
+
+# Optional per-pet feature store (feature_store.py). When set, records that
+# carry a "pet_id" get the pet's longitudinal aggregates attached as "history".
+FEATURE_STORE_ENV = "PETVET_FEATURE_STORE"
+
+# Optional shadow candidates scored off the critical path (shadow.py)
+SHADOW_MODELS_ENV = "PETVET_SHADOW_MODELS"
+
+# Optional append-only log of encoded features and probabilities (prediction_log.py)
+PREDICTION_LOG_ENV = "PETVET_PREDICTION_LOG"
+
+# Optional on-disk probability cache shared by all workers on a node (prediction_cache.py)
+PREDICTION_CACHE_ENV = "PETVET_PREDICTION_CACHE"
+
+# What-if sweeps: default points per numeric sweep and cap on variants per request
+WHAT_IF_DEFAULT_STEPS = 21
+WHAT_IF_MAX_ROWS = 10_000
+
 # Feature Engineering Utilities (MUST MATCH TRAINING SCRIPT)
 COMPLEX_COLS = ['vaccinations', 'allergies', 'chronic_conditions', 'prescriptions']
 COLS_TO_DROP = [
@@ -71,13 +131,23 @@ def get_overdue_vaccine_count(list_str):
 
 
 def preprocess_and_align_data(raw_data, training_cols):
-    """Applies all training-time preprocessing steps and aligns columns."""
+    """Applies all training-time preprocessing steps and aligns columns.
+
+    Accepts a single record (dict), a list of records or a DataFrame.
+    """
     try:
         # Create DataFrame from input
-        df = pd.DataFrame([raw_data])
-
-        # Feature Engineering
+        if isinstance(raw_data, pd.DataFrame):
+            df = raw_data.copy()
+        elif isinstance(raw_data, list):
+            df = pd.DataFrame(raw_data)
+        else:
+            df = pd.DataFrame([raw_data])
+
+        # Feature Engineering (list fields are optional in the schema: absent means empty)
         for col in COMPLEX_COLS:
+            if col not in df.columns:
+                df[col] = None
             df[f'num_{col}'] = df[col].apply(get_item_count).astype(np.int32)
 
         df['num_vaccines_overdue'] = df['vaccinations'].apply(get_overdue_vaccine_count).astype(np.int32)
@@ -89,9 +159,12 @@ def preprocess_and_align_data(raw_data, training_cols):
         for col in df_features.select_dtypes(include=['bool']).columns:
             df_features[col] = df_features[col].astype(int)
 
-        # One-hot encode categorical columns
+        # One-hot encode categorical columns. Every level is kept here: the
+        # baseline level dropped at training time is removed by the alignment
+        # below, whereas drop_first on a request frame would drop whichever
+        # level happens to sort first in the request (or batch).
         categorical_cols = df_features.select_dtypes(include=['object']).columns
-        X_processed = pd.get_dummies(df_features, columns=categorical_cols, drop_first=True)
+        X_processed = pd.get_dummies(df_features, columns=categorical_cols)
 
         # Align columns to training data
         missing_cols = set(training_cols) - set(X_processed.columns)
@@ -105,6 +178,22 @@ def preprocess_and_align_data(raw_data, training_cols):
         raise Exception(f"Preprocessing error: {str(e)}")
 
 
+# Documentation templates (shared by the single-record and batch paths)
+UNHEALTHY_SYMPTOM_PHRASES = ["active vomiting", "severe lethargy", "pale mucous membranes"]
+UNHEALTHY_TREATMENT = "Immediate critical care stabilization. IV fluid and electrolyte therapy with continuous monitoring."
+UNHEALTHY_PRESCRIPTIONS = ['IV Fluid Therapy', 'Maropitant', 'Broad-spectrum Antibiotic']
+AT_RISK_DIAGNOSIS = "Sub-clinical signs detected. Requires comprehensive diagnostic screening."
+AT_RISK_TREATMENT = "Outpatient treatment with supportive care. Recommend full blood panel and urinalysis."
+AT_RISK_PRESCRIPTIONS = ['Mirtazapine', 'Probiotic supplement']
+HEALTHY_DIAGNOSIS = "General check-up. The cat is asymptomatic and within normal clinical limits."
+HEALTHY_TREATMENT = "No specific treatment required. Maintain current diet and preventative care."
+
+
+def unhealthy_diagnosis(symptoms):
+    """Builds the Unhealthy diagnosis sentence from a list of symptom phrases."""
+    return f"Acute systemic illness indicated by {', '.join(symptoms)}."
+
+
 def generate_documentation(status, raw_data):
     """Generates diagnosis_text, treatment_text, and prescriptions based on prediction."""
     diagnosis = ""
@@ -119,109 +208,712 @@ def generate_documentation(status, raw_data):
     if status == 'Unhealthy':
         symptoms = []
         if vomiting:
-            symptoms.append("active vomiting")
+            symptoms.append(UNHEALTHY_SYMPTOM_PHRASES[0])
         if lethargy:
-            symptoms.append("severe lethargy")
+            symptoms.append(UNHEALTHY_SYMPTOM_PHRASES[1])
         if pale_gums:
-            symptoms.append("pale mucous membranes")
+            symptoms.append(UNHEALTHY_SYMPTOM_PHRASES[2])
 
-        diagnosis = f"Acute systemic illness indicated by {', '.join(symptoms)}."
-        treatment = "Immediate critical care stabilization. IV fluid and electrolyte therapy with continuous monitoring."
-        prescriptions = ['IV Fluid Therapy', 'Maropitant', 'Broad-spectrum Antibiotic']
+        diagnosis = unhealthy_diagnosis(symptoms)
+        treatment = UNHEALTHY_TREATMENT
+        prescriptions = list(UNHEALTHY_PRESCRIPTIONS)
 
     elif status == 'At Risk':
-        symptoms = []
-        if raw_data.get('appetite') == 'decreased':
-            symptoms.append("decreased appetite")
-        if raw_data.get('hydration_status') != 'normal':
-            symptoms.append("mild dehydration")
-
-        diagnosis = f"Sub-clinical signs detected. Requires comprehensive diagnostic screening."
-        treatment = "Outpatient treatment with supportive care. Recommend full blood panel and urinalysis."
-        prescriptions = ['Mirtazapine', 'Probiotic supplement']
+        diagnosis = AT_RISK_DIAGNOSIS
+        treatment = AT_RISK_TREATMENT
+        prescriptions = list(AT_RISK_PRESCRIPTIONS)
 
     else:  # Healthy
-        diagnosis = "General check-up. The cat is asymptomatic and within normal clinical limits."
-        treatment = "No specific treatment required. Maintain current diet and preventative care."
+        diagnosis = HEALTHY_DIAGNOSIS
+        treatment = HEALTHY_TREATMENT
         prescriptions = []
 
     return diagnosis, treatment, prescriptions
 
 
-def main():
-    """Main prediction function."""
-    try:
-        # Read input from stdin
-        input_json = sys.stdin.read()
-        raw_data = json.loads(input_json)
+def _build_documentation_tables():
+    """Precomputes every distinct documentation output as shared string/list objects.
 
-        # Load model
-        if not MODEL_FILE.exists():
-            raise FileNotFoundError(f"Model file not found: {MODEL_FILE}")
+    Diagnosis index layout: 0-7 = Unhealthy with symptom bitmask
+    (1 = vomiting, 2 = lethargy, 4 = pale gums), 8 = At Risk, 9 = Healthy.
+    Treatment/prescription index layout: 0 = Unhealthy, 1 = At Risk, 2 = Healthy.
+    """
+    diagnoses = np.empty(10, dtype=object)
+    for mask in range(8):
+        symptoms = [phrase for bit, phrase in enumerate(UNHEALTHY_SYMPTOM_PHRASES) if mask & (1 << bit)]
+        diagnoses[mask] = sys.intern(unhealthy_diagnosis(symptoms))
+    diagnoses[8] = sys.intern(AT_RISK_DIAGNOSIS)
+    diagnoses[9] = sys.intern(HEALTHY_DIAGNOSIS)
 
-        model = pickle.load(open(MODEL_FILE, "rb"))
+    treatments = np.array([UNHEALTHY_TREATMENT, AT_RISK_TREATMENT, HEALTHY_TREATMENT], dtype=object)
 
-        # Load training data to reconstruct feature columns
-        if not DATASET_FILE.exists():
-            raise FileNotFoundError(f"Dataset file not found: {DATASET_FILE}")
+    prescriptions = np.empty(3, dtype=object)
+    prescriptions[0] = list(UNHEALTHY_PRESCRIPTIONS)
+    prescriptions[1] = list(AT_RISK_PRESCRIPTIONS)
+    prescriptions[2] = []
 
-        df_original = pd.read_csv(DATASET_FILE)
+    return diagnoses, treatments, prescriptions
 
-        # Reconstruct training columns
-        X_original = df_original.drop(columns='health_status', errors='ignore')
-        for col in COMPLEX_COLS:
-            X_original[f'num_{col}'] = X_original[col].apply(get_item_count).astype(np.int32)
 
-        X_original['num_vaccines_overdue'] = X_original['vaccinations'].apply(get_overdue_vaccine_count).astype(np.int32)
-        X_original_processed = X_original.drop(columns=COLS_TO_DROP, errors='ignore')
+DIAGNOSIS_TABLE, TREATMENT_TABLE, PRESCRIPTION_TABLE = _build_documentation_tables()
 
-        for col in X_original_processed.select_dtypes(include=['bool']).columns:
-            X_original_processed[col] = X_original_processed[col].astype(int)
 
-        categorical_cols = X_original_processed.select_dtypes(include=['object']).columns
-        X_original_encoded = pd.get_dummies(X_original_processed, columns=categorical_cols, drop_first=True)
-        TRAINING_COLS = X_original_encoded.columns.tolist()
+def _flag_array(df, col):
+    """Returns the truthiness of a column as a boolean array (False if absent)."""
+    if col not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    return np.fromiter((bool(v) and v == v for v in df[col].to_numpy()), dtype=bool, count=len(df))
 
-        # Preprocess input
-        X_new_processed = preprocess_and_align_data(raw_data, TRAINING_COLS)
 
-        # Make prediction
-        prediction_probs = model.predict_proba(X_new_processed)
-        predicted_class_idx = prediction_probs[0].argmax()
+def _equals_array(df, col, value):
+    """Returns a boolean array marking rows where `col` equals `value` (False if absent)."""
+    if col not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    return (df[col].to_numpy() == value).astype(bool)
 
-        # Map index to class name
-        from sklearn.preprocessing import LabelEncoder
-        le = LabelEncoder().fit(df_original['health_status'])
-        predicted_status = le.classes_[predicted_class_idx]
 
-        # Get confidence scores
-        confidence_dict = {
-            le.classes_[i]: float(prediction_probs[0][i]) for i in range(len(le.classes_))
-        }
+def documentation_indices(statuses, vomiting, lethargy, pale_gums):
+    """Returns (diagnosis index, treatment/prescription index) arrays into the documentation tables."""
+    statuses = np.asarray(statuses, dtype=object)
+    symptom_mask = (
+        np.asarray(vomiting, dtype=bool).astype(np.int8)
+        | (np.asarray(lethargy, dtype=bool).astype(np.int8) << 1)
+        | (np.asarray(pale_gums, dtype=bool).astype(np.int8) << 2)
+    )
+
+    unhealthy = statuses == 'Unhealthy'
+    at_risk = statuses == 'At Risk'
+    template_idx = np.where(unhealthy, 0, np.where(at_risk, 1, 2))
+    diagnosis_idx = np.where(unhealthy, symptom_mask, template_idx + 7)
+    return diagnosis_idx, template_idx
+
+
+def generate_documentation_batch(statuses, raw_df):
+    """Columnar version of generate_documentation for a batch of predictions.
+
+    Symptom flags are derived as boolean arrays and combined into a template
+    index, so every output is one of a handful of precomputed objects. Identical
+    outputs share the same string/list instance; callers must not mutate the
+    returned prescription lists.
+
+    Returns three lists (diagnoses, treatments, prescriptions) aligned with `statuses`.
+    """
+    diagnosis_idx, template_idx = documentation_indices(
+        statuses,
+        _flag_array(raw_df, 'vomiting'),
+        _equals_array(raw_df, 'energy_level', 'lethargic'),
+        _equals_array(raw_df, 'mucous_membrane_color', 'pale'),
+    )
 
-        # Generate documentation
-        diagnosis, treatment, prescriptions = generate_documentation(predicted_status, raw_data)
+    return (
+        DIAGNOSIS_TABLE[diagnosis_idx].tolist(),
+        TREATMENT_TABLE[template_idx].tolist(),
+        PRESCRIPTION_TABLE[template_idx].tolist(),
+    )
 
-        # Prepare output
-        output = {
+
+def model_version(path, suffix=""):
+    """Model version: file stem plus a hash of the file's bytes, so replacing a model file changes it."""
+    from feature_cache import file_digest
+    return f"{Path(path).name.split('.')[0]}{suffix}-{file_digest(path)[:12]}"
+
+
+def load_compact_assets(path):
+    """Loads a compact model together with the metadata stored alongside it."""
+    from compact_model import load_compact_model
+
+    model = load_compact_model(path)
+    return {
+        "model": model,
+        "training_cols": model.feature_names,
+        "classes": model.classes,
+        "categorical_levels": model.categorical_levels,
+        "schema": compile_schema(model.categorical_levels),
+        "version": model_version(path, "-compact"),
+    }
+
+
+def load_model_assets(model_file=None, dataset_file=None):
+    """Loads the model and reconstructs training columns and class labels.
+
+    Defaults to the built-in cat model (or PETVET_COMPACT_MODEL when set).
+    """
+    if model_file is None:
+        compact_path = os.environ.get(COMPACT_MODEL_ENV)
+        if compact_path:
+            return load_compact_assets(compact_path)
+
+    model_file = Path(model_file) if model_file else MODEL_FILE
+    dataset_file = Path(dataset_file) if dataset_file else DATASET_FILE
+
+    if not model_file.exists():
+        raise FileNotFoundError(f"Model file not found: {model_file}")
+
+    with open(model_file, "rb") as f:
+        model = pickle.load(f)
+
+    # Load training data to reconstruct feature columns
+    if not dataset_file.exists():
+        raise FileNotFoundError(f"Dataset file not found: {dataset_file}")
+
+    df_original = pd.read_csv(dataset_file)
+
+    # Reconstruct training columns
+    X_original = df_original.drop(columns='health_status', errors='ignore')
+    for col in COMPLEX_COLS:
+        X_original[f'num_{col}'] = X_original[col].apply(get_item_count).astype(np.int32)
+
+    X_original['num_vaccines_overdue'] = X_original['vaccinations'].apply(get_overdue_vaccine_count).astype(np.int32)
+    X_original_processed = X_original.drop(columns=COLS_TO_DROP, errors='ignore')
+
+    for col in X_original_processed.select_dtypes(include=['bool']).columns:
+        X_original_processed[col] = X_original_processed[col].astype(int)
+
+    categorical_cols = X_original_processed.select_dtypes(include=['object']).columns
+    X_original_encoded = pd.get_dummies(X_original_processed, columns=categorical_cols, drop_first=True)
+
+    # Map index to class name (LabelEncoder sorts classes alphabetically)
+    classes = sorted(df_original['health_status'].unique().tolist())
+
+    categorical_levels = {
+        col: sorted(X_original_processed[col].dropna().unique().tolist())
+        for col in CATEGORICAL_FIELDS if col in X_original_processed.columns
+    }
+
+    return {
+        "model": model,
+        "training_cols": X_original_encoded.columns.tolist(),
+        "classes": classes,
+        "categorical_levels": categorical_levels,
+        "schema": compile_schema(categorical_levels),
+        "version": model_version(model_file),
+    }
+
+
+def invalid_input_output(validation_errors):
+    """Builds the error result for a record rejected by input validation."""
+    return {
+        "success": False,
+        "status": None,
+        "error": "Invalid input: " + "; ".join(e["message"] for e in validation_errors),
+        "validation_errors": validation_errors,
+    }
+
+
+def _timings(start, preprocessed):
+    return {"preprocess_ms": (preprocessed - start) * 1000, "predict_ms": (time.perf_counter() - preprocessed) * 1000}
+
+
+def predict_batch(records, assets, on_scored=None):
+    """Scores a list of records in one pass and returns a list of result dicts.
+
+    Records failing input validation are rejected up front and never reach
+    preprocessing; their result carries the structured validation errors.
+    `on_scored(X, probs, timings)` is called with the encoded features,
+    probabilities and preprocess/predict times in ms.
+    """
+    results = [None] * len(records)
+
+    dict_positions = [i for i, r in enumerate(records) if isinstance(r, dict)]
+    for i in range(len(records)):
+        if not isinstance(records[i], dict):
+            results[i] = invalid_input_output(assets["schema"].validate_record(records[i]))
+
+    raw_df = pd.DataFrame([records[i] for i in dict_positions])
+    valid_mask, errors = assets["schema"].validate_frame(raw_df)
+    for row, row_errors in errors.items():
+        results[dict_positions[row]] = invalid_input_output(row_errors)
+
+    valid_positions = [dict_positions[row] for row in np.flatnonzero(valid_mask)]
+    if not valid_positions:
+        return results
+
+    # Re-infer dtypes: rejected rows may have left object columns behind
+    raw_df = raw_df[valid_mask].reset_index(drop=True).infer_objects()
+    start = time.perf_counter()
+    X_new_processed = preprocess_and_align_data(raw_df, assets["training_cols"])
+    preprocessed = time.perf_counter()
+
+    prediction_probs = predict_probs(X_new_processed, assets)
+    if on_scored:
+        on_scored(X_new_processed, prediction_probs, _timings(start, preprocessed))
+    classes = np.asarray(assets["classes"], dtype=object)
+    statuses = classes[prediction_probs.argmax(axis=1)]
+
+    diagnoses, treatments, prescriptions = generate_documentation_batch(statuses, raw_df)
+
+    for row, i in enumerate(valid_positions):
+        results[i] = {
             "success": True,
-            "status": predicted_status,
-            "confidence_scores": confidence_dict,
-            "diagnosis_text": diagnosis,
-            "treatment_text": treatment,
-            "prescriptions": prescriptions,
+            "status": statuses[row],
+            "confidence_scores": dict(zip(assets["classes"], prediction_probs[row].astype(float).tolist())),
+            "diagnosis_text": diagnoses[row],
+            "treatment_text": treatments[row],
+            "prescriptions": prescriptions[row],
+        }
+    return results
+
+
+def _group_by_model(records, registry):
+    """Groups record positions by the registry key that should score them."""
+    groups = {}
+    unrouted = {}
+    for i, record in enumerate(records):
+        species = (record.get('species') or 'cat') if isinstance(record, dict) else 'cat'
+        breed = record.get('breed') if isinstance(record, dict) else None
+        key = registry.resolve(species, breed)
+        if key is None:
+            unrouted[i] = f"No model registered for species '{species}'"
+        else:
+            groups.setdefault(key, []).append(i)
+    return groups, unrouted
+
+
+def predict_single(raw_data, assets, on_scored=None):
+    """Validates, scores and documents a single record."""
+    # Reject malformed input before paying for preprocessing
+    validation_errors = assets["schema"].validate_record(raw_data)
+    if validation_errors:
+        return invalid_input_output(validation_errors)
+
+    # Preprocess input
+    start = time.perf_counter()
+    X_new_processed = preprocess_and_align_data(raw_data, assets["training_cols"])
+    preprocessed = time.perf_counter()
+
+    # Make prediction
+    prediction_probs = predict_probs(X_new_processed, assets)
+    if on_scored:
+        on_scored(X_new_processed, prediction_probs, _timings(start, preprocessed))
+    predicted_class_idx = prediction_probs[0].argmax()
+
+    classes = assets["classes"]
+    predicted_status = classes[predicted_class_idx]
+
+    # Get confidence scores
+    confidence_dict = {
+        classes[i]: float(prediction_probs[0][i]) for i in range(len(classes))
+    }
+
+    # Generate documentation
+    diagnosis, treatment, prescriptions = generate_documentation(predicted_status, raw_data)
+
+    # Prepare output
+    return {
+        "success": True,
+        "status": predicted_status,
+        "confidence_scores": confidence_dict,
+        "diagnosis_text": diagnosis,
+        "treatment_text": treatment,
+        "prescriptions": prescriptions,
+        "prediction_timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def _sweep_values(spec, assets):
+    """(feature, values, kind) for one sweep spec; kind is 'categorical', 'boolean' or 'numeric'."""
+    feature = spec.get("feature")
+    levels = assets["categorical_levels"]
+    if feature in levels:
+        values = list(spec.get("values") or levels[feature])
+        unknown = [v for v in values if v not in levels[feature]]
+        if unknown:
+            raise ValueError(f"unknown {feature} levels {unknown}; expected one of {levels[feature]}")
+        return feature, values, "categorical"
+    if feature in OPEN_CATEGORICAL_FIELDS:
+        # Any value is allowed; levels without a one-hot column score as the baseline level
+        known = [c[len(feature) + 1:] for c in assets["training_cols"] if c.startswith(f"{feature}_")]
+        return feature, [str(v) for v in spec.get("values") or known], "categorical"
+    if feature in BOOLEAN_FIELDS:
+        values = list(spec.get("values", [False, True]))
+        # Same rule as input validation: booleans or 0/1, never truthy strings
+        invalid = [v for v in values if not isinstance(v, bool) and v not in (0, 1)]
+        if invalid:
+            raise ValueError(f"{feature} sweep values must be booleans (or 0/1), got {invalid}")
+        return feature, [bool(v) for v in values], "boolean"
+    if feature not in assets["training_cols"]:
+        raise ValueError(f"cannot sweep '{feature}': not a model feature")
+
+    lo, hi = NUMERIC_RANGES.get(feature, (None, None, None))[:2]
+    if "values" in spec:
+        values = [float(v) for v in spec["values"]]
+    else:
+        start, stop = spec.get("start", lo), spec.get("stop", hi)
+        if start is None or stop is None:
+            raise ValueError(f"sweep over '{feature}' needs 'values' or 'start'/'stop'")
+        steps = int(spec.get("steps", WHAT_IF_DEFAULT_STEPS))
+        if steps < 1:
+            raise ValueError(f"sweep over '{feature}' needs at least 1 step, got {steps}")
+        values = np.linspace(float(start), float(stop), steps).tolist()
+    if lo is not None and any(not lo <= v <= hi for v in values):
+        raise ValueError(f"{feature} sweep leaves the valid range [{lo}, {hi}]")
+    return feature, values, "numeric"
+
+
+def what_if(request, registry):
+    """Probability curves for one record with single features varied.
+
+    Request: {"record": {...}, "sweeps": [{"feature": "temperature", "start": 37, "stop": 41, "steps": 41},
+                                          {"feature": "hydration_status"}, ...]}
+    A numeric sweep takes "values" or "start"/"stop"/"steps" (default: the
+    field's valid range); a categorical or boolean sweep defaults to every level
+    (for breed: every breed with its own one-hot column).
+
+    The record is encoded once; every variant is a copy of that row with only
+    the swept column (or one-hot block) changed, and all variants are scored
+    in one batch. Variants are hypothetical, so they bypass the prediction
+    cache, shadow scoring and the prediction log.
+    """
+    record = request.get("record") if isinstance(request, dict) else None
+    if not isinstance(record, dict):
+        return invalid_input_output([{"field": "record", "error": "invalid_type",
+                                      "message": "what_if needs a 'record' object"}])
+    key, assets = registry.get(record.get('species') or 'cat', record.get('breed'))
+    validation_errors = assets["schema"].validate_record(record)
+    if validation_errors:
+        return invalid_input_output(validation_errors)
+
+    try:
+        specs = [_sweep_values(spec, assets) for spec in request.get("sweeps") or []]
+    except (ValueError, TypeError, AttributeError) as e:
+        return error_output(e)
+    n_rows = 1 + sum(len(values) for _, values, _ in specs)
+    if n_rows > WHAT_IF_MAX_ROWS:
+        return error_output(ValueError(f"{n_rows} variants requested; the limit is {WHAT_IF_MAX_ROWS}"))
+
+    start = time.perf_counter()
+    training_cols = assets["training_cols"]
+    col_index = {c: i for i, c in enumerate(training_cols)}
+    base = preprocess_and_align_data(record, training_cols).to_numpy(dtype=np.float64)
+
+    # Row 0 is the record as given; each sweep fills a contiguous block of rows after it
+    matrix = np.repeat(base, n_rows, axis=0)
+    blocks = []
+    row = 1
+    for feature, values, kind in specs:
+        rows = slice(row, row + len(values))
+        if kind == "categorical":
+            onehot = [col_index[c] for c in training_cols if c.startswith(f"{feature}_")]
+            matrix[rows, onehot] = 0
+            for offset, level in enumerate(values):
+                col = col_index.get(f"{feature}_{level}")  # None for the baseline (dropped) level
+                if col is not None:
+                    matrix[row + offset, col] = 1
+        else:
+            matrix[rows, col_index[feature]] = np.asarray(values, dtype=np.float64)
+        blocks.append((feature, values, rows))
+        row += len(values)
+    preprocessed = time.perf_counter()
+
+    probs = assets["model"].predict_proba(pd.DataFrame(matrix, columns=training_cols, copy=False))
+    classes = assets["classes"]
+    statuses = np.asarray(classes, dtype=object)[probs.argmax(axis=1)]
+
+    curves = []
+    for feature, values, rows in blocks:
+        curve_status = statuses[rows].tolist()
+        curves.append({
+            "feature": feature,
+            "values": values,
+            "probabilities": {c: probs[rows, i].astype(float).tolist() for i, c in enumerate(classes)},
+            "status": curve_status,
+            "status_changes_at": [v for v, s in zip(values, curve_status) if s != statuses[0]],
+        })
+    return {
+        "success": True,
+        "model": key,
+        "baseline": {"status": statuses[0],
+                     "confidence_scores": dict(zip(classes, probs[0].astype(float).tolist()))},
+        "curves": curves,
+        "rows_scored": n_rows,
+        "timings": _timings(start, preprocessed),
+    }
+
+
+_feature_store = None
+# Set by the --serve modes: background work that outlives a request needs a resident worker
+_resident_worker = False
+_shadow = None
+_prediction_log = None
+_prediction_cache = None
+
+
+def prediction_cache():
+    """The shared prediction cache configured by PETVET_PREDICTION_CACHE (see prediction_cache.py), or None."""
+    global _prediction_cache
+    if _prediction_cache is None and os.environ.get(PREDICTION_CACHE_ENV):
+        from prediction_cache import cache_from_env
+        _prediction_cache = cache_from_env()
+    return _prediction_cache
+
+
+def predict_probs(X, assets):
+    """Class probabilities for encoded rows, through the shared cache when one is configured."""
+    cache = prediction_cache()
+    if cache is None:
+        return assets["model"].predict_proba(X)
+    return cache.predict_proba(assets["model"], X, assets["version"])
+
+
+def shadow_runner():
+    """The shadow model runner configured by PETVET_SHADOW_MODELS (see shadow.py), or None.
+
+    Always None in one-shot mode (see _resident_worker).
+    """
+    global _shadow
+    if _shadow is None and _resident_worker and os.environ.get(SHADOW_MODELS_ENV):
+        from shadow import runner_from_env
+        _shadow = runner_from_env()
+    return _shadow
+
+
+def prediction_log():
+    """The prediction log writer configured by PETVET_PREDICTION_LOG (see prediction_log.py), or None."""
+    global _prediction_log
+    if _prediction_log is None and os.environ.get(PREDICTION_LOG_ENV):
+        from prediction_log import writer_from_env
+        _prediction_log = writer_from_env(background=_resident_worker)
+    return _prediction_log
+
+
+def _scored_callback(key, assets):
+    """on_scored hook feeding the shadow runner and the prediction log (None if neither is enabled)."""
+    runner = shadow_runner()
+    log = prediction_log()
+    if runner is None and log is None:
+        return None
+    version = assets.get("version", key)
+
+    def on_scored(X, probs, timings):
+        if runner:
+            runner.submit(key, X, probs, assets["classes"])
+        if log:
+            log.log(version, assets["training_cols"], assets["classes"], X, probs, timings)
+    return on_scored
+
+
+def close_background_writers():
+    """Drains the shadow runner and prediction log (after the response has been written)."""
+    if _shadow is not None:
+        _shadow.close()
+    if _prediction_log is not None:
+        _prediction_log.close()
+
+
+def attach_history(record, output):
+    """Adds the pet's longitudinal features to a successful output, if a store is configured."""
+    global _feature_store
+    store_path = os.environ.get(FEATURE_STORE_ENV)
+    if not store_path or not output.get("success") or not isinstance(record, dict):
+        return
+    pet_id = record.get('pet_id')
+    if pet_id is None:
+        return
+    if _feature_store is None:
+        from feature_store import FeatureStore
+        _feature_store = FeatureStore(store_path)
+    output["history"] = _feature_store.lookup(pet_id)
+
+
+def handle_request(raw_data, registry):
+    """Routes a single record or a batch to the right model(s) and returns the output dict."""
+    if isinstance(raw_data, list):
+        results = [None] * len(raw_data)
+        groups, unrouted = _group_by_model(raw_data, registry)
+        for i, message in unrouted.items():
+            results[i] = {"success": False, "status": None, "error": message}
+        for key, positions in groups.items():
+            assets = registry.get_by_key(key)
+            group_results = predict_batch([raw_data[i] for i in positions], assets,
+                                          _scored_callback(key, assets))
+            for i, result in zip(positions, group_results):
+                result["model"] = key
+                attach_history(raw_data[i], result)
+                results[i] = result
+        return {
+            "success": True,
+            "results": results,
             "prediction_timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
         }
 
+    if not isinstance(raw_data, dict):
+        return invalid_input_output([{"field": None, "error": "invalid_type",
+                                      "message": "record must be a JSON object"}])
+    if "what_if" in raw_data:
+        return what_if(raw_data["what_if"], registry)
+
+    key, assets = registry.get(raw_data.get('species') or 'cat', raw_data.get('breed'))
+    output = predict_single(raw_data, assets, _scored_callback(key, assets))
+    output["model"] = key
+    attach_history(raw_data, output)
+    return output
+
+
+def error_output(e):
+    return {
+        "success": False,
+        "status": None,
+        "error": str(e),
+    }
+
+
+def process_request(raw_data, registry, profile_mode=None):
+    """handle_request, optionally under the profiler (env var, or "_profile" flag if allowed)."""
+    if isinstance(raw_data, dict) and raw_data.pop('_profile', False) and request_profiling_allowed():
+        profile_mode = profile_mode or "all"
+
+    with maybe_profile("inference", profile_mode) as profile:
+        output = handle_request(raw_data, registry)
+
+    if profile:
+        output["profile"] = profile
+    return output
+
+
+def handle_command(command, registry, state):
+    """Control commands accepted in --serve mode."""
+    name = command.get("command")
+    if name == "profile":
+        if not request_profiling_allowed():
+            return {"success": False, "command": name, "error": "Request profiling needs PETVET_PROFILE_DIR"}
+        state["profile_remaining"] = int(command.get("count", 1))
+        return {"success": True, "command": name, "capturing": state["profile_remaining"]}
+    if name == "stats":
+        runner = shadow_runner()
+        return {"success": True, "command": name, "registry": registry.stats(),
+                "shadow": runner.stats() if runner else None,
+                "prediction_log": _prediction_log.stats() if _prediction_log else None,
+                "prediction_cache": _prediction_cache.stats() if _prediction_cache else None}
+    return {"success": False, "command": name, "error": f"Unknown command: {name}"}
+
+
+def serve(registry, stream_in=sys.stdin, stream_out=sys.stdout):
+    """Long-running worker mode: one JSON request per input line, one JSON result per output line.
+
+    Models stay resident between requests (subject to the registry's memory budget).
+    Lines of the form {"command": ...} are control commands (see handle_command).
+    """
+    env_profile_mode = profile_mode_from_env()
+    state = {"profile_remaining": 0}
+
+    for line in stream_in:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            raw_data = json.loads(line)
+            if isinstance(raw_data, dict) and "command" in raw_data:
+                output = handle_command(raw_data, registry, state)
+            else:
+                profile_mode = env_profile_mode
+                if state["profile_remaining"] > 0:
+                    state["profile_remaining"] -= 1
+                    profile_mode = profile_mode or "all"
+                output = process_request(raw_data, registry, profile_mode)
+        except Exception as e:
+            output = error_output(e)
+        stream_out.write(json.dumps(output) + "\n")
+        stream_out.flush()
+
+
+def score_encoded(features, assets, documentation=True):
+    """Scores an already-encoded float32 block (columns in training_cols order).
+
+    Returns (probs, diagnosis_idx, template_idx); the documentation indices are
+    derived from the one-hot symptom columns and are None if not requested.
+    """
+    X = pd.DataFrame(features, columns=assets["training_cols"], copy=False)
+    probs = predict_probs(X, assets)
+    if not documentation:
+        return probs, None, None
+    statuses = np.asarray(assets["classes"], dtype=object)[probs.argmax(axis=1)]
+    diagnosis_idx, template_idx = documentation_indices(
+        statuses,
+        X['vomiting'].to_numpy() > 0.5,
+        X['energy_level_lethargic'].to_numpy() > 0.5,
+        X['mucous_membrane_color_pale'].to_numpy() > 0.5,
+    )
+    return probs, diagnosis_idx, template_idx
+
+
+def serve_binary(registry, stream_in=None, stream_out=None):
+    """Long-running worker speaking length-prefixed binary frames (see framing.py)."""
+    import framing
+
+    stream_in = stream_in or sys.stdin.buffer
+    stream_out = stream_out or sys.stdout.buffer
+
+    while True:
+        try:
+            body = framing.read_frame(stream_in)
+        except framing.FrameError as e:
+            framing.write_frame(stream_out, *framing.encode_json_response(0, {"error": str(e)}, error=True))
+            return
+        if body is None:
+            return
+        msg_type = 0
+        try:
+            msg_type, flags, key, features = framing.decode_request(body)
+            assets = registry.get_by_key(key or 'cat')
+            if msg_type == framing.MSG_LAYOUT:
+                parts = framing.encode_json_response(msg_type, {
+                    "training_cols": assets["training_cols"],
+                    "classes": list(assets["classes"]),
+                    "diagnosis_table": DIAGNOSIS_TABLE.tolist(),
+                    "treatment_table": TREATMENT_TABLE.tolist(),
+                    "prescription_table": PRESCRIPTION_TABLE.tolist(),
+                })
+            elif msg_type == framing.MSG_SCORE:
+                if features.shape[1] != len(assets["training_cols"]):
+                    raise ValueError(f"expected {len(assets['training_cols'])} features per row, "
+                                     f"got {features.shape[1]}")
+                start = time.perf_counter()
+                probs, diagnosis_idx, template_idx = score_encoded(
+                    features, assets, bool(flags & framing.FLAG_DOCUMENTATION))
+                timings = {"preprocess_ms": 0.0, "predict_ms": (time.perf_counter() - start) * 1000}
+                callback = _scored_callback(key or 'cat', assets)
+                if callback:
+                    callback(pd.DataFrame(features, columns=assets["training_cols"]), probs, timings)
+                parts = framing.encode_score_response(probs, diagnosis_idx, template_idx)
+            else:
+                raise ValueError(f"Unknown message type {msg_type}")
+        except Exception as e:
+            parts = framing.encode_json_response(msg_type, {"error": str(e)}, error=True)
+        framing.write_frame(stream_out, *parts)
+
+
+def main():
+    """Main prediction function."""
+    global _resident_worker
+    from model_registry import build_default_registry
+
+    try:
+        registry = build_default_registry(load_model_assets, load_compact_assets)
+
+        if "--serve" in sys.argv[1:] or "--serve-binary" in sys.argv[1:]:
+            _resident_worker = True
+            shadow_runner()  # load shadow candidates before the first request, not during it
+            if "--serve-binary" in sys.argv[1:]:
+                serve_binary(registry)
+            else:
+                serve(registry)
+            close_background_writers()
+            return
+
+        # Read input from stdin
+        input_json = sys.stdin.read()
+        raw_data = json.loads(input_json)
+
+        output = process_request(raw_data, registry, profile_mode_from_env())
         print(json.dumps(output))
+        sys.stdout.flush()
+        # The prediction log entry is only written once the response is out
+        close_background_writers()
+        if not output["success"]:
+            sys.exit(1)
 
     except Exception as e:
-        error_output = {
-            "success": False,
-            "status": None,
-            "error": str(e),
-        }
-        print(json.dumps(error_output))
+        print(json.dumps(error_output(e)))
         sys.exit(1)
 
 
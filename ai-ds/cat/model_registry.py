@@ -0,0 +1,163 @@
+"""
+Model Registry
+Hosts the species (and optional breed-specific) models served by the
+inference worker.
+
+Models are registered with a loader and loaded lazily on first request.
+Resident models are kept in least-recently-used order; when the estimated
+size of all resident models exceeds the memory budget, the least recently
+used ones are evicted (the model just requested is never evicted).
+
+Model sizes are approximate: a pickled model counts as its serialized size
+scaled by PICKLE_RESIDENT_FACTOR, a compact model as its array bytes. The
+process's RSS growth during a load is not used, because the first load also
+pulls in the xgboost library (~100 MB), which evicting a model never frees.
+
+Configuration:
+  PETVET_MODEL_MEMORY_MB   memory budget for resident models (default: unlimited)
+  PETVET_MODEL_REGISTRY    optional JSON file with extra models:
+    [
+      {"species": "cat", "breed": "Persian", "compact": "persian.compact.npz"},
+      {"species": "dog", "model": "dog_model.pkl", "dataset": "dog_dataset.csv"}
+    ]
+"""
+
+import os
+import json
+import pickle
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+MEMORY_BUDGET_ENV = "PETVET_MODEL_MEMORY_MB"
+REGISTRY_FILE_ENV = "PETVET_MODEL_REGISTRY"
+# Resident size of a loaded (and used) XGBClassifier relative to its pickle:
+# about 1.2-1.3x for the cat model over repeated loads, rounded up
+PICKLE_RESIDENT_FACTOR = 1.5
+
+
+def model_key(species, breed=None):
+    """Registry key: 'cat' for a species model, 'cat/persian' for a breed model."""
+    species = str(species).strip().lower()
+    return f"{species}/{str(breed).strip().lower()}" if breed else species
+
+
+def estimate_assets_bytes(assets):
+    """Approximate resident size of loaded model assets from their serialized size."""
+    model = assets["model"]
+    if hasattr(model, "nbytes"):
+        size = model.nbytes
+    else:
+        size = int(len(pickle.dumps(model)) * PICKLE_RESIDENT_FACTOR)
+    return size + 64 * len(assets.get("training_cols", []))
+
+
+class ModelRegistry:
+    """Lazily loads models by species/breed and evicts them under a memory budget."""
+
+    def __init__(self, memory_budget_bytes=None):
+        self.memory_budget_bytes = memory_budget_bytes
+        self._loaders = {}
+        self._resident = OrderedDict()  # key -> (assets, size), oldest first
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    def register(self, species, loader, breed=None):
+        """Registers a zero-argument loader returning model assets."""
+        self._loaders[model_key(species, breed)] = loader
+
+    def registered(self):
+        return sorted(self._loaders)
+
+    def resolve(self, species, breed=None):
+        """Returns the most specific registered key for species/breed, or None."""
+        if breed:
+            key = model_key(species, breed)
+            if key in self._loaders:
+                return key
+        key = model_key(species)
+        return key if key in self._loaders else None
+
+    def get(self, species, breed=None):
+        """Returns (key, assets) for the best matching model, loading it if needed."""
+        key = self.resolve(species, breed)
+        if key is None:
+            raise LookupError(f"No model registered for species '{species}'")
+        return key, self.get_by_key(key)
+
+    def get_by_key(self, key):
+        with self._lock:
+            if key in self._resident:
+                self._resident.move_to_end(key)
+                return self._resident[key][0]
+
+            assets = self._loaders[key]()
+            self._resident[key] = (assets, estimate_assets_bytes(assets))
+            self.loads += 1
+            self._evict_over_budget(keep=key)
+            return assets
+
+    def evict(self, key):
+        with self._lock:
+            if self._resident.pop(key, None) is not None:
+                self.evictions += 1
+
+    def resident_bytes(self):
+        return sum(size for _, size in self._resident.values())
+
+    def stats(self):
+        return {
+            "registered": self.registered(),
+            "resident": list(self._resident),
+            "resident_bytes": self.resident_bytes(),
+            "memory_budget_bytes": self.memory_budget_bytes,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
+
+    def _evict_over_budget(self, keep):
+        if self.memory_budget_bytes is None:
+            return
+        while self.resident_bytes() > self.memory_budget_bytes and len(self._resident) > 1:
+            oldest = next(iter(self._resident))
+            if oldest == keep:
+                self._resident.move_to_end(oldest)
+                continue
+            del self._resident[oldest]
+            self.evictions += 1
+
+
+def _entry_loader(entry, base_dir, load_model_assets, load_compact_assets):
+    """Builds a loader for one registry-file entry."""
+    def resolve_path(p):
+        p = Path(p)
+        return p if p.is_absolute() else base_dir / p
+
+    if "compact" in entry:
+        return lambda: load_compact_assets(resolve_path(entry["compact"]))
+    return lambda: load_model_assets(
+        model_file=resolve_path(entry["model"]),
+        dataset_file=resolve_path(entry["dataset"]) if "dataset" in entry else None,
+    )
+
+
+def build_default_registry(load_model_assets, load_compact_assets):
+    """Registry with the built-in cat model plus any models from PETVET_MODEL_REGISTRY.
+
+    The loaders are passed in by ml_inference.py: importing them here would load
+    a second copy of that module when it runs as __main__.
+    """
+    budget_mb = os.environ.get(MEMORY_BUDGET_ENV)
+    registry = ModelRegistry(int(float(budget_mb) * 1024 * 1024) if budget_mb else None)
+    registry.register("cat", load_model_assets)
+
+    registry_file = os.environ.get(REGISTRY_FILE_ENV)
+    if registry_file:
+        registry_path = Path(registry_file)
+        with open(registry_path) as f:
+            for entry in json.load(f):
+                loader = _entry_loader(entry, registry_path.parent, load_model_assets, load_compact_assets)
+                registry.register(entry["species"], loader, entry.get("breed"))
+
+    return registry
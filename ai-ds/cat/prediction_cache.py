@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Shared Prediction Cache
+On-disk cache of class probabilities shared by every inference process on a
+node, so re-analysing the same pet hits the cache whichever worker serves
+the request, and survives restarts.
+
+Key: 128-bit BLAKE2b of the model version plus the encoded float32 feature
+row (training column order), so anything that changes the model input or the
+model changes the key (the version includes a hash of the model file). Value: the float32 probability vector.
+
+Storage is SQLite in WAL mode (concurrent readers alongside one writer,
+memory-mapped reads). Each entry records when it was last used; hits refresh
+that at most every TOUCH_INTERVAL_S, and once the table grows past
+max_entries the least recently used entries are evicted. Cache errors (e.g.
+a locked database) count as misses and never fail a request.
+
+Enable in ml_inference.py with PETVET_PREDICTION_CACHE=<path to .sqlite>
+(optionally PETVET_PREDICTION_CACHE_MAX_ENTRIES).
+
+Usage:
+  python prediction_cache.py stats prediction_cache.sqlite
+  python prediction_cache.py clear prediction_cache.sqlite
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import argparse
+
+import numpy as np
+
+PREDICTION_CACHE_ENV = "PETVET_PREDICTION_CACHE"
+MAX_ENTRIES_ENV = "PETVET_PREDICTION_CACHE_MAX_ENTRIES"
+DEFAULT_MAX_ENTRIES = 1_000_000
+# Evict down to this share of max_entries, so eviction runs in batches
+EVICT_TO = 0.9
+EVICT_CHECK_EVERY = 1000
+TOUCH_INTERVAL_S = 60.0
+MMAP_BYTES = 256 * 1024 * 1024
+SQL_BATCH = 500
+
+
+def row_keys(X, version):
+    """Cache keys for each encoded row of X."""
+    rows = np.ascontiguousarray(X, dtype=np.float32) + np.float32(0.0)  # -0.0 -> 0.0
+    prefix = hashlib.blake2b(version.encode("utf-8"), digest_size=16).digest()
+    return [hashlib.blake2b(row.tobytes(), digest_size=16, key=prefix).digest() for row in rows]
+
+
+class PredictionCache:
+    """SQLite-backed LRU cache of probability vectors."""
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(f"PRAGMA mmap_size={MMAP_BYTES}")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            " key BLOB PRIMARY KEY, version TEXT NOT NULL, probs BLOB NOT NULL, last_used REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS predictions_last_used ON predictions (last_used)")
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.evicted = 0
+        self._puts_since_check = 0
+
+    def get_many(self, keys):
+        """{key: probs} for the keys present; refreshes their last-used time."""
+        found = {}
+        now = time.time()
+        stale = []
+        for i in range(0, len(keys), SQL_BATCH):
+            chunk = keys[i:i + SQL_BATCH]
+            marks = ",".join("?" * len(chunk))
+            for key, probs, last_used in self.conn.execute(
+                    f"SELECT key, probs, last_used FROM predictions WHERE key IN ({marks})", chunk):
+                found[key] = np.frombuffer(probs, dtype=np.float32)
+                if now - last_used > TOUCH_INTERVAL_S:
+                    stale.append(key)
+        for i in range(0, len(stale), SQL_BATCH):
+            chunk = stale[i:i + SQL_BATCH]
+            self.conn.execute(f"UPDATE predictions SET last_used = ? WHERE key IN ({','.join('?' * len(chunk))})",
+                              [now, *chunk])
+        return found
+
+    def put_many(self, keys, version, probs):
+        now = time.time()
+        rows = [(key, version, np.asarray(p, dtype=np.float32).tobytes(), now) for key, p in zip(keys, probs)]
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.executemany("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)", rows)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        self._puts_since_check += len(rows)
+        if self._puts_since_check >= EVICT_CHECK_EVERY:
+            self._puts_since_check = 0
+            self.evict()
+
+    def evict(self):
+        """Drops least recently used entries once the table is over max_entries."""
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM predictions").fetchone()
+        if count <= self.max_entries:
+            return 0
+        excess = count - int(self.max_entries * EVICT_TO)
+        self.conn.execute(
+            "DELETE FROM predictions WHERE key IN "
+            "(SELECT key FROM predictions ORDER BY last_used LIMIT ?)", (excess,))
+        self.evicted += excess
+        return excess
+
+    def predict_proba(self, model, X, version):
+        """model.predict_proba(X), answering rows seen before from the cache."""
+        try:
+            keys = row_keys(X, version)
+            found = self.get_many(keys)
+        except sqlite3.Error:
+            self.errors += 1
+            return model.predict_proba(X)
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        if len(found) == len(keys):
+            return np.vstack([found[k] for k in keys])
+
+        miss = [i for i, k in enumerate(keys) if k not in found]
+        X_miss = X.iloc[miss] if hasattr(X, "iloc") else X[miss]
+        miss_probs = model.predict_proba(X_miss)
+        try:
+            self.put_many([keys[i] for i in miss], version, miss_probs)
+        except sqlite3.Error:
+            self.errors += 1
+        if not found:
+            return miss_probs
+
+        probs = np.empty((len(keys), miss_probs.shape[1]), dtype=miss_probs.dtype)
+        probs[miss] = miss_probs
+        for i, k in enumerate(keys):
+            if k in found:
+                probs[i] = found[k]
+        return probs
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "errors": self.errors, "evicted": self.evicted,
+                "hit_rate": self.hits / lookups if lookups else None}
+
+    def close(self):
+        self.conn.close()
+
+
+def cache_from_env():
+    path = os.environ.get(PREDICTION_CACHE_ENV)
+    if not path:
+        return None
+    return PredictionCache(path, int(os.environ.get(MAX_ENTRIES_ENV, DEFAULT_MAX_ENTRIES)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the shared prediction cache.")
+    parser.add_argument("command", choices=["stats", "clear"])
+    parser.add_argument("path")
+    args = parser.parse_args()
+
+    cache = PredictionCache(args.path)
+    if args.command == "clear":
+        cache.conn.execute("DELETE FROM predictions")
+        cache.conn.execute("VACUUM")
+        print(f"✅ Cleared {args.path}")
+        return
+
+    rows = cache.conn.execute(
+        "SELECT version, COUNT(*), MIN(last_used), MAX(last_used) FROM predictions GROUP BY version").fetchall()
+    size = sum(os.path.getsize(p) for p in (args.path, args.path + "-wal") if os.path.exists(p))
+    print(f"{args.path}: {sum(r[1] for r in rows)} entries, {size / 1e6:.1f} MB")
+    for version, count, oldest, newest in rows:
+        print(f"  {version}: {count} entries, last used "
+              f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(oldest))} .. "
+              f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(newest))}")
+
+
+if __name__ == "__main__":
+    main()
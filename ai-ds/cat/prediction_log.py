@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Prediction Log
+Append-only binary log of every scored request: encoded feature vectors,
+model version, class probabilities and timings, for audit and as
+training / evaluation input.
+
+The request path only enqueues references (no copies, no I/O); a background
+thread packs records into a buffered file and rotates it at a size limit.
+If the queue is full the entry is dropped and counted instead of blocking.
+Each writer creates its own files (predictions-<time>-<pid>-<n>.pvlog,
+opened exclusively), so workers started together never share one.
+
+One-shot processes (ml_inference.py without --serve) have no time for a
+background thread: PredictionLogSpool keeps the request's records in memory
+and close() appends them, after the response has been printed, as one locked
+write to a per-day file shared by all of them (predictions-<day>-spool-<n>.pvlog).
+
+File layout (little-endian), a sequence of records:
+  u32 body length, u8 kind, then the body
+  kind 0 schema:     utf-8 JSON {"version", "columns", "classes"}; written the
+                     first time a model version appears in each file (in
+                     spool files: before every prediction record)
+  kind 1 prediction: f64 unix time, f32 preprocess ms, f32 predict ms,
+                     u32 rows, u16 features, u16 classes, u16 version length,
+                     version (utf-8), float32[rows * features], float32[rows * classes]
+
+Enable in ml_inference.py with PETVET_PREDICTION_LOG=<directory>.
+
+Usage:
+  python prediction_log.py summary logs/predictions
+  python prediction_log.py export logs/predictions predictions.csv
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import struct
+import argparse
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: spool appends rely on O_APPEND alone
+    fcntl = None
+
+PREDICTION_LOG_ENV = "PETVET_PREDICTION_LOG"
+MAX_FILE_BYTES = 64 * 1024 * 1024
+QUEUE_SIZE = 10_000
+WRITE_BUFFER_BYTES = 1024 * 1024
+FLUSH_INTERVAL_S = 1.0
+FILE_PATTERN = "predictions-*.pvlog"
+
+PREFIX = struct.Struct("<IB")
+PREDICTION = struct.Struct("<dffIHHH")
+KIND_SCHEMA = 0
+KIND_PREDICTION = 1
+
+
+def _schema_body(version, columns, classes):
+    return json.dumps({"version": version, "columns": list(columns), "classes": list(classes)}).encode("utf-8")
+
+
+def _prediction_parts(ts, version, X, probs, timings):
+    features = np.ascontiguousarray(X, dtype=np.float32)
+    probs = np.ascontiguousarray(probs, dtype=np.float32)
+    version_bytes = version.encode("utf-8")
+    header = PREDICTION.pack(ts, timings.get("preprocess_ms", 0.0), timings.get("predict_ms", 0.0),
+                             features.shape[0], features.shape[1], probs.shape[1], len(version_bytes))
+    return header, version_bytes, features.tobytes(), probs.tobytes()
+
+
+def _record_error(writer, e):
+    """Counts a failed write; the first one per writer is reported on stderr."""
+    writer.errors += 1
+    writer.dropped += 1
+    if writer.errors == 1:
+        print(f"⚠️  Prediction log write failed: {e!r} (further errors are only counted)", file=sys.stderr)
+
+
+class PredictionLogWriter:
+    """Background writer for size-rotated prediction log files."""
+
+    def __init__(self, directory, max_bytes=MAX_FILE_BYTES, queue_size=QUEUE_SIZE):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.written = 0
+        self.errors = 0
+        self._file = None
+        self._file_bytes = 0
+        self._schemas_in_file = set()
+        self.thread = threading.Thread(target=self._run, name="prediction-log", daemon=True)
+        self.thread.start()
+
+    def log(self, version, columns, classes, X, probs, timings):
+        """Queues one scored batch; returns immediately."""
+        try:
+            self.queue.put_nowait((time.time(), version, columns, classes, X, probs, timings))
+        except queue.Full:
+            self.dropped += 1
+
+    # --- Background thread ---
+
+    def _open_next(self):
+        if self._file:
+            self._file.close()
+        stamp = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        n = 0
+        while True:
+            try:
+                self._file = open(self.directory / f"predictions-{stamp}-{n:03d}.pvlog", "xb",
+                                  buffering=WRITE_BUFFER_BYTES)
+                break
+            except FileExistsError:
+                n += 1
+        self._file_bytes = 0
+        self._schemas_in_file = set()
+
+    def _write(self, kind, *parts):
+        length = sum(len(p) for p in parts)
+        self._file.write(PREFIX.pack(length, kind))
+        for part in parts:
+            self._file.write(part)
+        self._file_bytes += PREFIX.size + length
+
+    def _append(self, ts, version, columns, classes, X, probs, timings):
+        if self._file is None or self._file_bytes >= self.max_bytes:
+            self._open_next()
+        if version not in self._schemas_in_file:
+            self._write(KIND_SCHEMA, _schema_body(version, columns, classes))
+            self._schemas_in_file.add(version)
+        self._write(KIND_PREDICTION, *_prediction_parts(ts, version, X, probs, timings))
+        self.written += 1
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self.queue.get(timeout=FLUSH_INTERVAL_S)
+            except queue.Empty:
+                item = ()
+            try:
+                if item is None:
+                    break
+                if item:
+                    self._append(*item)
+                if self._file and (self.queue.empty() or time.monotonic() - last_flush > FLUSH_INTERVAL_S):
+                    self._file.flush()
+                    last_flush = time.monotonic()
+            except Exception as e:
+                _record_error(self, e)
+            finally:
+                if item != ():
+                    self.queue.task_done()
+        if self._file:
+            self._file.close()
+
+    def stats(self):
+        return {"written": self.written, "dropped": self.dropped, "errors": self.errors,
+                "queued": self.queue.qsize()}
+
+    def close(self, timeout=10.0):
+        """Writes out what is queued and closes the current file."""
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self.thread.join(timeout)
+
+
+class PredictionLogSpool:
+    """Deferred appender to shared per-day spool files, for one-shot processes.
+
+    log() only packs the entry (a schema record plus the prediction record);
+    close() writes everything packed so far in one write under an exclusive
+    lock, so concurrent processes never interleave records and each record
+    can be read without the rest of the file's history.
+    """
+
+    def __init__(self, directory, max_bytes=MAX_FILE_BYTES):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.dropped = 0
+        self.written = 0
+        self.errors = 0
+        self._pending = []
+
+    def _path(self):
+        """Today's first spool file still under max_bytes."""
+        day = time.strftime("%Y%m%d")
+        n = 0
+        while True:
+            path = self.directory / f"predictions-{day}-spool-{n:03d}.pvlog"
+            if not path.exists() or path.stat().st_size < self.max_bytes:
+                return path
+            n += 1
+
+    def log(self, version, columns, classes, X, probs, timings):
+        """Packs one scored batch; nothing is written until close()."""
+        records = ((KIND_SCHEMA, [_schema_body(version, columns, classes)]),
+                   (KIND_PREDICTION, _prediction_parts(time.time(), version, X, probs, timings)))
+        self._pending.append(b"".join(PREFIX.pack(sum(len(p) for p in parts), kind) + b"".join(parts)
+                                      for kind, parts in records))
+
+    def stats(self):
+        return {"written": self.written, "dropped": self.dropped, "errors": self.errors,
+                "queued": len(self._pending)}
+
+    def close(self):
+        """Appends the packed entries to today's spool file."""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        try:
+            with open(self._path(), "ab", buffering=0) as f:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                f.write(b"".join(pending))
+        except OSError as e:
+            _record_error(self, e)
+            self.dropped += len(pending) - 1
+            return
+        self.written += len(pending)
+
+
+def writer_from_env(background=True):
+    """PredictionLogWriter (or, for one-shot processes, PredictionLogSpool) for PETVET_PREDICTION_LOG."""
+    directory = os.environ.get(PREDICTION_LOG_ENV)
+    if not directory:
+        return None
+    return PredictionLogWriter(directory) if background else PredictionLogSpool(directory)
+
+
+# --- Reading ---
+
+def log_files(path):
+    """Log files under a directory (oldest first), or the single file given."""
+    path = Path(path)
+    return sorted(path.glob(FILE_PATTERN)) if path.is_dir() else [path]
+
+
+def iter_records(path, start_offsets=None):
+    """Streams prediction records from a log file or directory.
+
+    Yields dicts: timestamp, version, columns, classes, preprocess_ms,
+    predict_ms, features (rows x features), probs (rows x classes), plus the
+    file and the byte offset just past the record (end_offset).
+    `start_offsets` ({file path: offset}) resumes files where an earlier
+    reader stopped; schema records before the offset are still read.
+    A record truncated by a crash at the end of a file is skipped.
+    """
+    start_offsets = start_offsets or {}
+    for file in log_files(path):
+        schemas = {}
+        start = start_offsets.get(str(file), 0)
+        with open(file, "rb") as f:
+            offset = 0
+            while True:
+                prefix = f.read(PREFIX.size)
+                if len(prefix) < PREFIX.size:
+                    break
+                length, kind = PREFIX.unpack(prefix)
+                if offset < start and kind != KIND_SCHEMA:
+                    f.seek(length, 1)
+                    offset += PREFIX.size + length
+                    continue
+                body = f.read(length)
+                if len(body) < length:
+                    break
+                offset += PREFIX.size + length
+                if kind == KIND_SCHEMA:
+                    schema = json.loads(body)
+                    schemas[schema["version"]] = schema
+                    continue
+                ts, pre_ms, pred_ms, rows, n_features, n_classes, version_len = PREDICTION.unpack_from(body)
+                body_offset = PREDICTION.size
+                version = body[body_offset:body_offset + version_len].decode("utf-8")
+                body_offset += version_len
+                features = np.frombuffer(body, np.float32, rows * n_features, body_offset).reshape(rows, n_features)
+                body_offset += rows * n_features * 4
+                probs = np.frombuffer(body, np.float32, rows * n_classes, body_offset).reshape(rows, n_classes)
+                schema = schemas.get(version, {})
+                yield {
+                    "timestamp": ts,
+                    "version": version,
+                    "columns": schema.get("columns"),
+                    "classes": schema.get("classes"),
+                    "preprocess_ms": pre_ms,
+                    "predict_ms": pred_ms,
+                    "features": features,
+                    "probs": probs,
+                    "file": str(file),
+                    "end_offset": offset,
+                }
+
+
+def iter_frames(path, version=None):
+    """Streams the log as DataFrames: encoded features, p_<class> columns, status and timestamp."""
+    for record in iter_records(path):
+        if version and record["version"] != version:
+            continue
+        frame = pd.DataFrame(record["features"], columns=record["columns"])
+        for i, c in enumerate(record["classes"]):
+            frame[f"p_{c}"] = record["probs"][:, i]
+        frame["predicted_status"] = np.asarray(record["classes"], dtype=object)[record["probs"].argmax(axis=1)]
+        frame["model_version"] = record["version"]
+        frame["timestamp"] = record["timestamp"]
+        yield frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read prediction logs.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    summary = sub.add_parser("summary", help="Record counts and timings per model version")
+    summary.add_argument("path")
+    export = sub.add_parser("export", help="Write logged predictions to CSV")
+    export.add_argument("path")
+    export.add_argument("output")
+    export.add_argument("--version", default=None)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        rows = 0
+        for n, frame in enumerate(iter_frames(args.path, args.version)):
+            frame.to_csv(args.output, mode="w" if n == 0 else "a", header=n == 0, index=False)
+            rows += len(frame)
+        print(f"✅ {rows} logged predictions written to {args.output}")
+        return
+
+    per_version = {}
+    for record in iter_records(args.path):
+        s = per_version.setdefault(record["version"], {"requests": 0, "rows": 0, "predict_ms": [], "preprocess_ms": []})
+        s["requests"] += 1
+        s["rows"] += len(record["features"])
+        s["predict_ms"].append(record["predict_ms"])
+        s["preprocess_ms"].append(record["preprocess_ms"])
+    for version, s in per_version.items():
+        print(f"{version}: {s['requests']} requests, {s['rows']} records, "
+              f"median preprocess {np.median(s['preprocess_ms']):.2f} ms, "
+              f"median predict {np.median(s['predict_ms']):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
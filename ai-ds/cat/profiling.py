@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+On-demand Profiling
+Wraps a request or a whole script run in cProfile (CPU) and tracemalloc
+(allocations) and dumps the results to files:
+
+  <dir>/<label>_<timestamp>.prof   raw cProfile stats (pstats / snakeviz)
+  <dir>/<label>_<timestamp>.json   top hot functions and allocation sites
+
+Profiling is off unless requested:
+  PETVET_PROFILE=1|cpu|memory    profile every inference request (ml_inference.py)
+  PETVET_PROFILE_DIR=<dir>       output directory (default: ./profiles)
+  {"_profile": true, ...}        profile one request
+  {"command": "profile", "count": N}   in --serve mode, profile the next N requests
+The last two come from request input, so they are ignored unless
+PETVET_PROFILE_DIR is set: clients cannot make a worker write files by default.
+
+Profile any script (e.g. a training run):
+  python profiling.py train_model.py [script args...]
+"""
+
+import os
+import sys
+import json
+import time
+import runpy
+import pstats
+import cProfile
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+PROFILE_ENV = "PETVET_PROFILE"
+PROFILE_DIR_ENV = "PETVET_PROFILE_DIR"
+DEFAULT_PROFILE_DIR = "profiles"
+TOP_N = 25
+
+
+def profile_mode_from_env():
+    """Returns 'all', 'cpu', 'memory' or None from PETVET_PROFILE."""
+    value = os.environ.get(PROFILE_ENV, "").strip().lower()
+    if value in ("", "0", "false", "no", "off"):
+        return None
+    if value in ("cpu", "memory"):
+        return value
+    return "all"
+
+
+def profile_dir():
+    return Path(os.environ.get(PROFILE_DIR_ENV, DEFAULT_PROFILE_DIR))
+
+
+def request_profiling_allowed():
+    """Whether requests may ask to be profiled ("_profile" flag, "profile" command)."""
+    return bool(os.environ.get(PROFILE_DIR_ENV))
+
+
+def _hot_functions(profiler, top_n):
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, func), (cc, ncalls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            "function": f"{Path(filename).name}:{line}({func})",
+            "ncalls": ncalls,
+            "primitive_calls": cc,
+            "tottime": round(tottime, 6),
+            "cumtime": round(cumtime, 6),
+        })
+    by_cumulative = sorted(rows, key=lambda r: r["cumtime"], reverse=True)[:top_n]
+    by_self = sorted(rows, key=lambda r: r["tottime"], reverse=True)[:top_n]
+    return by_cumulative, by_self
+
+
+def _allocation_sites(snapshot, top_n):
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    return [
+        {
+            "site": f"{Path(stat.traceback[0].filename).name}:{stat.traceback[0].lineno}",
+            "size_bytes": stat.size,
+            "count": stat.count,
+        }
+        for stat in snapshot.statistics("lineno")[:top_n]
+    ]
+
+
+@contextmanager
+def profile_run(label, mode="all", out_dir=None, top_n=TOP_N):
+    """Profiles the enclosed block and writes .prof/.json files.
+
+    Yields a dict that is filled with the output paths once the block exits.
+    """
+    out_dir = Path(out_dir) if out_dir else profile_dir()
+    result = {}
+
+    profiler = cProfile.Profile() if mode in ("all", "cpu") else None
+    trace_memory = mode in ("all", "memory")
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    if trace_memory:
+        tracemalloc.reset_peak()
+
+    start = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    try:
+        yield result
+    finally:
+        if profiler:
+            profiler.disable()
+        elapsed = time.perf_counter() - start
+
+        summary = {"label": label, "mode": mode, "wall_seconds": round(elapsed, 6)}
+        if trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            summary["traced_current_bytes"] = current
+            summary["traced_peak_bytes"] = peak
+            summary["top_allocation_sites"] = _allocation_sites(tracemalloc.take_snapshot(), top_n)
+            if started_tracing:
+                tracemalloc.stop()
+
+        out_dir.mkdir(parents=True, exist_ok=True)
+        stem = f"{label}_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}_{int(start * 1e6) % 1000000:06d}"
+        if profiler:
+            summary["top_cumulative"], summary["top_self"] = _hot_functions(profiler, top_n)
+            prof_path = out_dir / f"{stem}.prof"
+            profiler.dump_stats(prof_path)
+            result["prof"] = str(prof_path)
+
+        json_path = out_dir / f"{stem}.json"
+        with open(json_path, "w") as f:
+            json.dump(summary, f, indent=2)
+        result["summary"] = str(json_path)
+
+
+@contextmanager
+def maybe_profile(label, mode):
+    """profile_run when mode is set, otherwise a no-op."""
+    if mode:
+        with profile_run(label, mode) as result:
+            yield result
+    else:
+        yield None
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    script = sys.argv[1]
+    sys.argv = sys.argv[1:]
+    sys.path.insert(0, str(Path(script).resolve().parent))
+
+    exit_code = 0
+    with profile_run(Path(script).stem, profile_mode_from_env() or "all") as result:
+        try:
+            runpy.run_path(script, run_name="__main__")
+        except SystemExit as e:
+            exit_code = e.code
+
+    print(f"\nProfile written to {result.get('summary')}", file=sys.stderr)
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
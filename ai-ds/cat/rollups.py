@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Prediction Rollups
+Population statistics over stored predictions (share of At Risk by breed,
+age band, clinic, month, ...) without rescanning raw logs or JSON exports
+for every dashboard query.
+
+Ingested predictions go to a columnar store partitioned by day:
+  <store>/partitions/date=YYYY-MM-DD/part-NNNNNN.npz
+    ts (f8), clinic / breed (i4 dictionary codes), age_months (f4),
+    status (i1 class index), probs (f4, rows x classes)
+and into a pre-aggregated rollup (<store>/rollups.npz): record counts and
+probability sums per (day, clinic, breed, age band, status). Each ingest
+merges its own aggregate into the rollup, so the rollup is maintained
+incrementally; queries group it with numpy (np.unique + np.bincount) and
+never touch the partitions unless --raw asks for a scan.
+
+Sources (resumed where the previous ingest stopped):
+  prediction logs  (prediction_log.py) byte offsets per log file; breed is
+                   read back from the one-hot columns ("unlisted" = the
+                   baseline level or a breed without its own column) and
+                   the clinic is unknown
+  record exports   (health_records.py) byte offset per export; records
+                   are scored with the current model on ingest
+
+Usage:
+  python rollups.py ingest-log logs/predictions
+  python rollups.py ingest-export export.jsonl
+  python rollups.py query --by breed,age_band
+  python rollups.py query --by month --clinic "Happy Paws" --since 2026-01-01 --output at_risk.csv
+  python rollups.py query --by breed --raw      (scan partitions instead of the rollup)
+  python rollups.py rebuild                     (recompute the rollup from the partitions)
+"""
+
+import os
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SCRIPT_DIR = Path(__file__).parent
+DEFAULT_STORE = SCRIPT_DIR / "analytics"
+DAY_SECONDS = 86400
+INGEST_BATCH_ROWS = 50_000
+
+UNKNOWN = "unknown"
+UNLISTED_BREED = "unlisted"
+# Upper bounds (months, exclusive) of each age band; the last band is open-ended
+AGE_BAND_EDGES = np.array([12, 36, 84, 132])
+AGE_BAND_LABELS = ["<1y", "1-3y", "3-7y", "7-11y", "11y+", UNKNOWN]
+
+ROLLUP_KEYS = ["day", "clinic", "breed", "age_band", "status"]
+DIMENSIONS = ["date", "month", "clinic", "breed", "age_band", "status"]
+
+
+def age_bands(age_months):
+    age = np.asarray(age_months, dtype=np.float64)
+    bands = np.searchsorted(AGE_BAND_EDGES, age, side="right")
+    bands[~np.isfinite(age)] = len(AGE_BAND_LABELS) - 1
+    return bands.astype(np.int8)
+
+
+def aggregate(keys, counts, probs):
+    """Sums counts and probability columns over identical key rows."""
+    if not len(keys):
+        return keys, counts, probs
+    unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    summed = np.column_stack([np.bincount(inverse, probs[:, j], len(unique)) for j in range(probs.shape[1])])
+    return unique, np.bincount(inverse, counts, len(unique)).astype(np.int64), summed
+
+
+class RollupStore:
+    """Date-partitioned columnar prediction store with an incrementally merged rollup."""
+
+    def __init__(self, path=DEFAULT_STORE):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        state_file = self.path / "state.json"
+        self.state = json.loads(state_file.read_text()) if state_file.exists() else {
+            "dictionaries": {"clinic": [], "breed": []},
+            "classes": None,
+            "sources": {"logs": {}, "exports": {}},
+            "next_part": 0,
+            "rows": 0,
+        }
+        self.codes = {dim: {v: i for i, v in enumerate(values)} for dim, values in self.state["dictionaries"].items()}
+        self._load_rollup()
+
+    # --- Storage ---
+
+    def _load_rollup(self):
+        rollup_file = self.path / "rollups.npz"
+        n_classes = len(self.state["classes"] or [])
+        if rollup_file.exists():
+            with np.load(rollup_file) as data:
+                self.keys, self.counts, self.prob_sums = data["keys"], data["counts"], data["prob_sums"]
+        else:
+            self.keys = np.empty((0, len(ROLLUP_KEYS)), dtype=np.int32)
+            self.counts = np.empty(0, dtype=np.int64)
+            self.prob_sums = np.empty((0, n_classes))
+
+    def save(self):
+        """Writes the rollup, then the state (dictionaries and source offsets), each atomically."""
+        tmp = self.path / "rollups.tmp.npz"
+        np.savez(tmp, keys=self.keys, counts=self.counts, prob_sums=self.prob_sums)
+        os.replace(tmp, self.path / "rollups.npz")
+        tmp = self.path / "state.json.tmp"
+        tmp.write_text(json.dumps(self.state, indent=2))
+        os.replace(tmp, self.path / "state.json")
+
+    def _encode(self, dim, values):
+        uniques, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+        codes = self.codes[dim]
+        for value in uniques:
+            if value not in codes:
+                codes[value] = len(codes)
+                self.state["dictionaries"][dim].append(value)
+        return np.array([codes[v] for v in uniques], dtype=np.int32)[inverse.reshape(-1)]
+
+    # --- Ingest ---
+
+    def append(self, ts, clinic, breed, age_months, probs, classes):
+        """Adds scored rows: one partition file per day, plus their aggregate merged into the rollup.
+
+        Partition file numbers come from the saved state, so rows re-ingested
+        after a crash (before save) overwrite their orphaned files.
+        """
+        if self.state["classes"] is None:
+            self.state["classes"] = list(classes)
+            self.prob_sums = np.empty((0, len(classes)))
+        elif list(classes) != self.state["classes"]:
+            raise ValueError(f"classes {list(classes)} differ from the store's {self.state['classes']}")
+
+        ts = np.asarray(ts, dtype=np.float64)
+        probs = np.asarray(probs, dtype=np.float32)
+        columns = {
+            "ts": ts,
+            "clinic": self._encode("clinic", clinic),
+            "breed": self._encode("breed", breed),
+            "age_months": np.asarray(age_months, dtype=np.float32),
+            "status": probs.argmax(axis=1).astype(np.int8),
+            "probs": probs,
+        }
+        days = np.floor(ts / DAY_SECONDS).astype(np.int32)
+        for day in np.unique(days):
+            rows = days == day
+            date = str(np.datetime64(int(day), "D"))
+            part_dir = self.path / "partitions" / f"date={date}"
+            part_dir.mkdir(parents=True, exist_ok=True)
+            np.savez(part_dir / f"part-{self.state['next_part']:06d}.npz", **{k: v[rows] for k, v in columns.items()})
+            self.state["next_part"] += 1
+
+        keys = np.column_stack([days, columns["clinic"], columns["breed"],
+                                age_bands(columns["age_months"]), columns["status"]]).astype(np.int32)
+        self.merge(*aggregate(keys, np.ones(len(ts), dtype=np.int64), probs.astype(np.float64)))
+        self.state["rows"] += len(ts)
+
+    def merge(self, keys, counts, prob_sums):
+        self.keys, self.counts, self.prob_sums = aggregate(
+            np.concatenate([self.keys, keys]),
+            np.concatenate([self.counts, counts]),
+            np.concatenate([self.prob_sums, prob_sums]),
+        )
+
+    def ingest_log(self, path, batch_rows=INGEST_BATCH_ROWS):
+        """Ingests prediction log records not seen before; returns the number of rows added."""
+        from prediction_log import iter_records
+
+        offsets = self.state["sources"]["logs"]
+        pending, pending_offsets = [], {}
+        added = 0
+
+        def flush():
+            nonlocal added
+            if pending:
+                classes = pending[0][5]
+                self.append(*(np.concatenate([p[i] for p in pending]) for i in range(5)), classes)
+                added += sum(len(p[0]) for p in pending)
+                pending.clear()
+            offsets.update(pending_offsets)
+            self.save()
+
+        for record in iter_records(path, offsets):
+            columns = record["columns"]
+            features, probs = record["features"], record["probs"]
+            n = len(features)
+            breed_cols = [i for i, c in enumerate(columns) if c.startswith("breed_")]
+            breed_names = np.array([columns[i][len("breed_"):] for i in breed_cols] + [UNLISTED_BREED])
+            onehot = features[:, breed_cols]
+            breed = np.where(onehot.max(axis=1, initial=0) > 0.5, onehot.argmax(axis=1) if breed_cols else 0,
+                             len(breed_cols))
+            age = features[:, columns.index("age_in_months")] if "age_in_months" in columns else np.full(n, np.nan)
+            pending.append((np.full(n, record["timestamp"]), np.full(n, UNKNOWN), breed_names[breed],
+                            age, probs, record["classes"]))
+            pending_offsets[record["file"]] = record["end_offset"]
+            if sum(len(p[0]) for p in pending) >= batch_rows:
+                flush()
+        flush()
+        return added
+
+    def ingest_export(self, path, batch_rows=INGEST_BATCH_ROWS // 10):
+        """Scores and ingests export records past the saved offset; returns (rows added, records skipped)."""
+        from health_records import iter_export, flatten_cat_record, record_clinic, record_visit_ts
+        from ml_inference import load_model_assets, predict_batch
+
+        assets = load_model_assets()
+        classes = assets["classes"]
+        key = str(Path(path).resolve())
+        added = skipped = 0
+        batch, meta, offset = [], [], self.state["sources"]["exports"].get(key, 0)
+
+        def flush(end_offset):
+            nonlocal added, skipped
+            if batch:
+                results = predict_batch(batch, assets)
+                ok = [i for i, r in enumerate(results) if r.get("success")]
+                skipped += len(batch) - len(ok)
+                if ok:
+                    probs = np.array([[results[i]["confidence_scores"][c] for c in classes] for i in ok])
+                    ts, clinic = zip(*(meta[i] for i in ok))
+                    self.append(ts, clinic, [batch[i]["breed"] for i in ok],
+                                [batch[i]["age_in_months"] if batch[i]["age_in_months"] is not None else np.nan
+                                 for i in ok],
+                                probs, classes)
+                    added += len(ok)
+                batch.clear()
+                meta.clear()
+            self.state["sources"]["exports"][key] = end_offset
+            self.save()
+
+        for offset, doc in iter_export(path, offset):
+            if doc is None:
+                skipped += 1
+                continue
+            batch.append(flatten_cat_record(doc))
+            meta.append((record_visit_ts(doc) or time.time(), record_clinic(doc) or UNKNOWN))
+            if len(batch) >= batch_rows:
+                flush(offset)
+        flush(offset)
+        return added, skipped
+
+    # --- Query ---
+
+    def partitions(self, since=None, until=None):
+        """Partition files in [since, until] (ISO dates), pruned by directory name."""
+        for part_dir in sorted((self.path / "partitions").glob("date=*")):
+            date = part_dir.name[len("date="):]
+            if (since and date < since) or (until and date > until):
+                continue
+            yield from sorted(part_dir.glob("part-*.npz"))
+
+    def scan_rollup(self, since=None, until=None):
+        """The rollup recomputed from partition rows (for --raw queries and rebuild)."""
+        n_classes = len(self.state["classes"] or [])
+        keys, counts, prob_sums = [np.empty((0, len(ROLLUP_KEYS)), dtype=np.int32)], [np.empty(0)], \
+            [np.empty((0, n_classes))]
+        for part in self.partitions(since, until):
+            with np.load(part) as p:
+                days = np.floor(p["ts"] / DAY_SECONDS).astype(np.int32)
+                keys.append(np.column_stack([days, p["clinic"], p["breed"],
+                                             age_bands(p["age_months"]), p["status"]]).astype(np.int32))
+                counts.append(np.ones(len(days)))
+                prob_sums.append(p["probs"].astype(np.float64))
+        return aggregate(np.concatenate(keys), np.concatenate(counts), np.concatenate(prob_sums))
+
+    def rebuild(self):
+        self.keys, self.counts, self.prob_sums = self.scan_rollup()
+        self.counts = self.counts.astype(np.int64)
+        self.save()
+
+    def query(self, by=(), since=None, until=None, filters=None, raw=False):
+        """Record counts, status shares and mean class probabilities per group.
+
+        by: dimensions from DIMENSIONS; filters: {dimension: [values]}.
+        """
+        unknown = [d for d in list(by) + list(filters or {}) if d not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"unknown dimensions {unknown}; choose from {DIMENSIONS}")
+        classes = self.state["classes"] or []
+        keys, counts, prob_sums = self.scan_rollup(since, until) if raw else (self.keys, self.counts, self.prob_sums)
+
+        day = keys[:, 0]
+        dims = {
+            "date": day,
+            "month": np.asarray(day, dtype="datetime64[D]").astype("datetime64[M]").astype(np.int32),
+            "clinic": keys[:, 1],
+            "breed": keys[:, 2],
+            "age_band": keys[:, 3],
+            "status": keys[:, 4],
+        }
+        labels = {
+            "date": lambda v: str(np.datetime64(int(v), "D")),
+            "month": lambda v: str(np.datetime64(int(v), "M")),
+            "clinic": lambda v: self.state["dictionaries"]["clinic"][v],
+            "breed": lambda v: self.state["dictionaries"]["breed"][v],
+            "age_band": lambda v: AGE_BAND_LABELS[v],
+            "status": lambda v: classes[v],
+        }
+
+        mask = np.ones(len(keys), dtype=bool)
+        if since:
+            mask &= day >= np.datetime64(since, "D").astype(np.int64)
+        if until:
+            mask &= day <= np.datetime64(until, "D").astype(np.int64)
+        for dim, values in (filters or {}).items():
+            if dim in ("date", "month"):
+                allowed = [np.datetime64(v, "D" if dim == "date" else "M").astype(np.int64) for v in values]
+            else:
+                present = np.unique(dims[dim])
+                allowed = [code for code in present if labels[dim](code) in values]
+            mask &= np.isin(dims[dim], allowed)
+
+        group = np.column_stack([dims[d][mask] for d in by]) if by else np.zeros((int(mask.sum()), 1), np.int32)
+        if not len(group):
+            return pd.DataFrame(columns=list(by) + ["records"])
+        unique, inverse = np.unique(group, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        counts, prob_sums, status = counts[mask], prob_sums[mask], dims["status"][mask]
+        totals = np.bincount(inverse, counts, len(unique))
+
+        result = {d: [labels[d](v) for v in unique[:, i]] for i, d in enumerate(by)}
+        result["records"] = totals.astype(np.int64)
+        for j, c in enumerate(classes):
+            result[f"share_{c}"] = np.bincount(inverse, counts * (status == j), len(unique)) / totals
+        for j, c in enumerate(classes):
+            result[f"mean_p_{c}"] = np.bincount(inverse, prob_sums[:, j], len(unique)) / totals
+        return pd.DataFrame(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar prediction store with incremental rollups.")
+    parser.add_argument("--store", default=str(DEFAULT_STORE))
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest_log = sub.add_parser("ingest-log", help="Ingest prediction logs (file or directory)")
+    ingest_log.add_argument("path")
+    ingest_export = sub.add_parser("ingest-export", help="Score and ingest a JSON Lines record export")
+    ingest_export.add_argument("path")
+    query = sub.add_parser("query", help="Group-by statistics")
+    query.add_argument("--by", default="", help=f"Comma-separated dimensions: {', '.join(DIMENSIONS)}")
+    query.add_argument("--since", default=None, help="First date (YYYY-MM-DD)")
+    query.add_argument("--until", default=None, help="Last date (YYYY-MM-DD)")
+    for dim in ("clinic", "breed", "age_band", "status"):
+        query.add_argument(f"--{dim.replace('_', '-')}", default=None, help=f"Only these {dim} values (comma-separated)")
+    query.add_argument("--raw", action="store_true", help="Scan the partitions instead of the rollup")
+    query.add_argument("--output", default=None, help="Write the result as CSV")
+    sub.add_parser("rebuild", help="Recompute the rollup from the partitions")
+    args = parser.parse_args()
+
+    store = RollupStore(args.store)
+    start = time.perf_counter()
+    if args.command == "ingest-log":
+        added = store.ingest_log(args.path)
+        print(f"✅ {added} predictions ingested ({store.state['rows']} in store) in {time.perf_counter() - start:.2f} s")
+    elif args.command == "ingest-export":
+        added, skipped = store.ingest_export(args.path)
+        print(f"✅ {added} records scored and ingested, {skipped} skipped ({store.state['rows']} in store) "
+              f"in {time.perf_counter() - start:.2f} s")
+    elif args.command == "rebuild":
+        store.rebuild()
+        print(f"✅ Rollup rebuilt: {len(store.keys)} groups from {int(store.counts.sum())} rows")
+    else:
+        by = [d.strip() for d in args.by.split(",") if d.strip()]
+        filters = {dim: getattr(args, dim).split(",") for dim in ("clinic", "breed", "age_band", "status")
+                   if getattr(args, dim)}
+        result = store.query(by, args.since, args.until, filters, args.raw)
+        elapsed = time.perf_counter() - start
+        if args.output:
+            result.to_csv(args.output, index=False)
+            print(f"Result written to {args.output}")
+        with pd.option_context("display.max_rows", 200, "display.width", 200):
+            print(result.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+        print(f"\n{len(result)} groups in {elapsed * 1000:.1f} ms ({'partition scan' if args.raw else 'rollup'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Shadow Model Evaluation
+Runs candidate models alongside the serving model on live requests, off the
+response critical path, and logs where they disagree.
+
+Candidates reuse the feature matrix already built for the serving model: the
+request is preprocessed once, and each candidate only re-selects the columns
+it was trained on (extra columns are dropped). This covers the ai-ds/cat2
+pipeline, whose models lack `num_vaccines_overdue`. Columns a candidate
+expects but the serving encoding lacks are filled with 0, which skews its
+disagreement counts: they are logged once per candidate, and stats() reports
+them (`missing_features`) with the number of rows scored that way.
+
+Scoring happens on a background thread fed by a bounded queue; when the queue
+is full the batch is dropped (and counted) rather than delaying the response.
+ml_inference.py only shadows in its --serve modes, where the candidates are
+loaded once at startup; one-shot runs skip shadow scoring.
+
+Configuration:
+  PETVET_SHADOW_MODELS  comma-separated candidates, each `path` (shadows the
+                        "cat" model) or `key=path` (shadows that registry key).
+                        Paths are pickled XGBClassifiers or compact .npz models.
+  PETVET_SHADOW_LOG     disagreement log, JSON Lines (default logs/shadow.jsonl)
+
+Each log line holds the candidate, the serving model key, the timestamp and,
+for every disagreeing row, both predicted statuses and probability vectors.
+"""
+
+import os
+import json
+import queue
+import pickle
+import threading
+from pathlib import Path
+from datetime import datetime
+
+import numpy as np
+
+SCRIPT_DIR = Path(__file__).parent
+SHADOW_MODELS_ENV = "PETVET_SHADOW_MODELS"
+SHADOW_LOG_ENV = "PETVET_SHADOW_LOG"
+DEFAULT_SHADOW_LOG = SCRIPT_DIR / "logs" / "shadow.jsonl"
+QUEUE_SIZE = 256
+DRAIN_TIMEOUT_S = 10.0
+
+
+class Candidate:
+    """A shadow model plus the feature columns it expects."""
+
+    def __init__(self, name, path, model_key="cat"):
+        self.name = name
+        self.path = str(path)
+        self.model_key = model_key
+        if self.path.endswith(".npz"):
+            from compact_model import load_compact_model
+            self.model = load_compact_model(self.path)
+            self.feature_names = list(self.model.feature_names)
+            self.classes = list(self.model.classes)
+        else:
+            with open(self.path, "rb") as f:
+                self.model = pickle.load(f)
+            self.feature_names = list(self.model.get_booster().feature_names or [])
+            # Integer-encoded labels (LabelEncoder) map onto the serving model's classes
+            self.classes = None
+        if not self.feature_names:
+            raise ValueError(f"Shadow model {self.path} has no feature names")
+
+    def missing_columns(self, columns):
+        """Features this candidate expects that are absent from `columns`."""
+        present = set(columns)
+        return [c for c in self.feature_names if c not in present]
+
+    def predict_proba(self, X):
+        aligned = X.reindex(columns=self.feature_names, fill_value=0)
+        return self.model.predict_proba(aligned)
+
+
+def parse_candidates(spec):
+    """Parses the PETVET_SHADOW_MODELS value into Candidates."""
+    candidates = []
+    for entry in (e.strip() for e in spec.split(",")):
+        if not entry:
+            continue
+        key, _, path = entry.rpartition("=")
+        candidates.append(Candidate(Path(path).stem, path, key or "cat"))
+    return candidates
+
+
+class ShadowRunner:
+    """Background scorer for shadow candidates."""
+
+    def __init__(self, candidates, log_path=DEFAULT_SHADOW_LOG, queue_size=QUEUE_SIZE):
+        self.candidates = candidates
+        self.log_path = Path(log_path)
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.counts = {c.name: {"rows": 0, "disagreements": 0, "errors": 0, "rows_zero_filled": 0}
+                       for c in candidates}
+        self.missing_features = {c.name: set() for c in candidates}
+        self.dropped_batches = 0
+        self.thread = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+        self.thread.start()
+
+    def submit(self, model_key, X, probs, classes):
+        """Queues one scored batch for the candidates shadowing `model_key`; never blocks."""
+        if not any(c.model_key == model_key for c in self.candidates):
+            return
+        try:
+            self.queue.put_nowait((model_key, X, np.asarray(probs), list(classes), datetime.now()))
+        except queue.Full:
+            self.dropped_batches += 1
+
+    def _run(self):
+        with open(self.log_path, "a") as log:
+            while True:
+                item = self.queue.get()
+                try:
+                    if item is None:
+                        return
+                    self._score(log, *item)
+                finally:
+                    self.queue.task_done()
+
+    def _score(self, log, model_key, X, probs, classes, received_at):
+        primary_idx = probs.argmax(axis=1)
+        for candidate in self.candidates:
+            if candidate.model_key != model_key:
+                continue
+            counts = self.counts[candidate.name]
+            missing = candidate.missing_columns(X.columns)
+            if missing:
+                counts["rows_zero_filled"] += len(X)
+                new = set(missing) - self.missing_features[candidate.name]
+                if new:
+                    self.missing_features[candidate.name] |= new
+                    log.write(json.dumps({"candidate": candidate.name, "model": model_key,
+                                          "missing_features": sorted(new)}) + "\n")
+            try:
+                candidate_probs = candidate.predict_proba(X)
+            except Exception as e:
+                counts["errors"] += 1
+                log.write(json.dumps({"candidate": candidate.name, "model": model_key, "error": str(e)}) + "\n")
+                continue
+            candidate_classes = candidate.classes or classes
+            candidate_labels = np.asarray(candidate_classes, dtype=object)[candidate_probs.argmax(axis=1)]
+            primary_labels = np.asarray(classes, dtype=object)[primary_idx]
+            disagree = np.flatnonzero(candidate_labels != primary_labels)
+
+            counts["rows"] += len(X)
+            counts["disagreements"] += len(disagree)
+            if not len(disagree):
+                continue
+            log.write(json.dumps({
+                "timestamp": received_at.strftime('%Y-%m-%d %H:%M:%S'),
+                "candidate": candidate.name,
+                "model": model_key,
+                "rows": len(X),
+                "disagreements": [
+                    {
+                        "row": int(i),
+                        "status": primary_labels[i],
+                        "candidate_status": candidate_labels[i],
+                        "confidence_scores": dict(zip(classes, probs[i].astype(float).tolist())),
+                        "candidate_scores": dict(zip(candidate_classes, candidate_probs[i].astype(float).tolist())),
+                    }
+                    for i in disagree
+                ],
+            }) + "\n")
+            log.flush()
+
+    def stats(self):
+        return {
+            "candidates": {
+                c.name: {"model": c.model_key, **self.counts[c.name],
+                         "missing_features": sorted(self.missing_features[c.name])}
+                for c in self.candidates
+            },
+            "queued": self.queue.qsize(),
+            "dropped_batches": self.dropped_batches,
+        }
+
+    def close(self, timeout=DRAIN_TIMEOUT_S):
+        """Scores whatever is still queued (up to `timeout` seconds) and stops the thread."""
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self.thread.join(timeout)
+
+
+def runner_from_env():
+    """Returns a ShadowRunner for PETVET_SHADOW_MODELS, or None when unset."""
+    spec = os.environ.get(SHADOW_MODELS_ENV)
+    if not spec:
+        return None
+    candidates = parse_candidates(spec)
+    if not candidates:
+        return None
+    return ShadowRunner(candidates, os.environ.get(SHADOW_LOG_ENV) or DEFAULT_SHADOW_LOG)
@@ -0,0 +1,97 @@
+"""
+Synthetic Records
+Reuses the data generator in ai-ds/cat2 (cat-unhealthy.py, the superset of
+cat-normal.py) to produce realistic records, and converts them to the
+request layout that MLService.formatInputForPython sends to ml_inference.py.
+"""
+
+import json
+import random
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+
+SCRIPT_DIR = Path(__file__).parent
+GENERATOR_FILE = SCRIPT_DIR.parent / "cat2" / "cat-unhealthy.py"
+
+_generators = {}
+
+
+def load_generator(path=GENERATOR_FILE):
+    """Imports the generator script as a module (its file name is not importable)."""
+    path = Path(path)
+    if path not in _generators:
+        spec = importlib.util.spec_from_file_location(f"cat_generator_{path.stem.replace('-', '_')}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _generators[path] = module
+    return _generators[path]
+
+
+def seed_all(seed):
+    """Seeds both RNGs the generator draws from."""
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+
+
+def _native(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def to_request_payload(record):
+    """Formats a generated record like MLService.formatInputForPython."""
+    return {
+        # Basic info
+        'breed': _native(record['breed']) or 'Unknown',
+        'age_in_months': int(round(_native(record['age_in_months']))),
+        'weight_kg': float(record['weight_kg']),
+
+        # Vital signs
+        'temperature': float(record['temperature']),
+        'heart_rate': int(round(_native(record['heart_rate']))),
+        'respiratory_rate': int(round(_native(record['respiratory_rate']))),
+        'blood_pressure_systolic': int(round(_native(record['blood_pressure_systolic']))),
+        'blood_pressure_diastolic': int(round(_native(record['blood_pressure_diastolic']))),
+
+        # Clinical
+        'body_condition_score': int(round(_native(record['body_condition_score']))),
+        'hydration_status': str(record['hydration_status']),
+        'mucous_membrane_color': str(record['mucous_membrane_color']),
+        'coat_condition': str(record['coat_condition']),
+
+        # Behavioral
+        'appetite': str(record['appetite']),
+        'energy_level': str(record['energy_level']),
+        'aggression': str(record['aggression']),
+
+        # Symptoms
+        'vomiting': bool(record['vomiting']),
+        'diarrhea': bool(record['diarrhea']),
+        'coughing': bool(record['coughing']),
+        'limping': bool(record['limping']),
+
+        # Medical history
+        'allergies': list(record['allergies']),
+        'chronic_conditions': list(record['chronic_conditions']),
+        'prescriptions': list(record['prescriptions']),
+
+        # Vaccinations (JSON string, as sent by the backend)
+        'vaccinations': json.dumps(record['vaccinations']),
+    }
+
+
+def generate_payloads(n, seed=None, unhealthy_fraction=0.0):
+    """Generates n request payloads.
+
+    Records follow the generator's default 70/20/10 category mix; an extra
+    `unhealthy_fraction` of them is drawn from the Unhealthy supplement.
+    """
+    generator = load_generator()
+    seed_all(seed)
+    payloads = []
+    for _ in range(n):
+        category = 'Unhealthy' if random.random() < unhealthy_fraction else None
+        payloads.append(to_request_payload(generator.generate_record(predefined_category=category)))
+    return payloads
@@ -1,15 +1,52 @@
-import pandas as pd
-import numpy as np
+import argparse
 import ast
+import pickle
+import resource
+import time
+
+import numpy as np
+import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
 from sklearn.metrics import classification_report, confusion_matrix
+from sklearn.utils.class_weight import compute_sample_weight
 from xgboost import XGBClassifier
 
-# --- 1. Load Data ---
+# --- 1. Configuration ---
 FILE_PATH = 'cat_health_dataset_supplemented.csv'
-df = pd.read_csv(FILE_PATH)
-print("Data loaded successfully.")
+
+# Columns not needed for the model (identifiers, free text, and original list columns)
+COMPLEX_COLS = ['vaccinations', 'allergies', 'chronic_conditions', 'prescriptions']
+COLS_TO_DROP = [
+    'species', 'name', 'date_of_birth',
+    'diagnosis_text', 'treatment_text'
+] + COMPLEX_COLS
+
+# --- Low-memory path: column dtypes (downcast numerics, categorical strings) ---
+LOW_MEMORY_CHUNK_SIZE = 100_000
+NUMERIC_DTYPES = {
+    'age_in_months': np.int16,
+    'weight_kg': np.float32,
+    'temperature': np.float32,
+    'heart_rate': np.int16,
+    'respiratory_rate': np.int16,
+    'blood_pressure_systolic': np.int16,
+    'blood_pressure_diastolic': np.int16,
+    'body_condition_score': np.int8,
+}
+BOOLEAN_COLS = ['vomiting', 'diarrhea', 'coughing', 'limping']
+CATEGORICAL_COLS = [
+    'breed', 'hydration_status', 'mucous_membrane_color', 'coat_condition',
+    'appetite', 'energy_level', 'aggression',
+]
+
+# Class importance used for sample weights
+CUSTOM_CLASS_WEIGHTS = {
+    'At Risk': 3.0,    # High importance (minority class)
+    'Healthy': 1.0,    # Base importance
+    'Unhealthy': 2.0,  # Medium importance
+}
+
 
 # --- 2. Feature Engineering & Preprocessing ---
 
@@ -28,121 +65,244 @@ def get_overdue_vaccine_count(list_str):
     try:
         # ast.literal_eval converts the string representation of a list into an actual list
         actual_list = ast.literal_eval(list_str)
-        
+
         # Count items where the 'status' key equals 'overdue'
         count = sum(1 for item in actual_list if isinstance(item, dict) and item.get('status') == 'overdue')
         return count
     except:
         return 0
 
-# Extract numerical counts from complex fields (e.g., how many allergies)
-complex_cols = ['vaccinations', 'allergies', 'chronic_conditions', 'prescriptions']
-for col in complex_cols:
-    df[f'num_{col}'] = df[col].apply(get_item_count)
 
-# 🚨 NEW FEATURE ADDITION
-df['num_vaccines_overdue'] = df['vaccinations'].apply(get_overdue_vaccine_count)
+def peak_rss_mb():
+    """Peak resident set size of this process so far (Linux reports KB)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
 
-# Drop columns not needed for the model (identifiers, free text, and original list columns)
-cols_to_drop = [
-    'species', 'name', 'date_of_birth', 
-    'diagnosis_text', 'treatment_text'
-] + complex_cols 
-df_processed = df.drop(columns=cols_to_drop)
-
-# Separation of Features (X) and Target (y)
-X = df_processed.drop('health_status', axis=1)
-y = df_processed['health_status']
-
-# Encode the categorical target variable (Health Status) into numbers (0, 1, 2)
-le = LabelEncoder()
-y_encoded = le.fit_transform(y)
-class_names = le.classes_ 
-print(f"Target classes encoded: {class_names}")
-
-# One-Hot Encode all remaining categorical columns (e.g., breed, appetite)
-categorical_cols = X.select_dtypes(include=['object']).columns
-X_encoded = pd.get_dummies(X, columns=categorical_cols, drop_first=True)
-
-# Convert boolean columns to integer (True=1, False=0)
-for col in X_encoded.select_dtypes(include=['bool']).columns:
-    X_encoded[col] = X_encoded[col].astype(int)
-
-# --- 3. Data Splitting ---
-# Split data into 80% for training and 20% for testing, ensuring class balance (stratify)
-X_train, X_test, y_train, y_test = train_test_split(
-    X_encoded, y_encoded, test_size=0.2, random_state=42, stratify=y_encoded
-)
-print(f"Data split: Training set size={len(X_train)}, Testing set size={len(X_test)}")
-
-# --- STEP 3B: CALCULATE AND APPLY CLASS WEIGHTS ---
-from sklearn.utils.class_weight import compute_sample_weight
 
-# Map the encoded labels (0, 1, 2) back to the class names for clarity
-# class_names are: ['At Risk', 'Healthy', 'Unhealthy']
-# Label 0: At Risk (Minority Class, needs highest weight)
-# Label 1: Healthy
-# Label 2: Unhealthy
-
-# Define a custom weight map to boost 'At Risk' and 'Unhealthy' importance
-custom_class_weights = {
-    # Label 0: At Risk (High Importance, e.g., 3x base weight)
-    le.transform(['At Risk'])[0]: 3.0,
-    # Label 1: Healthy (Base Importance)
-    le.transform(['Healthy'])[0]: 1.0, 
-    # Label 2: Unhealthy (Medium Importance, e.g., 2x base weight)
-    le.transform(['Unhealthy'])[0]: 2.0
-}
+def encode_dataset(df):
+    """Standard (in-memory) preprocessing: returns (X_encoded DataFrame, y Series)."""
+    # Extract numerical counts from complex fields (e.g., how many allergies)
+    for col in COMPLEX_COLS:
+        df[f'num_{col}'] = df[col].apply(get_item_count)
 
-# Convert the class weights dictionary into an array matching the y_train samples
-sample_weights = compute_sample_weight(
-    class_weight=custom_class_weights,
-    y=y_train
-)
-
-print("\nSample weights calculated and ready for training.")
-# -----------------------------------------------------------------
-
-# --- 4. Model Training (XGBoost) ---
-print("\nTraining XGBoost Classifier with Sample Weights...")
-
-xgb_model = XGBClassifier(
-    objective='multi:softmax',
-    num_class=len(class_names),
-    eval_metric='mlogloss',
-    use_label_encoder=False,
-    n_estimators=100,
-    learning_rate=0.1,
-    random_state=42
-)
-
-# APPLY THE WEIGHTS HERE:
-xgb_model.fit(X_train, y_train, sample_weight=sample_weights)
-
-# --- 5. Evaluation ---
-y_pred = xgb_model.predict(X_test)
-
-print("\n--- XGBoost Model Evaluation ---")
-print("Accuracy on Test Set:", xgb_model.score(X_test, y_test))
-print("\nClassification Report:")
-print(classification_report(y_test, y_pred, target_names=class_names))
-
-# Optional: Extract Feature Importance
-feature_importance = pd.Series(xgb_model.feature_importances_, index=X_encoded.columns).sort_values(ascending=False).head(10)
-print("\nTop 10 Feature Importance:")
-print(feature_importance)
-
-# ----------------------------------------------------
-# --- STEP 6: SAVE THE TRAINED MODEL ---
-# ----------------------------------------------------
-import pickle
-import time # Optional: Add a timestamp to the filename
+    # 🚨 NEW FEATURE ADDITION
+    df['num_vaccines_overdue'] = df['vaccinations'].apply(get_overdue_vaccine_count)
+
+    df_processed = df.drop(columns=COLS_TO_DROP)
+
+    # Separation of Features (X) and Target (y)
+    X = df_processed.drop('health_status', axis=1)
+    y = df_processed['health_status']
+
+    # One-Hot Encode all remaining categorical columns (e.g., breed, appetite)
+    categorical_cols = X.select_dtypes(include=['object']).columns
+    X_encoded = pd.get_dummies(X, columns=categorical_cols, drop_first=True)
+
+    # Convert boolean columns to integer (True=1, False=0)
+    for col in X_encoded.select_dtypes(include=['bool']).columns:
+        X_encoded[col] = X_encoded[col].astype(int)
+
+    return X_encoded, y
+
+
+def _reduce_chunk(chunk):
+    """Turns one raw CSV chunk into compact columns, dropping the list/text columns."""
+    for col in COMPLEX_COLS:
+        chunk[f'num_{col}'] = chunk[col].apply(get_item_count).astype(np.int8)
+    chunk['num_vaccines_overdue'] = chunk['vaccinations'].apply(get_overdue_vaccine_count).astype(np.int8)
+    chunk = chunk.drop(columns=COMPLEX_COLS)
+    for col in CATEGORICAL_COLS:
+        chunk[col] = chunk[col].astype('category')
+    return chunk
+
+
+def encode_dataset_low_memory(file_path, chunk_size=LOW_MEMORY_CHUNK_SIZE):
+    """Low-memory preprocessing producing the same columns as encode_dataset.
+
+    The CSV is read in chunks with only the needed columns, numerics are
+    downcast (float32/int16/int8), strings become categoricals and list
+    columns are reduced to int8 counts chunk by chunk, so the raw text is
+    never held for the whole file. The one-hot block is built directly from
+    the categorical codes as uint8 columns.
+
+    The one-hot block is deliberately not a sparse matrix: XGBoost treats
+    entries absent from a CSR matrix as missing rather than 0, so a model
+    trained on sparse one-hot columns learns default directions that dense
+    inference (ml_inference.py) does not follow.
+
+    Returns (X_encoded DataFrame, y labels ndarray).
+    """
+    from pandas.api.types import union_categoricals
+
+    dtypes = dict(NUMERIC_DTYPES)
+    dtypes.update({col: bool for col in BOOLEAN_COLS})
+    dtypes.update({col: 'category' for col in CATEGORICAL_COLS + ['health_status']})
+    usecols = list(dtypes) + COMPLEX_COLS
+
+    chunks = [
+        _reduce_chunk(chunk)
+        for chunk in pd.read_csv(file_path, usecols=usecols, dtype=dtypes, chunksize=chunk_size)
+    ]
+
+    # Numeric block, in the same column order encode_dataset produces
+    numeric_cols = list(NUMERIC_DTYPES) + BOOLEAN_COLS + [f'num_{c}' for c in COMPLEX_COLS] + ['num_vaccines_overdue']
+    columns = {}
+    for col in numeric_cols:
+        values = np.concatenate([c[col].to_numpy() for c in chunks])
+        columns[col] = values.astype(np.int8) if values.dtype == bool else values
+
+    # One-hot block from categorical codes against the union of levels in every chunk
+    for col in CATEGORICAL_COLS:
+        merged = union_categoricals([c[col] for c in chunks], sort_categories=True)
+        codes = merged.codes
+        for code, level in enumerate(merged.categories[1:], start=1):  # drop_first
+            columns[f'{col}_{level}'] = (codes == code).view(np.uint8)
+        for c in chunks:
+            del c[col]
+
+    y = union_categoricals([c['health_status'] for c in chunks], sort_categories=True)
+    y = np.asarray(y.astype(str))
+    del chunks
+
+    return pd.DataFrame(columns, copy=False), y
+
+
+def build_sample_weights(y_train, le):
+    """Per-sample weights from the custom class weight map."""
+    # Map the encoded labels (0, 1, 2) back to the class names for clarity
+    # class_names are: ['At Risk', 'Healthy', 'Unhealthy']
+    # Label 0: At Risk (Minority Class, needs highest weight)
+    # Label 1: Healthy
+    # Label 2: Unhealthy
+
+    # Define a custom weight map to boost 'At Risk' and 'Unhealthy' importance
+    custom_class_weights = {
+        le.transform([label])[0]: weight for label, weight in CUSTOM_CLASS_WEIGHTS.items()
+    }
+
+    # Convert the class weights dictionary into an array matching the y_train samples
+    return compute_sample_weight(
+        class_weight=custom_class_weights,
+        y=y_train
+    )
+
+
+def build_model(num_class):
+    return XGBClassifier(
+        objective='multi:softmax',
+        num_class=num_class,
+        eval_metric='mlogloss',
+        use_label_encoder=False,
+        n_estimators=100,
+        learning_rate=0.1,
+        random_state=42
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the cat health XGBoost model.")
+    parser.add_argument('--data', default=FILE_PATH, help="Training CSV")
+    parser.add_argument('--output', default=None, help="Model output (default: cat_health_model_<date>.pkl)")
+    parser.add_argument('--low-memory', action='store_true',
+                        help="Chunked categorical/downcast preprocessing with a uint8 one-hot block")
+    parser.add_argument('--chunk-size', type=int, default=LOW_MEMORY_CHUNK_SIZE)
+    parser.add_argument('--test-data', default=None,
+                        help="Held-out CSV (e.g. from dedup_dataset.py --test-output) instead of a random split")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Always re-run preprocessing instead of using the encoded feature cache")
+    args = parser.parse_args()
+
+    def encode_file(path):
+        if args.low_memory:
+            X, labels = encode_dataset_low_memory(path, args.chunk_size)
+            print(f"Data loaded (low-memory): {X.shape[0]} rows, {X.shape[1]} features, "
+                  f"{X.memory_usage(index=False).sum() / 1e6:.1f} MB encoded.")
+            return X, labels
+        df = pd.read_csv(path)
+        print("Data loaded successfully.")
+        return encode_dataset(df.drop(columns=['coreset_weight'], errors='ignore'))
+
+    def load_encoded(path):
+        if args.no_cache:
+            return encode_file(path)
+        from feature_cache import load_or_build
+        variant = 'low-memory' if args.low_memory else 'standard'
+        X, labels, hit = load_or_build(path, lambda: encode_file(path), variant)
+        if hit:
+            print(f"Encoded features loaded from cache: {X.shape[0]} rows, {X.shape[1]} features.")
+        return X, labels
+
+    # --- Load + preprocess ---
+    X_encoded, y = load_encoded(args.data)
+    # Rows of a coreset (coreset.py sample) carry their sampling weight
+    from coreset import read_coreset_weights
+    row_weights = read_coreset_weights(args.data)
+    if row_weights is None:
+        row_weights = np.ones(len(y))
+    else:
+        print(f"Coreset input: applying coreset_weight to {len(row_weights)} rows.")
+    feature_names = X_encoded.columns.tolist()
+    print(f"Peak RSS after preprocessing: {peak_rss_mb():.1f} MB")
+
+    # Encode the categorical target variable (Health Status) into numbers (0, 1, 2)
+    le = LabelEncoder()
+    y_encoded = le.fit_transform(y)
+    class_names = le.classes_
+    print(f"Target classes encoded: {class_names}")
+
+    # --- 3. Data Splitting ---
+    if args.test_data:
+        # Pre-split held-out file: align its one-hot columns to the training columns
+        X_test, y_test_labels = load_encoded(args.test_data)
+        X_test = X_test.reindex(columns=feature_names, fill_value=0)
+        X_train, y_train, y_test = X_encoded, y_encoded, le.transform(np.asarray(y_test_labels))
+        w_train = row_weights
+    else:
+        # Split data into 80% for training and 20% for testing, ensuring class balance (stratify)
+        X_train, X_test, y_train, y_test, w_train, _ = train_test_split(
+            X_encoded, y_encoded, row_weights, test_size=0.2, random_state=42, stratify=y_encoded
+        )
+    del X_encoded
+    print(f"Data split: Training set size={X_train.shape[0]}, Testing set size={X_test.shape[0]}")
+
+    # --- STEP 3B: CALCULATE AND APPLY CLASS WEIGHTS ---
+    sample_weights = build_sample_weights(y_train, le) * w_train
+    print("\nSample weights calculated and ready for training.")
+
+    # --- 4. Model Training (XGBoost) ---
+    print("\nTraining XGBoost Classifier with Sample Weights...")
+    xgb_model = build_model(len(class_names))
+
+    # APPLY THE WEIGHTS HERE:
+    xgb_model.fit(X_train, y_train, sample_weight=sample_weights)
+    print(f"Peak RSS after training: {peak_rss_mb():.1f} MB")
+
+    # --- 5. Evaluation ---
+    y_pred = xgb_model.predict(X_test)
+
+    print("\n--- XGBoost Model Evaluation ---")
+    print("Accuracy on Test Set:", xgb_model.score(X_test, y_test))
+    print("\nClassification Report:")
+    print(classification_report(y_test, y_pred, target_names=class_names))
+
+    # Optional: Extract Feature Importance
+    feature_importance = pd.Series(xgb_model.feature_importances_, index=feature_names).sort_values(ascending=False).head(10)
+    print("\nTop 10 Feature Importance:")
+    print(feature_importance)
+
+    # ----------------------------------------------------
+    # --- STEP 6: SAVE THE TRAINED MODEL ---
+    # ----------------------------------------------------
+    model_filename = args.output or f"cat_health_model_{time.strftime('%Y%m%d')}.pkl"
+
+    try:
+        # 'wb' stands for write binary
+        pickle.dump(xgb_model, open(model_filename, "wb"))
+        print(f"\n✅ Model successfully saved to {model_filename}")
+    except Exception as e:
+        print(f"Error saving model: {e}")
+
+    print(f"Peak RSS: {peak_rss_mb():.1f} MB")
 
-model_filename = f"cat_health_model_{time.strftime('%Y%m%d')}.pkl"
 
-try:
-    # 'wb' stands for write binary
-    pickle.dump(xgb_model, open(model_filename, "wb"))
-    print(f"\n✅ Model successfully saved to {model_filename}")
-except Exception as e:
-    print(f"Error saving model: {e}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Dataset Validation
+Checks a training CSV (generated or imported) before it is used, in chunked,
+vectorized passes so large files are checked at close to read speed.
+
+Checks:
+  - required columns present, missing values per column
+  - numeric ranges (the generators' ABS_MIN_*/ABS_MAX_* limits, input_schema.py)
+  - categorical levels and boolean symptom flags
+  - list columns parse as Python list literals (regex fast path; only rows the
+    regex rejects are handed to ast.literal_eval)
+  - label distribution against the expected mix
+  - consistency of health_status with the generator's penalty score
+    (calculate_health_scores in ai-ds/cat2/cat-unhealthy.py)
+
+Usage:
+  python validate_dataset.py cat_health_dataset_supplemented.csv
+  python validate_dataset.py big.csv --chunk-size 200000 --output validation.json
+  python validate_dataset.py imported.csv --expected "Healthy=0.7,At Risk=0.2,Unhealthy=0.1" --no-consistency
+
+Exits with status 1 if any error-level check fails.
+"""
+
+import re
+import ast
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from input_schema import NUMERIC_RANGES, BOOLEAN_FIELDS, DEFAULT_CATEGORICAL_LEVELS, LIST_FIELDS
+from synthetic import load_generator
+
+LABEL_COL = 'health_status'
+DEFAULT_CHUNK_SIZE = 100_000
+EXAMPLES_PER_CHECK = 5
+# Warn when the label mix is further than this (total variation distance) from the expected one
+LABEL_TOLERANCE = 0.15
+# Share of rows whose label may disagree with the generator's score before it is an error
+CONSISTENCY_TOLERANCE = 0.0
+
+# A Python list literal of quoted strings or flat dicts, e.g. "['Pollen']" or "[{'status': 'overdue'}]"
+_ITEM = r"""(?:'[^']*'|"[^"]*"|\{[^{}]*\})"""
+LIST_LITERAL = re.compile(rf"\s*\[\s*(?:{_ITEM}\s*(?:,\s*{_ITEM}\s*)*,?\s*)?\]\s*")
+
+
+BOOLEAN_TEXT = {'True': True, 'False': False, 'true': True, 'false': False, '1': True, '0': False}
+
+
+def _parses_as_list(value):
+    try:
+        return isinstance(ast.literal_eval(value), list)
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        return False
+
+
+class DatasetValidator:
+    """Accumulates check results chunk by chunk."""
+
+    def __init__(self, expected_labels=None, check_consistency=True):
+        generator = load_generator()
+        self.generator = generator if check_consistency else None
+        self.levels = dict(DEFAULT_CATEGORICAL_LEVELS)
+        self.levels['breed'] = list(generator.BREED_LIST)
+        self.expected_labels = expected_labels
+        self.required = list(NUMERIC_RANGES) + BOOLEAN_FIELDS + list(self.levels) + LIST_FIELDS + [LABEL_COL]
+
+        self.rows = 0
+        self.missing_columns = None
+        self.nulls = {}
+        self.ranges = {f: {"violations": 0, "min": None, "max": None, "examples": []} for f in NUMERIC_RANGES}
+        self.categories = {f: {"violations": 0, "unknown_levels": {}} for f in self.levels}
+        self.booleans = {f: {"violations": 0, "examples": []} for f in BOOLEAN_FIELDS}
+        self.lists = {f: {"violations": 0, "examples": []} for f in LIST_FIELDS}
+        self.labels = {}
+        self.mismatches = {}
+
+    def _examples(self, store, rows, values):
+        room = EXAMPLES_PER_CHECK - len(store)
+        if room > 0:
+            store.extend({"row": int(r), "value": v if isinstance(v, str) else str(v)}
+                         for r, v in zip(rows[:room], values[:room]))
+
+    def _scoring_frame(self, chunk):
+        """The chunk with booleans and numerics coerced as the generator produced them."""
+        frame = chunk.copy()
+        for field in BOOLEAN_FIELDS:
+            if frame[field].dtype != bool:
+                frame[field] = frame[field].astype(str).map(BOOLEAN_TEXT).fillna(False).astype(bool)
+        for field in NUMERIC_RANGES:
+            frame[field] = pd.to_numeric(frame[field], errors='coerce')
+        return frame
+
+    def update(self, chunk):
+        offset = self.rows
+        self.rows += len(chunk)
+        row_ids = np.arange(offset, offset + len(chunk))
+
+        if self.missing_columns is None:
+            self.missing_columns = [c for c in self.required if c not in chunk.columns]
+        for col, n in chunk.isna().sum().items():
+            if n:
+                self.nulls[col] = self.nulls.get(col, 0) + int(n)
+
+        for field, (lo, hi, _) in NUMERIC_RANGES.items():
+            if field not in chunk:
+                continue
+            values = pd.to_numeric(chunk[field], errors='coerce').to_numpy(dtype=float)
+            bad = ~((values >= lo) & (values <= hi))  # NaN / non-numeric count as violations
+            stats = self.ranges[field]
+            stats["violations"] += int(bad.sum())
+            if np.isfinite(values).any():
+                lo_seen, hi_seen = float(np.nanmin(values)), float(np.nanmax(values))
+                stats["min"] = lo_seen if stats["min"] is None else min(stats["min"], lo_seen)
+                stats["max"] = hi_seen if stats["max"] is None else max(stats["max"], hi_seen)
+            self._examples(stats["examples"], row_ids[bad], chunk[field].to_numpy()[bad])
+
+        for field, allowed in self.levels.items():
+            if field not in chunk:
+                continue
+            unknown = chunk.loc[~chunk[field].isin(allowed), field]
+            stats = self.categories[field]
+            stats["violations"] += len(unknown)
+            for level, n in unknown.astype(str).value_counts().items():
+                stats["unknown_levels"][level] = stats["unknown_levels"].get(level, 0) + int(n)
+
+        for field in BOOLEAN_FIELDS:
+            if field not in chunk:
+                continue
+            col = chunk[field]
+            if col.dtype == bool:
+                continue
+            bad = ~col.astype(str).isin(list(BOOLEAN_TEXT))
+            self.booleans[field]["violations"] += int(bad.sum())
+            self._examples(self.booleans[field]["examples"], row_ids[bad.to_numpy()], col[bad].to_numpy())
+
+        for field in LIST_FIELDS:
+            if field not in chunk:
+                continue
+            col = chunk[field].astype(str)
+            suspect = ~col.str.fullmatch(LIST_LITERAL).to_numpy()
+            if suspect.any():
+                idx = np.flatnonzero(suspect)
+                parsed = np.fromiter((_parses_as_list(v) for v in col.to_numpy()[idx]), dtype=bool, count=len(idx))
+                bad_idx = idx[~parsed]
+                self.lists[field]["violations"] += len(bad_idx)
+                self._examples(self.lists[field]["examples"], row_ids[bad_idx], col.to_numpy()[bad_idx])
+
+        if LABEL_COL in chunk:
+            for label, n in chunk[LABEL_COL].astype(str).value_counts().items():
+                self.labels[label] = self.labels.get(label, 0) + int(n)
+
+            if self.generator is not None and not self.missing_columns:
+                scores = self.generator.calculate_health_scores(self._scoring_frame(chunk))
+                expected = self.generator.health_status_from_scores(scores)
+                actual = chunk[LABEL_COL].astype(str).to_numpy()
+                diff = expected != actual
+                if diff.any():
+                    pairs = pd.Series(actual[diff] + " -> " + expected[diff]).value_counts()
+                    for pair, n in pairs.items():
+                        self.mismatches[pair] = self.mismatches.get(pair, 0) + int(n)
+
+    def report(self):
+        errors, warnings = [], []
+        if self.missing_columns:
+            errors.append(f"missing columns: {', '.join(self.missing_columns)}")
+        for name, section in (("range", self.ranges), ("category", self.categories),
+                              ("boolean", self.booleans), ("list", self.lists)):
+            for field, stats in section.items():
+                if stats["violations"]:
+                    errors.append(f"{field}: {stats['violations']} {name} violations")
+        if self.nulls:
+            warnings.append(f"missing values in {len(self.nulls)} columns")
+
+        total = sum(self.labels.values())
+        shares = {label: n / total for label, n in self.labels.items()} if total else {}
+        label_report = {"counts": self.labels, "shares": shares}
+        if self.expected_labels and total:
+            keys = set(shares) | set(self.expected_labels)
+            tvd = 0.5 * sum(abs(shares.get(k, 0) - self.expected_labels.get(k, 0)) for k in keys)
+            label_report.update({"expected": self.expected_labels, "total_variation": tvd})
+            if tvd > LABEL_TOLERANCE:
+                warnings.append(f"label mix is {tvd:.2f} (TV distance) from the expected mix")
+
+        consistency = None
+        if self.generator is not None and not self.missing_columns:
+            n_mismatch = sum(self.mismatches.values())
+            consistency = {"mismatches": n_mismatch,
+                           "share": n_mismatch / self.rows if self.rows else 0.0,
+                           "by_transition": dict(sorted(self.mismatches.items(), key=lambda kv: -kv[1]))}
+            if self.rows and consistency["share"] > CONSISTENCY_TOLERANCE:
+                errors.append(f"{n_mismatch} rows disagree with the generator's health score")
+
+        return {
+            "rows": self.rows,
+            "passed": not errors,
+            "errors": errors,
+            "warnings": warnings,
+            "missing_columns": self.missing_columns or [],
+            "nulls": self.nulls,
+            "ranges": self.ranges,
+            "categories": self.categories,
+            "booleans": self.booleans,
+            "lists": self.lists,
+            "labels": label_report,
+            "consistency": consistency,
+        }
+
+
+def parse_expected(spec):
+    """'Healthy=0.7,At Risk=0.2,Unhealthy=0.1' -> dict (normalized)."""
+    if not spec:
+        return None
+    pairs = [item.split("=") for item in spec.split(",") if item.strip()]
+    expected = {k.strip(): float(v) for k, v in pairs}
+    total = sum(expected.values())
+    return {k: v / total for k, v in expected.items()}
+
+
+def validate(path, chunk_size=DEFAULT_CHUNK_SIZE, expected_labels=None, check_consistency=True):
+    validator = DatasetValidator(expected_labels, check_consistency)
+    start = time.perf_counter()
+    for chunk in pd.read_csv(path, chunksize=chunk_size):
+        validator.update(chunk)
+    report = validator.report()
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate a cat health dataset before training.")
+    parser.add_argument("data")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--expected", default="Healthy=0.7,At Risk=0.2,Unhealthy=0.1",
+                        help="Expected label mix (default: the generator's category mix)")
+    parser.add_argument("--no-consistency", action="store_true",
+                        help="Skip the label vs generator score check (e.g. for imported clinical data)")
+    parser.add_argument("--output", default=None, help="Write the full JSON report here")
+    args = parser.parse_args()
+
+    report = validate(args.data, args.chunk_size, parse_expected(args.expected), not args.no_consistency)
+
+    print(f"{report['rows']} rows checked in {report['seconds']:.2f} s")
+    print("Labels: " + ", ".join(f"{k} {v:.1%}" for k, v in sorted(report["labels"]["shares"].items())))
+    for warning in report["warnings"]:
+        print(f"⚠️  {warning}")
+    for error in report["errors"]:
+        print(f"❌ {error}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+    if not report["passed"]:
+        sys.exit(1)
+    print("✅ Dataset passed validation")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Priority Worker Pool
+A pool of `ml_inference.py --serve` workers (load_test.ServeWorker) that
+schedules requests by priority class, so bulk re-scoring cannot starve an
+emergency triage request.
+
+Priority classes, each with its own bounded queue:
+  urgent       single records (or small lists) flagged by classify_urgency
+  interactive  other single records and small lists
+  batch        lists longer than BATCH_THRESHOLD records, or explicit priority="batch"
+
+Dispatch is smooth weighted round robin over the non-empty queues
+(DEFAULT_WEIGHTS), so batch work keeps a share of capacity without ever
+blocking the queue ahead of urgent cases. On top of that:
+  - `reserved` workers never take batch work, so an idle worker is available
+    for interactive traffic even while batch jobs saturate the rest
+  - batch lists are split into chunks of `chunk_records` records, so a
+    worker is never tied up by one huge request for long
+Queue sizes bound requests, not chunks, so a batch of any size can be
+submitted; a full queue rejects the submission (queue.Full) instead of growing.
+
+Usage:
+  python worker_pool.py bench --workers 3 --duration 10 --interactive-rate 10 --batch-size 2000
+"""
+
+import json
+import time
+import queue
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+from load_test import ServeWorker, ServePool, is_success
+from synthetic import generate_payloads
+
+PRIORITIES = ("urgent", "interactive", "batch")
+DEFAULT_WEIGHTS = {"urgent": 8, "interactive": 4, "batch": 1}
+DEFAULT_QUEUE_SIZES = {"urgent": 256, "interactive": 1024, "batch": 64}
+BATCH_THRESHOLD = 10
+BATCH_CHUNK_RECORDS = 200
+WAIT_SAMPLES = 10_000  # queue waits kept per priority class for stats()
+
+# Pre-triage flags: any one of these marks a record urgent
+URGENT_MEMBRANE_COLORS = {'blue', 'white', 'pale', 'yellow'}
+URGENT_HYDRATION = {'severe_dehydration'}
+URGENT_TEMPERATURE = (37.0, 40.0)  # outside this range (°C)
+
+
+def _flag(value):
+    return value is True or str(value).lower() in ('true', '1')
+
+
+def classify_urgency(record):
+    """Cheap pre-classification from raw input flags (no model call)."""
+    if not isinstance(record, dict):
+        return False
+    if record.get('mucous_membrane_color') in URGENT_MEMBRANE_COLORS:
+        return True
+    hydration = record.get('hydration_status')
+    if hydration in URGENT_HYDRATION:
+        return True
+    if _flag(record.get('vomiting')) and (hydration == 'moderate_dehydration'
+                                          or record.get('energy_level') == 'lethargic'):
+        return True
+    try:
+        temperature = float(record.get('temperature'))
+    except (TypeError, ValueError):
+        return False
+    return not URGENT_TEMPERATURE[0] <= temperature <= URGENT_TEMPERATURE[1]
+
+
+def priority_of(payload, priority=None):
+    """Priority class of a request: explicit if given, else from its size and urgency flags."""
+    if priority is not None:
+        if priority not in PRIORITIES:
+            raise ValueError(f"unknown priority {priority!r}")
+        return priority
+    records = payload if isinstance(payload, list) else [payload]
+    if len(records) > BATCH_THRESHOLD:
+        return "batch"
+    return "urgent" if any(classify_urgency(r) for r in records) else "interactive"
+
+
+class PriorityPool:
+    """Fixed pool of inference workers with per-priority bounded queues and weighted dispatch."""
+
+    def __init__(self, size, weights=None, queue_sizes=None, reserved=1,
+                 chunk_records=BATCH_CHUNK_RECORDS, env=None):
+        if size < 1:
+            raise ValueError("pool needs at least one worker")
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        self.queue_sizes = dict(queue_sizes or DEFAULT_QUEUE_SIZES)
+        self.reserved = min(reserved, size - 1)  # at least one worker must accept batch work
+        self.chunk_records = chunk_records
+        self.queues = {p: deque() for p in PRIORITIES}  # chunks: (future, payload, enqueued, last chunk?)
+        self.queued_requests = {p: 0 for p in PRIORITIES}
+        self.credit = {p: 0 for p in PRIORITIES}
+        self.cond = threading.Condition()
+        self.closing = False
+        self.counters = {p: {"submitted": 0, "rejected": 0, "completed": 0,
+                             "wait_ms": deque(maxlen=WAIT_SAMPLES)} for p in PRIORITIES}
+
+        self.workers = [ServeWorker(env) for _ in range(size)]
+        self.threads = [
+            threading.Thread(target=self._run, args=(worker, i >= self.reserved), daemon=True,
+                             name=f"pool-worker-{i}")
+            for i, worker in enumerate(self.workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    # --- Submission ---
+
+    def _chunks(self, payload, cls):
+        if cls == "batch" and isinstance(payload, list) and len(payload) > self.chunk_records:
+            return [payload[i:i + self.chunk_records] for i in range(0, len(payload), self.chunk_records)]
+        return [payload]
+
+    def submit(self, payload, priority=None):
+        """Queues a request; returns a Future of the worker's output. Raises queue.Full if its queue is full."""
+        cls = priority_of(payload, priority)
+        parts = self._chunks(payload, cls)
+        futures = [Future() for _ in parts]
+        with self.cond:
+            if self.closing:
+                raise RuntimeError("pool is closed")
+            if self.queued_requests[cls] >= self.queue_sizes[cls]:
+                self.counters[cls]["rejected"] += 1
+                raise queue.Full(f"{cls} queue is full")
+            self.counters[cls]["submitted"] += 1
+            self.queued_requests[cls] += 1
+            now = time.perf_counter()
+            for i, (part, future) in enumerate(zip(parts, futures)):
+                self.queues[cls].append((future, part, now, i == len(parts) - 1))
+            self.cond.notify_all()
+        return futures[0] if len(futures) == 1 else _combine(futures, parts)
+
+    def request(self, payload, priority=None):
+        """Blocking submit (same call shape as load_test.ServePool.request)."""
+        return self.submit(payload, priority).result()
+
+    # --- Dispatch ---
+
+    def _pick(self, allow_batch):
+        """Smooth weighted round robin over non-empty queues this worker may serve."""
+        eligible = [p for p in PRIORITIES if self.queues[p] and (allow_batch or p != "batch")]
+        if not eligible:
+            return None
+        for p in eligible:
+            self.credit[p] += self.weights[p]
+        chosen = max(eligible, key=lambda p: self.credit[p])
+        self.credit[chosen] -= sum(self.weights[p] for p in eligible)
+        return chosen
+
+    def _run(self, worker, allow_batch):
+        while True:
+            with self.cond:
+                cls = self._pick(allow_batch)
+                while cls is None:
+                    if self.closing:
+                        return
+                    self.cond.wait()
+                    cls = self._pick(allow_batch)
+                future, payload, enqueued, last = self.queues[cls].popleft()
+                if last:
+                    self.queued_requests[cls] -= 1
+                self.counters[cls]["wait_ms"].append((time.perf_counter() - enqueued) * 1000)
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(worker.request(payload))
+            except Exception as e:
+                future.set_exception(e)
+            with self.cond:
+                self.counters[cls]["completed"] += 1
+
+    def stats(self):
+        with self.cond:
+            out = {}
+            for p, c in self.counters.items():
+                waits = np.asarray(c["wait_ms"])
+                out[p] = {
+                    "queued": self.queued_requests[p],
+                    "queued_chunks": len(self.queues[p]),
+                    "submitted": c["submitted"],
+                    "rejected": c["rejected"],
+                    "completed": c["completed"],
+                    "wait_ms_p99": float(np.percentile(waits, 99)) if len(waits) else None,
+                }
+            return out
+
+    def close(self):
+        with self.cond:
+            self.closing = True
+            self.cond.notify_all()
+        for thread in self.threads:
+            thread.join()
+        for worker in self.workers:
+            worker.close()
+
+
+def _chunk_results(future, chunk):
+    """Per-record results of one chunk; a failed chunk gives one error result per record."""
+    try:
+        output = future.result()
+    except Exception as e:
+        output = {"success": False, "error": str(e)}
+    if "results" in output:
+        return output["results"], output
+    error = {"success": False, "status": None, "error": output.get("error")}
+    return [dict(error) for _ in chunk], output
+
+
+def _combine(futures, chunks):
+    """One Future for the outputs of a chunked batch, with one result per input record, in order."""
+    combined = Future()
+    combined.set_running_or_notify_cancel()
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        results, outputs = [], []
+        for future, chunk in zip(futures, chunks):
+            chunk_results, output = _chunk_results(future, chunk)
+            results.extend(chunk_results)
+            outputs.append(output)
+        combined.set_result({
+            "success": all(out.get("success") for out in outputs),
+            "results": results,
+            "prediction_timestamp": outputs[-1].get("prediction_timestamp"),
+        })
+
+    for f in futures:
+        f.add_done_callback(done)
+    return combined
+
+
+# --- Benchmark ---
+
+def _interactive_latencies(send, payloads, rate, duration):
+    """Open-loop single-record traffic; latency from scheduled send time (ms)."""
+    n = max(1, int(rate * duration))
+    latencies = np.full(n, np.nan)
+    errors = 0
+    t0 = time.perf_counter() + 0.05
+    for i in range(n):
+        scheduled = t0 + i / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        try:
+            ok = is_success(send(payloads[i % len(payloads)]))
+        except Exception:
+            ok = False
+        errors += not ok
+        latencies[i] = (time.perf_counter() - scheduled) * 1000
+    return latencies, errors
+
+
+def _run_scenario(send, payloads, batch, args, background):
+    stop = threading.Event()
+    batch_records = [0]
+
+    def batch_loop():
+        while not stop.is_set():
+            try:
+                send(batch, "batch")
+                batch_records[0] += len(batch)
+            except queue.Full:
+                time.sleep(0.01)
+
+    threads = [threading.Thread(target=batch_loop, daemon=True) for _ in range(background)]
+    for t in threads:
+        t.start()
+    start = time.perf_counter()
+    latencies, errors = _interactive_latencies(lambda p: send(p, None), payloads, args.interactive_rate, args.duration)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for t in threads:
+        t.join()
+    return {
+        "interactive_p50_ms": float(np.nanpercentile(latencies, 50)),
+        "interactive_p99_ms": float(np.nanpercentile(latencies, 99)),
+        "interactive_errors": int(errors),
+        "batch_records_per_s": batch_records[0] / elapsed,
+    }
+
+
+def benchmark(args):
+    payloads = generate_payloads(2000, seed=args.seed, unhealthy_fraction=0.1)
+    batch = payloads[:args.batch_size]
+
+    fifo = ServePool(args.workers)
+    priority = PriorityPool(args.workers, reserved=args.reserved)
+    pools = {
+        "fifo": (fifo, lambda payload, cls: fifo.request(payload)),
+        "priority": (priority, lambda payload, cls: priority.request(payload, cls)),
+    }
+    report = {}
+    try:
+        for name, (pool, send) in pools.items():
+            for worker in pool.workers:  # warm up: load the model in every worker
+                worker.request(payloads[0])
+            for scenario, background in (("idle", 0), ("batch_load", args.workers)):
+                r = _run_scenario(send, payloads, batch, args, background)
+                report[f"{name}_{scenario}"] = r
+                print(f"{name:<8} {scenario:<10} | interactive p50 {r['interactive_p50_ms']:8.1f} ms "
+                      f"p99 {r['interactive_p99_ms']:8.1f} ms | batch {r['batch_records_per_s']:9.1f} rec/s")
+        report["priority_stats"] = priority.stats()
+    finally:
+        fifo.close()
+        priority.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Priority-aware inference worker pool.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    bench = sub.add_parser("bench", help="Interactive latency under batch load: FIFO pool vs priority pool")
+    bench.add_argument("--workers", type=int, default=3)
+    bench.add_argument("--reserved", type=int, default=1, help="Workers that never take batch work")
+    bench.add_argument("--duration", type=float, default=10.0)
+    bench.add_argument("--interactive-rate", type=float, default=10.0, help="Single-record requests/s")
+    bench.add_argument("--batch-size", type=int, default=1000, help="Records per background batch request")
+    bench.add_argument("--seed", type=int, default=42)
+    bench.add_argument("--output", default=None, help="Write the JSON report here")
+    args = parser.parse_args()
+
+    report = benchmark(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
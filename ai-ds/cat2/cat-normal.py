@@ -2,6 +2,8 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import random
+import importlib.util
+from pathlib import Path
 
 # --- Configuration and Constants ---
 NUM_RECORDS = 1000
@@ -129,76 +131,16 @@ def generate_vaccination_data(num_vaccines=3):
 
 # --- Core Health Status Logic (Requirement 3) ---
 
-def calculate_health_status(row):
+def load_health_scoring():
     """
-    Computes Health Status based on a penalty score system.
-    Scores: Healthy (0-2), At Risk (3-6), Unhealthy (7+)
+    Returns (calculate_health_scores, health_status_from_scores) from cat-unhealthy.py,
+    which holds the one copy of the penalty rules, so both generators label alike.
     """
-    score = 0
-    
-    # 1. Vital Sign Deviation (Max Penalty: ~6 points)
-    temp = row['temperature']
-    hr = row['heart_rate']
-    rr = row['respiratory_rate']
-    sys = row['blood_pressure_systolic']
-    
-    # Temperature (Normal: 38.1–39.2 °C)
-    if temp < NORMAL_TEMP_C[0] - 0.5 or temp > NORMAL_TEMP_C[1] + 0.5:
-        score += 2 # Severe temp deviation (<37.6 or >39.7)
-    elif temp < NORMAL_TEMP_C[0] or temp > NORMAL_TEMP_C[1]:
-        score += 1 # Mild temp deviation
-        
-    # Heart Rate (Normal: 140–220 bpm)
-    if hr < NORMAL_HR_BPM[0] * 0.7 or hr > NORMAL_HR_BPM[1] * 1.2:
-        score += 2 # Severe deviation (<98 or >264)
-    elif hr < NORMAL_HR_BPM[0] or hr > NORMAL_HR_BPM[1]:
-        score += 1
-        
-    # Respiratory Rate (Normal: 20–30 breaths/min)
-    if rr < NORMAL_RR_BPM[0] * 0.5 or rr > NORMAL_RR_BPM[1] * 1.5:
-        score += 1.5 # Severe deviation (<10 or >45)
-    elif rr < NORMAL_RR_BPM[0] or rr > NORMAL_RR_BPM[1]:
-        score += 0.5
-        
-    # Blood Pressure (Systolic) (Normal: 120–180 mmHg)
-    if sys < NORMAL_BP_SYSTOLIC[0] * 0.8 or sys > NORMAL_BP_SYSTOLIC[1] * 1.1:
-        score += 0.5
-        
-    # 2. Number and Severity of Symptoms (Max Penalty: ~4 points)
-    symptom_count = (row['vomiting'] + row['diarrhea'] + row['coughing'] + row['limping'])
-    score += symptom_count * 0.5
-    
-    if row['appetite'] in ['decreased', 'absent']:
-        score += 1.5
-    if row['energy_level'] == 'lethargic':
-        score += 1.5
-    if row['aggression'] in ['moderate', 'severe']:
-        score += 1
-        
-    # 3. Hydration Level, Coat Condition, and MM Color (Max Penalty: ~4 points)
-    hydration_map = {'normal': 0, 'mild_dehydration': 1.5, 'moderate_dehydration': 3, 'severe_dehydration': 5}
-    score += hydration_map.get(row['hydration_status'], 0) / 2 # Max 2.5
-    
-    coat_map = {'healthy': 0, 'dull': 0.5, 'greasy': 1, 'matted': 1.5, 'patchy': 1}
-    score += coat_map.get(row['coat_condition'], 0) * 0.5 # Max 0.75
-    
-    if row['mucous_membrane_color'] in ['white', 'blue', 'yellow', 'red']:
-        score += 1.5
-        
-    # 4. Body Condition Score (BCS) (Max Penalty: 2 points)
-    bcs = row['body_condition_score']
-    if bcs <= 3 or bcs >= 7: # Underweight/Obese
-        score += 1
-    if bcs <= 2 or bcs >= 8: # Severely Underweight/Obese
-        score += 1
-        
-    # --- Final Classification ---
-    if score >= 7:
-        return 'Unhealthy'
-    elif score >= 3:
-        return 'At Risk'
-    else:
-        return 'Healthy'
+    path = Path(__file__).with_name('cat-unhealthy.py')
+    spec = importlib.util.spec_from_file_location('cat_unhealthy', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.calculate_health_scores, module.health_status_from_scores
 
 # --- Main Generator Function ---
 
@@ -293,7 +235,8 @@ def generate_cat_health_dataset(num_records):
     df = pd.DataFrame(data)
     
     # 5. Compute Final Health Status (based on actual generated values - Requirement 3)
-    df['health_status'] = df.apply(calculate_health_status, axis=1)
+    calculate_health_scores, health_status_from_scores = load_health_scoring()
+    df['health_status'] = health_status_from_scores(calculate_health_scores(df))
 
     return df
 
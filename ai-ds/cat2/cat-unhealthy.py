@@ -6,6 +6,7 @@ import random
 # --- Configuration and Constants ---
 NUM_RECORDS = 1000
 NUM_UNHEALTHY_SUPPLEMENT = 50 # New requirement
+HEALTH_CLASSES = ['Healthy', 'At Risk', 'Unhealthy']
 BREED_LIST = [
     "Siamese", "Persian", "Maine Coon", "Bengal", "Sphynx", 
     "Domestic Shorthair", "Ragdoll", "Scottish Fold", "Other"
@@ -128,72 +129,71 @@ def generate_vaccination_data(num_vaccines=3):
 
 # --- Core Health Status Logic (Requirement 3) ---
 
+# Penalty tables shared by the scorer below (and, through it, by cat-normal.py)
+HYDRATION_PENALTY = {'normal': 0, 'mild_dehydration': 1.5, 'moderate_dehydration': 3, 'severe_dehydration': 5}
+COAT_PENALTY = {'healthy': 0, 'dull': 0.5, 'greasy': 1, 'matted': 1.5, 'patchy': 1}
+
+
 def calculate_health_status(row):
     """
     Computes Health Status based on a penalty score system.
     Scores: Healthy (0-2), At Risk (3-6), Unhealthy (7+)
+    Single-record wrapper around calculate_health_scores, the one copy of the rules.
     """
-    score = 0
-    
+    return health_status_from_scores(calculate_health_scores(pd.DataFrame([row])))[0]
+
+
+def calculate_health_scores(df):
+    """
+    Penalty score of every record in a DataFrame (vectorized), as a float array.
+    Map to labels with health_status_from_scores.
+    """
+    def col(name):
+        return df[name].to_numpy()
+
+    temp = col('temperature').astype(float)
+    hr = col('heart_rate').astype(float)
+    rr = col('respiratory_rate').astype(float)
+    sys = col('blood_pressure_systolic').astype(float)
+
     # 1. Vital Sign Deviation (Max Penalty: ~6 points)
-    temp = row['temperature']
-    hr = row['heart_rate']
-    rr = row['respiratory_rate']
-    sys = row['blood_pressure_systolic']
-    
-    if temp < NORMAL_TEMP_C[0] - 0.5 or temp > NORMAL_TEMP_C[1] + 0.5:
-        score += 2
-    elif temp < NORMAL_TEMP_C[0] or temp > NORMAL_TEMP_C[1]:
-        score += 1
-        
-    if hr < NORMAL_HR_BPM[0] * 0.7 or hr > NORMAL_HR_BPM[1] * 1.2:
-        score += 2
-    elif hr < NORMAL_HR_BPM[0] or hr > NORMAL_HR_BPM[1]:
-        score += 1
-        
-    if rr < NORMAL_RR_BPM[0] * 0.5 or rr > NORMAL_RR_BPM[1] * 1.5:
-        score += 1.5
-    elif rr < NORMAL_RR_BPM[0] or rr > NORMAL_RR_BPM[1]:
-        score += 0.5
-        
-    if sys < NORMAL_BP_SYSTOLIC[0] * 0.8 or sys > NORMAL_BP_SYSTOLIC[1] * 1.1:
-        score += 0.5
-        
+    temp_far = (temp < NORMAL_TEMP_C[0] - 0.5) | (temp > NORMAL_TEMP_C[1] + 0.5)
+    temp_out = (temp < NORMAL_TEMP_C[0]) | (temp > NORMAL_TEMP_C[1])
+    score = np.where(temp_far, 2.0, np.where(temp_out, 1.0, 0.0))
+
+    hr_far = (hr < NORMAL_HR_BPM[0] * 0.7) | (hr > NORMAL_HR_BPM[1] * 1.2)
+    hr_out = (hr < NORMAL_HR_BPM[0]) | (hr > NORMAL_HR_BPM[1])
+    score += np.where(hr_far, 2.0, np.where(hr_out, 1.0, 0.0))
+
+    rr_far = (rr < NORMAL_RR_BPM[0] * 0.5) | (rr > NORMAL_RR_BPM[1] * 1.5)
+    rr_out = (rr < NORMAL_RR_BPM[0]) | (rr > NORMAL_RR_BPM[1])
+    score += np.where(rr_far, 1.5, np.where(rr_out, 0.5, 0.0))
+
+    score += 0.5 * ((sys < NORMAL_BP_SYSTOLIC[0] * 0.8) | (sys > NORMAL_BP_SYSTOLIC[1] * 1.1))
+
     # 2. Number and Severity of Symptoms (Max Penalty: ~4 points)
-    symptom_count = (row['vomiting'] + row['diarrhea'] + row['coughing'] + row['limping'])
+    symptom_count = sum(col(c).astype(bool).astype(int) for c in ['vomiting', 'diarrhea', 'coughing', 'limping'])
     score += symptom_count * 0.5
-    
-    if row['appetite'] in ['decreased', 'absent']:
-        score += 1.5
-    if row['energy_level'] == 'lethargic':
-        score += 1.5
-    if row['aggression'] in ['moderate', 'severe']:
-        score += 1
-        
+    score += 1.5 * np.isin(col('appetite'), ['decreased', 'absent'])
+    score += 1.5 * (col('energy_level') == 'lethargic')
+    score += 1.0 * np.isin(col('aggression'), ['moderate', 'severe'])
+
     # 3. Hydration Level, Coat Condition, and MM Color (Max Penalty: ~4 points)
-    hydration_map = {'normal': 0, 'mild_dehydration': 1.5, 'moderate_dehydration': 3, 'severe_dehydration': 5}
-    score += hydration_map.get(row['hydration_status'], 0) / 2
-    
-    coat_map = {'healthy': 0, 'dull': 0.5, 'greasy': 1, 'matted': 1.5, 'patchy': 1}
-    score += coat_map.get(row['coat_condition'], 0) * 0.5
-    
-    if row['mucous_membrane_color'] in ['white', 'blue', 'yellow', 'red']:
-        score += 1.5
-        
+    score += df['hydration_status'].map(HYDRATION_PENALTY).fillna(0).to_numpy() / 2
+    score += df['coat_condition'].map(COAT_PENALTY).fillna(0).to_numpy() * 0.5
+    score += 1.5 * np.isin(col('mucous_membrane_color'), ['white', 'blue', 'yellow', 'red'])
+
     # 4. Body Condition Score (BCS) (Max Penalty: 2 points)
-    bcs = row['body_condition_score']
-    if bcs <= 3 or bcs >= 7:
-        score += 1
-    if bcs <= 2 or bcs >= 8:
-        score += 1
-        
-    # --- Final Classification ---
-    if score >= 7:
-        return 'Unhealthy'
-    elif score >= 3:
-        return 'At Risk'
-    else:
-        return 'Healthy'
+    bcs = col('body_condition_score').astype(float)
+    score += 1.0 * ((bcs <= 3) | (bcs >= 7))
+    score += 1.0 * ((bcs <= 2) | (bcs >= 8))
+
+    return score
+
+
+def health_status_from_scores(scores):
+    """Maps penalty scores to labels: Healthy (0-2), At Risk (3-6), Unhealthy (7+)."""
+    return np.where(scores >= 7, 'Unhealthy', np.where(scores >= 3, 'At Risk', 'Healthy')).astype(object)
 
 # --- Main Generator Function ---
 
@@ -300,6 +300,138 @@ def generate_record(predefined_category=None):
     return record
 
 
+# Vital sign distributions per biased category: (mean, std) for temp, hr, rr, sys, dia
+VITALS_PARAMS = {
+    'Healthy': [(38.65, 0.25), (180, 20), (25, 3), (150, 15), (95, 10)],
+    'At Risk': [(38.65, 0.4), (180, 35), (25, 5), (150, 25), (95, 15)],
+}
+VITALS_LIMITS = [(ABS_MIN_TEMP, ABS_MAX_TEMP), (ABS_MIN_HR, ABS_MAX_HR), (ABS_MIN_RR, ABS_MAX_RR),
+                 (ABS_MIN_SYS, ABS_MAX_SYS), (ABS_MIN_DIA, ABS_MAX_DIA)]
+
+
+def _choice(dist, n):
+    return np.random.choice(list(dist.keys()), size=n, p=list(dist.values()))
+
+
+def _list_fields(options, n, max_count, include_empty_prob):
+    """Vectorized generate_list_field: n lists of distinct options."""
+    counts = np.where(np.random.random(n) < include_empty_prob, 0, np.random.randint(1, max_count + 1, n))
+    order = np.argsort(np.random.random((n, len(options))), axis=1)
+    names = np.array(options, dtype=object)[order]
+    return [names[i, :c].tolist() for i, c in enumerate(counts)]
+
+
+def _vaccination_fields(n, num_vaccines=3):
+    """Vectorized generate_vaccination_data."""
+    vaccine_names = ["Rabies", "FVRCP", "FeLV"]
+    counts = np.where(np.random.random(n) < 0.2, 0, np.random.randint(1, num_vaccines + 1, n))
+    order = np.argsort(np.random.random((n, len(vaccine_names))), axis=1)
+    dates = (pd.Timestamp(datetime.now()) - pd.to_timedelta(np.random.randint(30, 731, order.size), unit='D'))
+    dates = np.asarray(dates.strftime('%Y-%m-%d'), dtype=object).reshape(order.shape)
+    statuses = np.random.choice(['up_to_date', 'overdue'], size=order.shape).astype(object)
+    return [
+        [{'vaccine_name': vaccine_names[order[i, j]], 'administered_date': dates[i, j], 'status': statuses[i, j]}
+         for j in range(c)]
+        for i, c in enumerate(counts)
+    ]
+
+
+def generate_records(category, n):
+    """
+    Generates n records biased towards `category` as one DataFrame: the same
+    distributions as generate_record(predefined_category=category), drawn a
+    column at a time from np.random instead of a record at a time.
+    """
+    days_ago = np.random.randint(30, 15 * 365 + 1, n)
+    dob = pd.Timestamp(datetime.now()) - pd.to_timedelta(days_ago, unit='D')
+
+    if category == 'Unhealthy':
+        skew = np.random.choice([-1, 1], n) * np.random.uniform(0.5, 1.5, n)
+        params = [(38.65 + skew, 0.5), (180 + skew * 20, 40), (25 + skew * 5, 10),
+                  (150 + skew * 20, 30), (95 + skew * 10, 20)]
+    else:
+        params = VITALS_PARAMS[category]
+    temp, hr, rr, sys, dia = (np.clip(np.random.normal(mean, std, n), low, high)
+                              for (mean, std), (low, high) in zip(params, VITALS_LIMITS))
+    weight_kg = np.clip(np.random.normal(4.5, 1.5, n), 1.0, 10.0)
+
+    if category == 'Unhealthy':
+        hydration_dist = {'normal': 0.05, 'mild_dehydration': 0.15, 'moderate_dehydration': 0.40, 'severe_dehydration': 0.40}
+        coat_dist = {'healthy': 0.05, 'dull': 0.20, 'greasy': 0.25, 'matted': 0.30, 'patchy': 0.20}
+        appetite_dist = {'normal': 0.10, 'decreased': 0.30, 'absent': 0.60}
+        energy_dist = {'normal': 0.05, 'lethargic': 0.85, 'hyperactive': 0.10}
+        bcs = np.random.choice([1, 2, 7, 8, 9], n)
+        vomit = np.ones(n, dtype=bool)
+        diarrhea = np.random.random(n) < 0.7
+        limping = np.random.random(n) < 0.3
+        diagnosis_text = np.random.choice([
+            "Severe gastroenteritis and dehydration.",
+            "Acute kidney injury suspected; further diagnostics needed.",
+            "Diabetic ketoacidosis due to uncontrolled diabetes.",
+            "Severe upper respiratory infection with high fever."
+        ], n)
+        treatment_text = np.random.choice([
+            "Hospitalization for IV fluids and supportive care.",
+            "Aggressive antibiotic and anti-emetic therapy.",
+            "Referral to internal medicine specialist."
+        ], n)
+    else:
+        hydration_dist = HYDRATION_STATUS_DIST
+        coat_dist = COAT_CONDITION_DIST
+        appetite_dist = APPETITE_DIST
+        energy_dist = ENERGY_LEVEL_DIST
+        bcs = _choice(BODY_CONDITION_SCORE_DIST, n)
+        vomit = np.random.random(n) < 0.15
+        diarrhea = np.random.random(n) < 0.15
+        limping = np.random.random(n) < 0.05
+        diagnosis_text = f"General check-up. The cat is {category.lower()}."
+        treatment_text = "No specific treatment required." if category == 'Healthy' else f"Recommended treatment for {category.lower()} condition."
+
+    return pd.DataFrame({
+        # Pet Snapshot
+        'species': 'Cat',
+        'name': np.random.choice(CAT_NAMES, n),
+        'breed': np.random.choice(BREED_LIST, n),
+        'date_of_birth': dob.strftime('%Y-%m-%d'),
+        'age_in_months': (days_ago / 30.44).astype(int),
+        'weight_kg': np.round(weight_kg, 1),
+
+        # Vitals
+        'temperature': np.round(temp, 1),
+        'heart_rate': hr.astype(int),
+        'respiratory_rate': rr.astype(int),
+        'blood_pressure_systolic': sys.astype(int),
+        'blood_pressure_diastolic': dia.astype(int),
+
+        # Cat-Specific Metrics
+        'body_condition_score': bcs,
+        'hydration_status': _choice(hydration_dist, n),
+        'mucous_membrane_color': _choice(MM_COLOR_DIST, n),
+        'coat_condition': _choice(coat_dist, n),
+
+        # Behavioral Observations
+        'appetite': _choice(appetite_dist, n),
+        'energy_level': _choice(energy_dist, n),
+        'aggression': np.random.choice(['none'] * 8 + ['mild', 'moderate', 'severe'], n),
+        'vomiting': vomit,
+        'diarrhea': diarrhea,
+        'coughing': np.random.random(n) < 0.05,
+        'limping': limping,
+
+        # Clinical/History Data
+        'vaccinations': _vaccination_fields(n),
+        'diagnosis_text': diagnosis_text,
+        'treatment_text': treatment_text,
+
+        # History Lists
+        'allergies': _list_fields(["Fish Protein", "Flea Bite", "Pollen"], n, max_count=2, include_empty_prob=0.6),
+        'chronic_conditions': _list_fields(["Feline Hyperthyroidism", "Chronic Kidney Disease", "Dental Disease"], n, max_count=2, include_empty_prob=0.7),
+        'prescriptions': _list_fields(["Amoxicillin", "Metronidazole", "Prednisolone"], n, max_count=1, include_empty_prob=0.6),
+
+        # Status Label (Placeholder - calculated later)
+        'health_status': category,
+    }, index=pd.RangeIndex(n))
+
 def generate_cat_health_dataset(num_records, unhealthy_supplement=0):
     """Generates the full synthetic cat health record dataset, including a supplementary set."""
     
@@ -318,7 +450,7 @@ def generate_cat_health_dataset(num_records, unhealthy_supplement=0):
     
     # 3. Compute Final Health Status (based on actual generated values)
     # This step validates the generated data against the logic, correcting misclassified records
-    df['health_status_calculated'] = df.apply(calculate_health_status, axis=1)
+    df['health_status_calculated'] = health_status_from_scores(calculate_health_scores(df))
     
     # Keep the final calculated status and drop the temporary one
     df['health_status'] = df['health_status_calculated']
@@ -326,15 +458,130 @@ def generate_cat_health_dataset(num_records, unhealthy_supplement=0):
     
     return df
 
+def parse_quotas(spec):
+    """'Healthy=1000,At Risk=1000,Unhealthy=1000' -> {class: count}."""
+    quotas = {}
+    for item in spec.split(','):
+        if item.strip():
+            label, count = item.split('=')
+            quotas[label.strip()] = int(count)
+    unknown = set(quotas) - set(HEALTH_CLASSES)
+    if unknown:
+        raise ValueError(f"unknown health classes: {sorted(unknown)}")
+    return quotas
+
+
+# Quota mode: oversample-and-filter settings
+QUOTA_MIN_BATCH = 64
+QUOTA_MARGIN = 1.15   # oversample by this factor over the expected need
+QUOTA_MAX_ROUNDS = 50
+
+
+def generate_quota_dataset(quotas, min_batch=QUOTA_MIN_BATCH, margin=QUOTA_MARGIN, max_rounds=QUOTA_MAX_ROUNDS,
+                           seed=None):
+    """Generates exactly quotas[label] records per final health_status.
+
+    Each round generates one batch per class that is still short, biased
+    towards that class (generate_records, vectorized), labels the whole round
+    with the vectorized score and keeps rows for every class that still needs
+    them, whichever batch they came from. Batch sizes come from the acceptance
+    rates observed so far, so later rounds rarely overshoot.
+
+    `seed` seeds `np.random` (and `random`, for callers mixing in
+    generate_record), so a seeded run is reproducible.
+
+    Returns (DataFrame shuffled across classes, acceptance statistics dict).
+    """
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+    need = {label: quotas.get(label, 0) for label in HEALTH_CLASSES}
+    # Observed outcomes per biased category, seeded with one optimistic pseudo-row
+    # (every row lands on target), so the first round never overshoots by more than the margin
+    outcomes = {src: {label: float(label == src) for label in HEALTH_CLASSES} for src in HEALTH_CLASSES}
+    generated = {src: 1.0 for src in HEALTH_CLASSES}
+    kept = {label: [] for label in HEALTH_CLASSES}
+    rounds = 0
+
+    while any(need.values()):
+        if rounds == max_rounds:
+            raise RuntimeError(f"quotas not met after {max_rounds} rounds; still missing {need}")
+        rounds += 1
+
+        # 1. Batch per short class, from the category most likely to produce it
+        frames, sources = [], []
+        for label, missing in need.items():
+            if not missing:
+                continue
+            source = max(HEALTH_CLASSES, key=lambda src: outcomes[src][label] / generated[src])
+            rate = outcomes[source][label] / generated[source]
+            size = max(min_batch, int(np.ceil(missing / max(rate, 1e-3) * margin)))
+            frames.append(generate_records(source, size))
+            sources.append(np.full(size, source, dtype=object))
+
+        # 2. Label the round in one vectorized pass
+        df = pd.concat(frames, ignore_index=True)
+        df['health_status'] = health_status_from_scores(calculate_health_scores(df))
+        sources = np.concatenate(sources)
+        for src in np.unique(sources):
+            labels = df['health_status'].to_numpy()[sources == src]
+            generated[src] += len(labels)
+            for label, n in zip(*np.unique(labels, return_counts=True)):
+                outcomes[src][label] += n
+
+        # 3. Keep what each class still needs
+        for label in HEALTH_CLASSES:
+            if need[label]:
+                rows = df[df['health_status'] == label].head(need[label])
+                kept[label].append(rows)
+                need[label] -= len(rows)
+
+    frames = [frame for label in HEALTH_CLASSES for frame in kept[label]]
+    result = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    result = result.iloc[np.random.permutation(len(result))].reset_index(drop=True)
+
+    total_generated = int(sum(generated.values()) - len(HEALTH_CLASSES))
+    stats = {
+        'rounds': rounds,
+        'generated': total_generated,
+        'accepted': len(result),
+        'acceptance_rate': len(result) / total_generated if total_generated else 1.0,
+        # Share of each biased category's rows that landed in each class
+        'outcomes_by_category': {
+            src: {label: round(float(outcomes[src][label] - (label == src)) / (generated[src] - 1.0), 4)
+                  for label in HEALTH_CLASSES}
+            for src in HEALTH_CLASSES if generated[src] > 1.0
+        },
+    }
+    return result, stats
+
 # --- Execution ---
 if __name__ == "__main__":
-    print(f"Generating main dataset ({NUM_RECORDS} records) plus {NUM_UNHEALTHY_SUPPLEMENT} supplementary 'Unhealthy' records...")
-    
-    # Generate the combined dataset (1000 + 50 = 1050 records)
-    cat_df = generate_cat_health_dataset(NUM_RECORDS, NUM_UNHEALTHY_SUPPLEMENT)
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Generate the synthetic cat health dataset.")
+    parser.add_argument('--quota', default=None,
+                        help="Exact per-class counts, e.g. 'Healthy=1000,At Risk=1000,Unhealthy=1000'")
+    parser.add_argument('--output', default='cat_health_dataset_supplemented.csv')
+    parser.add_argument('--seed', type=int, default=None, help="Seed for reproducible --quota output")
+    args = parser.parse_args()
+    FILE_NAME = args.output
+
+    if args.quota:
+        quotas = parse_quotas(args.quota)
+        print(f"Generating exact class quotas: {quotas}")
+        cat_df, stats = generate_quota_dataset(quotas, seed=args.seed)
+        print(f"Acceptance: {stats['accepted']} of {stats['generated']} generated rows kept "
+              f"({stats['acceptance_rate']:.1%}) in {stats['rounds']} rounds")
+        print(json.dumps(stats['outcomes_by_category'], indent=2))
+    else:
+        print(f"Generating main dataset ({NUM_RECORDS} records) plus {NUM_UNHEALTHY_SUPPLEMENT} supplementary 'Unhealthy' records...")
+
+        # Generate the combined dataset (1000 + 50 = 1050 records)
+        cat_df = generate_cat_health_dataset(NUM_RECORDS, NUM_UNHEALTHY_SUPPLEMENT)
     
     # Save the dataset
-    FILE_NAME = 'cat_health_dataset_supplemented.csv'
     cat_df.to_csv(FILE_NAME, index=False)
     
     print(f"\n✅ Combined Dataset successfully generated with {len(cat_df)} total rows and saved to '{FILE_NAME}'.")
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Data Science Pipeline
+Runs the cat health workflow as a DAG of stages and re-runs only what is
+stale:
+
+  generate_normal ─┐
+                   ├─ combine ─┬─ validate ─┬─ train ─ compact ─ bundle
+  generate_unhealthy ┘         └─ encode ───┘
+
+Each stage declares its code files (entry scripts plus the sibling modules
+they import, see local_imports), input files and outputs. Its fingerprint
+hashes the command, the code and the input contents; a stage runs when the
+fingerprint differs from the last successful run, an output is missing or an
+output was changed since. Outputs are content-hashed, so a stage that re-runs
+but reproduces the same bytes does not invalidate the stages after it (e.g.
+retraining after a logging-only change to train_model.py).
+
+Independent stages run in parallel (--jobs). Stage logs go to
+build/logs/<stage>.log; durations and statuses to build/pipeline_report.json.
+
+Usage:
+  python pipeline.py                       (build everything that is stale)
+  python pipeline.py train                 (only what `train` needs)
+  python pipeline.py --dry-run
+  python pipeline.py --force train --jobs 4
+  python pipeline.py --quota "Healthy=3000,At Risk=3000,Unhealthy=3000"
+"""
+
+import ast
+import sys
+import json
+import time
+import shutil
+import hashlib
+import inspect
+import argparse
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+AI_DS_DIR = Path(__file__).resolve().parent
+CAT_DIR = AI_DS_DIR / "cat"
+CAT2_DIR = AI_DS_DIR / "cat2"
+BUILD_DIR = AI_DS_DIR / "build"
+STATE_FILE = BUILD_DIR / "pipeline_state.json"
+REPORT_FILE = BUILD_DIR / "pipeline_report.json"
+LOG_DIR = BUILD_DIR / "logs"
+HASH_BLOCK_BYTES = 1024 * 1024
+
+
+class Stage:
+    """One pipeline step: a subprocess command or a Python function(stage, log)."""
+
+    def __init__(self, name, deps=(), command=None, function=None, cwd=None,
+                 code=(), inputs=(), outputs=(), extra=None):
+        self.name = name
+        self.deps = list(deps)
+        self.command = [str(c) for c in command] if command else None
+        self.function = function
+        self.cwd = cwd or CAT_DIR
+        self.code = [Path(p) for p in code]
+        self.inputs = [Path(p) for p in inputs]
+        self.outputs = [Path(p) for p in outputs]
+        self.extra = extra  # callable returning extra fingerprint material
+
+    def describe(self):
+        if self.command:
+            return " ".join(self.command)
+        return f"{self.function.__name__}() " + inspect.getsource(self.function)
+
+
+# --- Stage functions ---
+
+def combine_csvs(stage, log):
+    """Same as cat2/combine-vertically.py, over the declared inputs instead of *.csv in the cwd."""
+    import pandas as pd
+    df = pd.concat([pd.read_csv(f) for f in stage.inputs], ignore_index=True)
+    df.to_csv(stage.outputs[0], index=False)
+    print(f"Combined {len(stage.inputs)} files into {len(df)} rows", file=log)
+
+
+def bundle_model(stage, log):
+    """Copies the deployable files into build/bundle with a manifest of their hashes."""
+    bundle_dir = stage.outputs[0].parent
+    bundle_dir.mkdir(parents=True, exist_ok=True)
+    files = {}
+    for path in stage.inputs:
+        shutil.copy2(path, bundle_dir / path.name)
+        files[path.name] = file_sha256(path)
+    with open(BUILD_DIR / "encode.json") as f:
+        encoded = json.load(f)
+    manifest = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "files": files,
+        "training_cols": encoded["columns"],
+        "training_rows": encoded["rows"],
+    }
+    with open(stage.outputs[0], "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Bundled {len(files)} files into {bundle_dir}", file=log)
+
+
+def local_imports(*scripts):
+    """The scripts plus the sibling modules they import at module level, transitively.
+
+    Imports inside functions are not followed (ml_inference.py loads its serving
+    extras lazily), nor are files loaded through importlib: list those explicitly.
+    """
+    found, todo = [], [Path(s) for s in scripts]
+    while todo:
+        path = todo.pop(0)
+        if path in found:
+            continue
+        found.append(path)
+        for node in ast.parse(path.read_text()).body:
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                module = path.parent / f"{name.split('.')[0]}.py"
+                if module.exists():
+                    todo.append(module)
+    return found
+
+
+def encoder_fingerprint():
+    sys.path.insert(0, str(CAT_DIR))
+    from feature_cache import encoder_digest
+    return encoder_digest()
+
+
+def build_stages(quota=None):
+    py = sys.executable
+    normal_csv = BUILD_DIR / "generate_normal" / "cat_health_dataset.csv"
+    unhealthy_csv = BUILD_DIR / "cat_health_dataset_supplemented.csv"
+    combined_csv = BUILD_DIR / "combined.csv"
+    validation = BUILD_DIR / "validation.json"
+    encoded = BUILD_DIR / "encode.json"
+    model = BUILD_DIR / "model.pkl"
+    compact = BUILD_DIR / "model.compact.npz"
+    parity = BUILD_DIR / "model.compact.npz.parity.json"
+    # validate_dataset.py loads the generator's scoring rules through importlib
+    validate_code = local_imports(CAT_DIR / "validate_dataset.py", CAT2_DIR / "cat-unhealthy.py")
+
+    return [
+        # cat-normal.py writes a fixed file name into its working directory (and loads
+        # its labelling rules from cat-unhealthy.py)
+        Stage("generate_normal", command=[py, CAT2_DIR / "cat-normal.py"], cwd=normal_csv.parent,
+              code=[CAT2_DIR / "cat-normal.py", CAT2_DIR / "cat-unhealthy.py"], outputs=[normal_csv]),
+        Stage("generate_unhealthy",
+              command=[py, CAT2_DIR / "cat-unhealthy.py", "--output", unhealthy_csv]
+              + (["--quota", quota] if quota else []),
+              cwd=BUILD_DIR, code=[CAT2_DIR / "cat-unhealthy.py"], outputs=[unhealthy_csv]),
+        Stage("combine", deps=["generate_normal", "generate_unhealthy"], function=combine_csvs,
+              inputs=[normal_csv, unhealthy_csv], outputs=[combined_csv]),
+        Stage("validate", deps=["combine"],
+              command=[py, CAT_DIR / "validate_dataset.py", combined_csv, "--output", validation],
+              code=validate_code, inputs=[combined_csv], outputs=[validation]),
+        # Only the encoding functions of train_model.py count, so hyperparameter edits keep this stage fresh
+        Stage("encode", deps=["combine"],
+              command=[py, CAT_DIR / "feature_cache.py", "warm", combined_csv, "--record", encoded],
+              code=[CAT_DIR / "feature_cache.py"], inputs=[combined_csv], outputs=[encoded],
+              extra=encoder_fingerprint),
+        Stage("train", deps=["validate", "encode"],
+              command=[py, CAT_DIR / "train_model.py", "--data", combined_csv, "--output", model],
+              code=local_imports(CAT_DIR / "train_model.py", CAT_DIR / "coreset.py", CAT_DIR / "feature_cache.py"),
+              inputs=[combined_csv, encoded], outputs=[model]),
+        Stage("compact", deps=["train"],
+              command=[py, CAT_DIR / "compact_model.py", "--model", model, "--data", combined_csv,
+                       "--output", compact],
+              # compact_model.py imports ml_inference inside main(); list it as an entry point
+              code=local_imports(CAT_DIR / "compact_model.py", CAT_DIR / "ml_inference.py"),
+              inputs=[model, combined_csv], outputs=[compact, parity]),
+        Stage("bundle", deps=["train", "compact", "validate"], function=bundle_model,
+              inputs=[model, compact, parity, combined_csv, validation],
+              outputs=[BUILD_DIR / "bundle" / "manifest.json"]),
+    ]
+
+
+# --- Fingerprints ---
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class FileHashes:
+    """Content hashes memoized by (size, mtime), persisted with the pipeline state."""
+
+    def __init__(self, known):
+        self.known = known
+
+    def __call__(self, path):
+        stat = Path(path).stat()
+        key = str(Path(path).resolve())
+        entry = self.known.get(key)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["sha256"]
+        digest = file_sha256(path)
+        self.known[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+        return digest
+
+
+def fingerprint(stage, hashes):
+    h = hashlib.sha256(stage.describe().encode())
+    for path in stage.code + stage.inputs:
+        h.update(str(path).encode())
+        h.update(hashes(path).encode())
+    if stage.extra:
+        h.update(stage.extra().encode())
+    return h.hexdigest()
+
+
+def is_fresh(stage, record, fp, hashes):
+    if not record or record.get("fingerprint") != fp:
+        return False
+    outputs = record.get("outputs", {})
+    return all(p.exists() and outputs.get(str(p)) == hashes(p) for p in stage.outputs)
+
+
+# --- Execution ---
+
+def run_stage(stage):
+    """Runs one stage, logging to build/logs/<name>.log; returns (ok, seconds)."""
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    Path(stage.cwd).mkdir(parents=True, exist_ok=True)
+    for output in stage.outputs:
+        output.parent.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    with open(LOG_DIR / f"{stage.name}.log", "w") as log:
+        if stage.command:
+            ok = subprocess.run(stage.command, cwd=stage.cwd, stdout=log, stderr=subprocess.STDOUT).returncode == 0
+        else:
+            try:
+                stage.function(stage, log)
+                ok = True
+            except Exception as e:
+                log.write(f"{type(e).__name__}: {e}\n")
+                ok = False
+    ok = ok and all(p.exists() for p in stage.outputs)
+    return ok, time.perf_counter() - start
+
+
+def needed_stages(stages, targets):
+    by_name = {s.name: s for s in stages}
+    unknown = [t for t in targets if t not in by_name]
+    if unknown:
+        raise SystemExit(f"Unknown stage(s): {', '.join(unknown)}; stages are {', '.join(by_name)}")
+    needed, todo = set(), list(targets or by_name)
+    while todo:
+        name = todo.pop()
+        if name not in needed:
+            needed.add(name)
+            todo.extend(by_name[name].deps)
+    return [s for s in stages if s.name in needed]
+
+
+def run_pipeline(stages, jobs=2, force=(), dry_run=False):
+    state = json.loads(STATE_FILE.read_text()) if STATE_FILE.exists() else {"stages": {}, "files": {}}
+    hashes = FileHashes(state["files"])
+    status = {}       # name -> fresh | ran | failed | skipped | stale
+    durations = {}
+    running = {}
+    pending = list(stages)
+
+    def ready(stage):
+        return all(status.get(d) in ("fresh", "ran") for d in stage.deps)
+
+    def blocked(stage):
+        return any(status.get(d) in ("failed", "skipped", "stale") for d in stage.deps)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            progressed = False
+            for stage in list(pending):
+                if blocked(stage):
+                    # In a dry run, everything after a stale stage is stale too
+                    status[stage.name] = "stale" if dry_run else "skipped"
+                elif ready(stage):
+                    fp = fingerprint(stage, hashes)
+                    fresh = stage.name not in force and is_fresh(stage, state["stages"].get(stage.name), fp, hashes)
+                    if fresh:
+                        status[stage.name] = "fresh"
+                    elif dry_run:
+                        status[stage.name] = "stale"
+                    else:
+                        print(f"▶ {stage.name}")
+                        running[pool.submit(run_stage, stage)] = (stage, fp)
+                        status[stage.name] = "running"
+                else:
+                    continue
+                pending.remove(stage)
+                progressed = True
+            if progressed or not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, fp = running.pop(future)
+                ok, seconds = future.result()
+                durations[stage.name] = seconds
+                if ok:
+                    status[stage.name] = "ran"
+                    state["stages"][stage.name] = {
+                        "fingerprint": fp,
+                        "outputs": {str(p): hashes(p) for p in stage.outputs},
+                        "seconds": seconds,
+                        "finished": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    }
+                    print(f"✅ {stage.name} ({seconds:.1f} s)")
+                else:
+                    status[stage.name] = "failed"
+                    state["stages"].pop(stage.name, None)
+                    print(f"❌ {stage.name} failed ({seconds:.1f} s); see {LOG_DIR / (stage.name + '.log')}")
+
+    report = {
+        "finished": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "seconds": time.perf_counter() - start,
+        "dry_run": dry_run,
+        "stages": {s.name: {"status": status[s.name], "seconds": durations.get(s.name)} for s in stages},
+    }
+    if not dry_run:
+        BUILD_DIR.mkdir(parents=True, exist_ok=True)
+        STATE_FILE.write_text(json.dumps(state, indent=2))
+        REPORT_FILE.write_text(json.dumps(report, indent=2))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental build of the cat health data/model pipeline.")
+    parser.add_argument("targets", nargs="*", help="Stages to bring up to date (default: all)")
+    parser.add_argument("--jobs", type=int, default=2, help="Stages run in parallel")
+    parser.add_argument("--force", action="append", default=[], help="Re-run this stage even if fresh")
+    parser.add_argument("--dry-run", action="store_true", help="Only report which stages are stale")
+    parser.add_argument("--quota", default=None, help="Exact class counts for generate_unhealthy (see --quota there)")
+    args = parser.parse_args()
+
+    stages = needed_stages(build_stages(args.quota), args.targets)
+    report = run_pipeline(stages, args.jobs, set(args.force), args.dry_run)
+
+    print(f"\n{'stage':<20} {'status':<8} {'seconds':>8}")
+    for name, s in report["stages"].items():
+        seconds = f"{s['seconds']:.1f}" if s["seconds"] is not None else "-"
+        print(f"{name:<20} {s['status']:<8} {seconds:>8}")
+    print(f"Total {report['seconds']:.1f} s")
+    if any(s["status"] in ("failed", "skipped") for s in report["stages"].values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
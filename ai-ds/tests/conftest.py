@@ -0,0 +1,21 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The ai-ds/cat scripts import each other as top-level modules
+CAT_DIR = Path(__file__).resolve().parent.parent / "cat"
+sys.path.insert(0, str(CAT_DIR))
+
+
+@pytest.fixture(scope="session")
+def assets():
+    """The deployed cat model with its reconstructed training columns."""
+    from ml_inference import load_model_assets
+    return load_model_assets()
+
+
+@pytest.fixture(scope="session")
+def payloads():
+    from synthetic import generate_payloads
+    return generate_payloads(60, seed=3, unhealthy_fraction=0.2)
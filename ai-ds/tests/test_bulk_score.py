@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+import bulk_score
+from bulk_score import bulk_score as run_bulk_score, checkpoint_path
+from ml_inference import PREDICTION_CACHE_ENV
+
+BEHAVIOR_KEYS = [("appetite", "appetite"), ("energy_level", "energyLevel"), ("aggression", "aggression"),
+                 ("vomiting", "vomiting"), ("diarrhea", "diarrhea"), ("coughing", "coughing"), ("limping", "limping")]
+
+
+@pytest.fixture(autouse=True)
+def no_prediction_cache(monkeypatch):
+    monkeypatch.delenv(PREDICTION_CACHE_ENV, raising=False)
+
+
+def _doc(i, p):
+    return {
+        "_id": f"r{i}", "pet_id": f"p{i}", "visitDate": {"$date": "2026-01-01T10:00:00Z"},
+        "petSnapshot": {"breed": p["breed"], "ageInMonths": p["age_in_months"]},
+        "vitals": {"weight": {"value": p["weight_kg"]}, "temperature": {"value": p["temperature"]},
+                   "heartRate": {"value": p["heart_rate"]}, "respiratoryRate": {"value": p["respiratory_rate"]},
+                   "bloodPressure": {"systolic": p["blood_pressure_systolic"],
+                                     "diastolic": p["blood_pressure_diastolic"]}},
+        "catMetrics": {"bodyConditionScore": p["body_condition_score"], "hydrationStatus": p["hydration_status"],
+                       "mucousMembraneColor": p["mucous_membrane_color"], "coatCondition": p["coat_condition"]},
+        "behavior": {doc_key: p[key] for key, doc_key in BEHAVIOR_KEYS},
+    }
+
+
+@pytest.fixture
+def export(tmp_path, payloads):
+    lines = [json.dumps(_doc(i, p)) + "\n" for i, p in enumerate(payloads)]
+    lines.insert(7, "not json\n")
+    path = tmp_path / "export.jsonl"
+    path.write_text("".join(lines))
+    return path
+
+
+def test_resume_after_crash_matches_uninterrupted_run(tmp_path, export, assets, monkeypatch):
+    reference = tmp_path / "reference.jsonl"
+    expected = run_bulk_score(export, reference, assets, assets["version"], chunk_size=10)
+    assert expected["done"] and expected["records"] == 61 and expected["failed"] == 1
+
+    # Crash while scoring the third chunk, after a partial write past the checkpoint
+    output = tmp_path / "scores.jsonl"
+    score_chunk = bulk_score.score_chunk
+    calls = []
+
+    def crashing_score_chunk(docs, assets, version):
+        calls.append(len(docs))
+        if len(calls) == 3:
+            with open(output, "a") as f:
+                f.write('{"partial": ')
+            raise KeyboardInterrupt
+        return score_chunk(docs, assets, version)
+
+    monkeypatch.setattr(bulk_score, "score_chunk", crashing_score_chunk)
+    with pytest.raises(KeyboardInterrupt):
+        run_bulk_score(export, output, assets, assets["version"], chunk_size=10)
+    checkpoint = json.loads(checkpoint_path(output).read_text())
+    assert checkpoint["records"] == 20 and not checkpoint["done"]
+
+    monkeypatch.setattr(bulk_score, "score_chunk", score_chunk)
+    resumed = run_bulk_score(export, output, assets, assets["version"], chunk_size=10)
+    assert output.read_text() == reference.read_text()
+    assert {k: resumed[k] for k in ("records", "failed", "done")} == {"records": 61, "failed": 1, "done": True}
+
+
+def test_completed_run_is_not_rescored(tmp_path, export, assets, monkeypatch):
+    output = tmp_path / "scores.jsonl"
+    run_bulk_score(export, output, assets, assets["version"], chunk_size=25)
+    monkeypatch.setattr(bulk_score, "score_chunk", lambda *args: pytest.fail("rescored a finished export"))
+    assert run_bulk_score(export, output, assets, assets["version"], chunk_size=25)["done"]
+
+
+def test_checkpoint_from_another_model_is_refused(tmp_path, export, assets):
+    output = tmp_path / "scores.jsonl"
+    run_bulk_score(export, output, assets, assets["version"], chunk_size=25)
+    with pytest.raises(SystemExit):
+        run_bulk_score(export, output, assets, "other-model-000000000000", chunk_size=25)
+    assert run_bulk_score(export, output, assets, "other-model-000000000000", restart=True)["records"] == 61
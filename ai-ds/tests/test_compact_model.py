@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from compact_model import PARITY_TOLERANCE, build_compact_model, calibrate_base_margin, load_compact_model
+from ml_inference import (DATASET_FILE, PREDICTION_CACHE_ENV, load_compact_assets, predict_batch,
+                          preprocess_and_align_data)
+
+
+@pytest.fixture(autouse=True)
+def no_prediction_cache(monkeypatch):
+    monkeypatch.delenv(PREDICTION_CACHE_ENV, raising=False)
+
+
+@pytest.fixture(scope="module")
+def compact_file(assets, tmp_path_factory):
+    df = pd.read_csv(DATASET_FILE)
+    X = preprocess_and_align_data(df.drop(columns="health_status"), assets["training_cols"]).astype(np.float32)
+    compact = build_compact_model(assets["model"], assets["classes"], assets["categorical_levels"], "test.pkl")
+    assert calibrate_base_margin(compact, assets["model"], X) < PARITY_TOLERANCE
+    path = tmp_path_factory.mktemp("compact") / "model.compact.npz"
+    compact.save(path)
+    return path
+
+
+def test_compact_probabilities_match_xgboost(assets, payloads, compact_file):
+    compact = load_compact_model(compact_file)
+    X = preprocess_and_align_data(pd.DataFrame(payloads), assets["training_cols"]).astype(np.float32)
+    expected = assets["model"].predict_proba(X)
+    got = compact.predict_proba(X[compact.feature_names].to_numpy(dtype=np.float32))
+    assert np.abs(got - expected).max() < PARITY_TOLERANCE
+    assert (got.argmax(axis=1) == expected.argmax(axis=1)).all()
+
+
+def test_compact_assets_score_like_xgboost_assets(assets, payloads, compact_file):
+    compact_assets = load_compact_assets(compact_file)
+    assert compact_assets["training_cols"] == list(assets["training_cols"])
+    assert compact_assets["version"] != assets["version"]
+
+    xgb_results = predict_batch(payloads, assets)
+    compact_results = predict_batch(payloads, compact_assets)
+    assert [r["status"] for r in compact_results] == [r["status"] for r in xgb_results]
+    for a, b in zip(compact_results, xgb_results):
+        assert a["confidence_scores"] == pytest.approx(b["confidence_scores"], abs=1e-4)
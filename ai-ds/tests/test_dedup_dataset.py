@@ -0,0 +1,46 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import dedup_dataset
+from dedup_dataset import canonical_features, deduplicate, quantize, row_hashes
+
+DATASET = Path(dedup_dataset.__file__).with_name("cat_health_dataset_supplemented.csv")
+
+
+def _with_duplicates(tmp_path):
+    df = pd.read_csv(DATASET)
+    near = df.sample(200, random_state=0).copy()
+    near["temperature"] = (near["temperature"] // 0.2) * 0.2 + 0.05  # same 0.2 °C bucket
+    exact = df.sample(100, random_state=1)
+    path = tmp_path / "input.csv"
+    pd.concat([df, near, exact], ignore_index=True).sample(frac=1, random_state=2).to_csv(path, index=False)
+    return path, len(df)
+
+
+def test_exact_duplicates_removed(tmp_path):
+    path, _ = _with_duplicates(tmp_path)
+    counts = deduplicate(path, tmp_path / "out.csv", chunk_size=300)
+    out = pd.read_csv(tmp_path / "out.csv")
+    assert counts["rows_out"] == len(out)
+    assert counts["exact_duplicates"] >= 100
+    assert not pd.Series(row_hashes(canonical_features(out).assign(label=out["health_status"]))).duplicated().any()
+
+
+def test_split_never_puts_a_bucket_on_both_sides(tmp_path):
+    path, _ = _with_duplicates(tmp_path)
+    counts = deduplicate(path, tmp_path / "train.csv", near=True, test_output=tmp_path / "test.csv",
+                         test_size=0.3, chunk_size=250)
+    train, test = pd.read_csv(tmp_path / "train.csv"), pd.read_csv(tmp_path / "test.csv")
+    assert (len(train), len(test)) == (counts["rows_train"], counts["rows_test"])
+    assert 0.15 < len(test) / (len(train) + len(test)) < 0.45
+
+    def buckets(df):
+        return set(row_hashes(quantize(canonical_features(df))).tolist())
+
+    assert not buckets(train) & buckets(test)
+    # Within each side, near-duplicates (same bucket and label) are gone
+    for side in (train, test):
+        keys = np.column_stack([row_hashes(quantize(canonical_features(side))), row_hashes(side[["health_status"]])])
+        assert not pd.DataFrame(keys).duplicated().any()
@@ -0,0 +1,48 @@
+from pathlib import Path
+
+import pandas as pd
+
+import feature_cache
+
+
+def _build(calls):
+    def build():
+        calls.append(1)
+        return pd.DataFrame({"a": [1.0, 2.0], "b": [True, False]}), ["Healthy", "At Risk"]
+    return build
+
+
+def test_editing_an_encoder_constant_misses(tmp_path, monkeypatch):
+    script = tmp_path / "train_model.py"
+    script.write_text((Path(feature_cache.__file__).with_name("train_model.py")).read_text())
+    data = tmp_path / "data.csv"
+    data.write_text("a,b\n1,True\n2,False\n")
+    monkeypatch.setattr(feature_cache, "TRAIN_SCRIPT", script)
+    monkeypatch.setenv(feature_cache.CACHE_DIR_ENV, str(tmp_path / "cache"))
+    calls = []
+
+    _, _, hit = feature_cache.load_or_build(data, _build(calls))
+    assert not hit
+    X, y, hit = feature_cache.load_or_build(data, _build(calls))
+    assert hit and len(calls) == 1
+    assert X["a"].tolist() == [1.0, 2.0] and list(y) == ["Healthy", "At Risk"]
+
+    source = script.read_text()
+    assert "BOOLEAN_COLS = ['vomiting'" in source
+    script.write_text(source.replace("BOOLEAN_COLS = ['vomiting'", "BOOLEAN_COLS = ['sneezing', 'vomiting'"))
+    _, _, hit = feature_cache.load_or_build(data, _build(calls))
+    assert not hit and len(calls) == 2
+    # The stale entry for the same file is pruned
+    assert len(list((tmp_path / "cache").glob("*/meta.json"))) == 1
+
+
+def test_editing_the_csv_misses(tmp_path, monkeypatch):
+    data = tmp_path / "data.csv"
+    data.write_text("a,b\n1,True\n2,False\n")
+    monkeypatch.setenv(feature_cache.CACHE_DIR_ENV, str(tmp_path / "cache"))
+    calls = []
+
+    feature_cache.load_or_build(data, _build(calls))
+    data.write_text("a,b\n1,True\n3,False\n")
+    _, _, hit = feature_cache.load_or_build(data, _build(calls))
+    assert not hit and len(calls) == 2
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from feature_store import DAY_SECONDS, FeatureStore, PetState
+
+START = 1_767_225_600  # 2026-01-01 UTC
+
+
+def _doc(rid, pet_id, day, weight, vomiting=False):
+    doc = {
+        "pet_id": pet_id,
+        "visitDate": {"$date": f"2026-01-{day + 1:02d}T00:00:00Z"},
+        "vitals": {"weight": {"value": weight}, "temperature": {"value": 38.5 + day / 100}},
+        "behavior": {"vomiting": vomiting},
+    }
+    if rid is not None:
+        doc["_id"] = rid
+    return doc
+
+
+def _export(path, docs):
+    path.write_text("".join(json.dumps(d) + "\n" for d in docs))
+    return path
+
+
+def _in_order(docs):
+    state = PetState()
+    for d in sorted(docs, key=lambda d: d["visitDate"]["$date"]):
+        day = int(d["visitDate"]["$date"][8:10]) - 1
+        state.update({"weight_kg": d["vitals"]["weight"]["value"],
+                      "temperature": d["vitals"]["temperature"]["value"],
+                      "vomiting": d["behavior"]["vomiting"]}, START + day * DAY_SECONDS)
+    return state.features(now=START + 30 * DAY_SECONDS)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FeatureStore(tmp_path / "features.sqlite")
+    yield store
+    store.close()
+
+
+def test_backfill_applies_visits_in_time_order(tmp_path, store):
+    docs = [_doc("r3", "p1", 20, 6.0, True), _doc("r1", "p1", 0, 4.0), _doc("r2", "p1", 10, 5.0)]
+    store.ingest(_export(tmp_path / "export.jsonl", docs), replace=True)
+    features = store.lookup("p1", now=START + 30 * DAY_SECONDS)
+    assert features == _in_order(docs)
+    assert features["weight_kg_trend_per_30d"] == pytest.approx(3.0)
+    assert features["weight_kg_last"] == 6.0
+
+
+def test_reingesting_overlapping_exports_counts_visits_once(tmp_path, store):
+    first = [_doc("r1", "p1", 0, 4.0), _doc("r2", "p1", 10, 5.0), _doc("r9", "p2", 3, 3.0)]
+    store.ingest(_export(tmp_path / "a.jsonl", first), replace=True)
+
+    overlap = first[1:] + [_doc("r3", "p1", 20, 6.0)]
+    summary = store.ingest(_export(tmp_path / "b.jsonl", overlap))
+    assert summary["records_already_ingested"] == 2 and summary["pets_updated"] == 1
+    assert store.ingest(tmp_path / "b.jsonl")["pets_updated"] == 0
+
+    expected = first + overlap[-1:]
+    assert store.lookup("p1", now=START + 30 * DAY_SECONDS) == _in_order([d for d in expected if d["pet_id"] == "p1"])
+    assert store.lookup("p2")["visits"] == 1
+
+
+def test_records_without_ids_use_the_high_water_mark(tmp_path, store):
+    docs = [_doc(None, "p1", 0, 4.0), _doc(None, "p1", 10, 5.0)]
+    store.ingest(_export(tmp_path / "a.jsonl", docs))
+    summary = store.ingest(_export(tmp_path / "b.jsonl", docs + [_doc(None, "p1", 20, 6.0)]))
+    assert summary["records_already_ingested"] == 2
+    assert store.lookup("p1")["visits"] == 3
+
+
+def test_late_visits_are_left_for_a_backfill(tmp_path, store):
+    store.ingest(_export(tmp_path / "a.jsonl", [_doc("r1", "p1", 0, 4.0), _doc("r3", "p1", 20, 6.0)]))
+    summary = store.ingest(_export(tmp_path / "b.jsonl", [_doc("r2", "p1", 10, 5.0)]))
+    assert summary["records_out_of_order"] == 1
+    assert store.lookup("p1")["visits"] == 2
+
+    all_docs = [_doc("r1", "p1", 0, 4.0), _doc("r3", "p1", 20, 6.0), _doc("r2", "p1", 10, 5.0)]
+    store.ingest(_export(tmp_path / "all.jsonl", all_docs), replace=True)
+    assert store.lookup("p1", now=START + 30 * DAY_SECONDS) == _in_order(all_docs)
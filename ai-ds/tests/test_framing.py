@@ -0,0 +1,113 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import framing
+from ml_inference import (DIAGNOSIS_TABLE, PREDICTION_CACHE_ENV, TREATMENT_TABLE, load_compact_assets,
+                          load_model_assets, predict_batch, predict_probs, preprocess_and_align_data, serve_binary)
+from model_registry import build_default_registry
+
+
+@pytest.fixture(autouse=True)
+def no_prediction_cache(monkeypatch):
+    monkeypatch.delenv(PREDICTION_CACHE_ENV, raising=False)
+
+
+def _frames(*messages):
+    stream = io.BytesIO()
+    for parts in messages:
+        framing.write_frame(stream, *parts)
+    stream.seek(0)
+    return stream
+
+
+def _responses(stream):
+    stream.seek(0)
+    responses = []
+    while (body := framing.read_frame(stream)) is not None:
+        responses.append(body)
+    return responses
+
+
+def test_request_round_trip():
+    features = np.arange(12, dtype=np.float32).reshape(3, 4) / 7
+    body = b"".join(bytes(p) for p in framing.encode_score_request(features, "cat", documentation=True))
+    msg_type, flags, key, decoded = framing.decode_request(body)
+    assert (msg_type, key) == (framing.MSG_SCORE, "cat")
+    assert flags & framing.FLAG_DOCUMENTATION
+    np.testing.assert_array_equal(decoded, features)
+
+    # A single row is sent as a one-row block
+    _, flags, key, decoded = framing.decode_request(
+        b"".join(bytes(p) for p in framing.encode_score_request(features[0], documentation=False)))
+    assert (flags, key, decoded.shape) == (0, "", (1, 4))
+
+    msg_type, _, key, decoded = framing.decode_request(b"".join(framing.encode_layout_request("cat")))
+    assert (msg_type, key, decoded) == (framing.MSG_LAYOUT, "cat", None)
+
+
+def test_response_round_trip():
+    probs = np.array([[0.1, 0.2, 0.7], [0.5, 0.25, 0.25]], dtype=np.float32)
+    body = b"".join(bytes(p) for p in framing.encode_score_response(probs, [3, 0], [1, 2]))
+    result = framing.decode_response(body)
+    np.testing.assert_array_equal(result["probs"], probs)
+    assert result["diagnosis_idx"].tolist() == [3, 0] and result["template_idx"].tolist() == [1, 2]
+
+    result = framing.decode_response(b"".join(bytes(p) for p in framing.encode_score_response(probs)))
+    assert result["diagnosis_idx"] is None and result["template_idx"] is None
+
+    with pytest.raises(RuntimeError, match="boom"):
+        framing.decode_response(b"".join(framing.encode_json_response(framing.MSG_SCORE, {"error": "boom"}, True)))
+
+
+def test_malformed_frames_are_rejected():
+    with pytest.raises(framing.FrameError, match="magic"):
+        framing.decode_request(b"XXXX" + bytes(framing.HEADER.size))
+    header, key, features = framing.encode_score_request(np.zeros((2, 3)))
+    with pytest.raises(framing.FrameError, match="feature bytes"):
+        framing.decode_request(header + key + bytes(features)[:-4])
+    with pytest.raises(framing.FrameError, match="truncated"):
+        framing.read_frame(io.BytesIO(framing.LENGTH.pack(10) + b"short"))
+
+
+def test_serve_binary_matches_json_path(assets, payloads):
+    registry = build_default_registry(load_model_assets, load_compact_assets)
+    features = preprocess_and_align_data(payloads, assets["training_cols"]).to_numpy(dtype=np.float32)
+    out = io.BytesIO()
+    serve_binary(registry, _frames(framing.encode_layout_request(), framing.encode_score_request(features),
+                                   framing.encode_score_request(features[:, :-1])), out)
+    layout, scores, error = _responses(out)
+
+    layout = framing.decode_response(layout)
+    assert layout["training_cols"] == list(assets["training_cols"])
+    assert layout["classes"] == list(assets["classes"])
+
+    scores = framing.decode_response(scores)
+    expected = predict_probs(pd.DataFrame(features, columns=assets["training_cols"]), assets)
+    np.testing.assert_allclose(scores["probs"], expected, rtol=1e-6)
+    json_results = predict_batch(payloads, assets)
+    assert [assets["classes"][i] for i in scores["probs"].argmax(axis=1)] == [r["status"] for r in json_results]
+    assert DIAGNOSIS_TABLE[scores["diagnosis_idx"]].tolist() == [r["diagnosis_text"] for r in json_results]
+    assert TREATMENT_TABLE[scores["template_idx"]].tolist() == [r["treatment_text"] for r in json_results]
+
+    with pytest.raises(RuntimeError, match="features per row"):
+        framing.decode_response(error)
+
+
+def test_binary_worker_subprocess(assets, payloads):
+    env = {k: v for k, v in os.environ.items() if k != PREDICTION_CACHE_ENV}
+    worker = framing.BinaryWorker(env=env)
+    try:
+        training_cols = worker.layout()["training_cols"]
+        features = preprocess_and_align_data(payloads[:10], training_cols).to_numpy(dtype=np.float32)
+        result = worker.score(features, documentation=False)
+        assert result["probs"].shape == (10, len(assets["classes"]))
+        assert result["diagnosis_idx"] is None
+        assert [assets["classes"][i] for i in result["probs"].argmax(axis=1)] == [
+            r["status"] for r in predict_batch(payloads[:10], assets)]
+    finally:
+        worker.close()
+    assert worker.proc.returncode == 0
@@ -0,0 +1,48 @@
+import pytest
+
+from synthetic import load_generator
+
+
+@pytest.fixture(scope="module")
+def generator():
+    return load_generator()
+
+
+def test_quota_counts_are_exact(generator):
+    quotas = {"Healthy": 120, "At Risk": 90, "Unhealthy": 60}
+    df, stats = generator.generate_quota_dataset(quotas, seed=11)
+    assert df["health_status"].value_counts().to_dict() == quotas
+    assert stats["accepted"] == len(df) == sum(quotas.values())
+    # Stored labels agree with the scoring rules
+    labels = generator.health_status_from_scores(generator.calculate_health_scores(df))
+    assert list(labels) == df["health_status"].tolist()
+
+
+def test_quota_seed_is_reproducible(generator):
+    quotas = {"Healthy": 20, "Unhealthy": 10}
+    a, _ = generator.generate_quota_dataset(quotas, seed=5)
+    b, _ = generator.generate_quota_dataset(quotas, seed=5)
+    assert a.equals(b)
+    assert a["health_status"].value_counts().to_dict() == quotas
+
+
+def test_scalar_and_vectorized_labels_agree(generator):
+    df = generator.generate_cat_health_dataset(200, 20)
+    assert [generator.calculate_health_status(row) for row in df.to_dict("records")] == df["health_status"].tolist()
+
+
+@pytest.mark.parametrize("category", ["Healthy", "At Risk", "Unhealthy"])
+def test_vectorized_records_match_generate_record(generator, category):
+    batch = generator.generate_records(category, 500)
+    single = generator.generate_record(predefined_category=category)
+    assert list(batch.columns) == list(single)
+    assert len(batch) == 500 and (batch["health_status"] == category).all()
+    assert batch["temperature"].between(generator.ABS_MIN_TEMP, generator.ABS_MAX_TEMP).all()
+    assert batch["heart_rate"].between(generator.ABS_MIN_HR, generator.ABS_MAX_HR).all()
+    assert set(batch["hydration_status"]) <= set(generator.HYDRATION_PENALTY)
+    assert all(len(set(a)) == len(a) <= 2 for a in batch["allergies"])
+    assert all(isinstance(v["status"], str) for row in batch["vaccinations"] for v in row)
+    # Biased batches land on their category at roughly generate_record's rates
+    labels = generator.health_status_from_scores(generator.calculate_health_scores(batch))
+    target_share = (labels == category).mean()
+    assert target_share > {"Healthy": 0.7, "At Risk": 0.1, "Unhealthy": 0.9}[category]
@@ -0,0 +1,54 @@
+import itertools
+
+import pandas as pd
+import pytest
+
+from input_schema import LIST_FIELDS
+from ml_inference import (PREDICTION_CACHE_ENV, generate_documentation, generate_documentation_batch,
+                          predict_batch, predict_single)
+
+
+@pytest.fixture(autouse=True)
+def no_prediction_cache(monkeypatch):
+    monkeypatch.delenv(PREDICTION_CACHE_ENV, raising=False)
+
+
+def test_record_without_list_fields_scores_like_empty_lists(assets, payloads):
+    bare = {k: v for k, v in payloads[0].items() if k not in LIST_FIELDS}
+    empty = {**bare, **{field: [] for field in LIST_FIELDS}}
+    assert not assets["schema"].validate_record(bare)
+
+    single = predict_single(bare, assets)
+    assert single["success"], single
+    assert single["confidence_scores"] == predict_single(empty, assets)["confidence_scores"]
+
+    batch = predict_batch([bare, payloads[1]], assets)
+    assert [r["success"] for r in batch] == [True, True]
+    assert batch[0]["confidence_scores"] == pytest.approx(single["confidence_scores"])
+    # Only some records of a batch lacking the fields
+    assert predict_batch([payloads[1], bare], assets)[1]["confidence_scores"] == pytest.approx(
+        single["confidence_scores"])
+
+
+
+@pytest.mark.parametrize("status", ["Healthy", "At Risk", "Unhealthy"])
+def test_documentation_batch_matches_per_record(status):
+    # Every symptom-flag combination, with flags given as bools, 0/1 or left out
+    records = []
+    for vomiting, energy, membrane in itertools.product(
+            [True, False, 1, 0, None], ["lethargic", "normal", None], ["pale", "pink", None]):
+        record = {"vomiting": vomiting, "energy_level": energy, "mucous_membrane_color": membrane}
+        records.append({k: v for k, v in record.items() if v is not None})
+    statuses = [status] * len(records)
+
+    batch = generate_documentation_batch(statuses, pd.DataFrame(records))
+    for i, record in enumerate(records):
+        expected = generate_documentation(status, record)
+        assert (batch[0][i], batch[1][i], batch[2][i]) == expected, record
+
+
+def test_documentation_batch_mixed_statuses_and_absent_columns():
+    statuses = ["Unhealthy", "Healthy", "At Risk", "Unhealthy"]
+    batch = generate_documentation_batch(statuses, pd.DataFrame(index=range(4)))
+    for i, status in enumerate(statuses):
+        assert (batch[0][i], batch[1][i], batch[2][i]) == generate_documentation(status, {})
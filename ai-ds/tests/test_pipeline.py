@@ -0,0 +1,126 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import pipeline
+from pipeline import Stage, needed_stages, run_pipeline
+
+calls = []
+
+
+def count_lines(stage, log):
+    """Writes the number of lines of its input (so some input edits reproduce the same output)."""
+    calls.append(stage.name)
+    lines = stage.inputs[0].read_text().splitlines()
+    if "boom" in lines:
+        raise ValueError("boom")
+    stage.outputs[0].write_text(f"{len(lines)}\n")
+
+
+def concatenate(stage, log):
+    calls.append(stage.name)
+    if any("fail" in p.read_text() for p in stage.inputs):
+        raise ValueError("bad input")
+    stage.outputs[0].write_text("".join(p.read_text() for p in stage.inputs))
+
+
+@pytest.fixture
+def build(tmp_path, monkeypatch):
+    build_dir = tmp_path / "build"
+    monkeypatch.setattr(pipeline, "BUILD_DIR", build_dir)
+    monkeypatch.setattr(pipeline, "STATE_FILE", build_dir / "pipeline_state.json")
+    monkeypatch.setattr(pipeline, "REPORT_FILE", build_dir / "pipeline_report.json")
+    monkeypatch.setattr(pipeline, "LOG_DIR", build_dir / "logs")
+    calls.clear()
+    return tmp_path
+
+
+def _stages(root):
+    source, code = root / "source.txt", root / "helper.py"
+    if not source.exists():
+        source.write_text("a\nb\n")
+        code.write_text("VERSION = 1\n")
+    out = root / "build"
+    return [
+        Stage("count", function=count_lines, code=[code], inputs=[source], outputs=[out / "count.txt"]),
+        Stage("copy", deps=["count"], function=concatenate, inputs=[out / "count.txt"], outputs=[out / "copy.txt"]),
+        Stage("final", deps=["count", "copy"], function=concatenate,
+              inputs=[out / "copy.txt", source], outputs=[out / "final.txt"]),
+    ]
+
+
+def _run(root, **kwargs):
+    calls.clear()
+    report = run_pipeline(_stages(root), jobs=2, **kwargs)
+    return {name: s["status"] for name, s in report["stages"].items()}
+
+
+def test_second_run_is_fresh(build):
+    assert _run(build) == {"count": "ran", "copy": "ran", "final": "ran"}
+    assert _run(build) == {"count": "fresh", "copy": "fresh", "final": "fresh"}
+    assert calls == []
+
+
+def test_unchanged_output_keeps_later_stages_fresh(build):
+    _run(build)
+    # Same number of lines: count re-runs but reproduces its output, so copy stays fresh
+    (build / "source.txt").write_text("x\ny\n")
+    assert _run(build) == {"count": "ran", "copy": "fresh", "final": "ran"}
+    (build / "source.txt").write_text("x\ny\nz\n")
+    assert _run(build) == {"count": "ran", "copy": "ran", "final": "ran"}
+
+
+def test_code_change_and_edited_output_rerun_the_stage(build):
+    _run(build)
+    (build / "helper.py").write_text("VERSION = 2\n")
+    assert _run(build) == {"count": "ran", "copy": "fresh", "final": "fresh"}
+
+    (build / "build" / "copy.txt").write_text("edited\n")
+    assert _run(build) == {"count": "fresh", "copy": "ran", "final": "fresh"}
+    (build / "build" / "final.txt").unlink()
+    assert _run(build) == {"count": "fresh", "copy": "fresh", "final": "ran"}
+
+
+def test_failure_skips_dependents_and_is_retried(build):
+    (build / "source.txt").write_text("fail\n")
+    (build / "helper.py").write_text("")
+    assert _run(build) == {"count": "ran", "copy": "ran", "final": "failed"}
+    assert "ValueError: bad input" in (build / "build" / "logs" / "final.log").read_text()
+    assert _run(build) == {"count": "fresh", "copy": "fresh", "final": "failed"}
+
+    (build / "source.txt").write_text("ok\n")
+    assert _run(build) == {"count": "ran", "copy": "fresh", "final": "ran"}
+
+    (build / "source.txt").write_text("boom\n")
+    assert _run(build) == {"count": "failed", "copy": "skipped", "final": "skipped"}
+    assert calls == ["count"]
+
+
+def test_dry_run_and_force(build):
+    assert _run(build, dry_run=True) == {"count": "stale", "copy": "stale", "final": "stale"}
+    assert calls == [] and not pipeline.STATE_FILE.exists()
+
+    _run(build)
+    (build / "source.txt").write_text("a\nb\nc\n")
+    assert _run(build, dry_run=True) == {"count": "stale", "copy": "stale", "final": "stale"}
+    assert _run(build) == {"count": "ran", "copy": "ran", "final": "ran"}
+    assert _run(build, force={"copy"}) == {"count": "fresh", "copy": "ran", "final": "fresh"}
+
+
+def test_needed_stages_follows_dependencies(build):
+    stages = _stages(build)
+    assert [s.name for s in needed_stages(stages, ["copy"])] == ["count", "copy"]
+    assert [s.name for s in needed_stages(stages, [])] == ["count", "copy", "final"]
+    with pytest.raises(SystemExit, match="Unknown stage"):
+        needed_stages(stages, ["deploy"])
+
+
+def test_default_stages_form_a_dag():
+    stages = pipeline.build_stages()
+    names = [s.name for s in stages]
+    for stage in stages:
+        # Every dependency is declared earlier, so the DAG has no cycles or dangling names
+        assert all(names.index(d) < names.index(stage.name) for d in stage.deps)
+    assert all(path.exists() for stage in stages for path in stage.code)
@@ -0,0 +1,38 @@
+import pickle
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from ml_inference import MODEL_FILE, DATASET_FILE, load_model_assets
+from prediction_cache import PredictionCache
+
+
+def _rows(columns, n=5):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(rng.integers(0, 3, size=(n, len(columns))).astype(float), columns=columns)
+
+
+def test_replacing_the_model_file_misses(tmp_path):
+    model_file = tmp_path / "cat_model.pkl"
+    shutil.copy(MODEL_FILE, model_file)
+    cache = PredictionCache(tmp_path / "cache.sqlite")
+
+    assets = load_model_assets(model_file, DATASET_FILE)
+    X = _rows(assets["training_cols"])
+    first = cache.predict_proba(assets["model"], X, assets["version"])
+    second = cache.predict_proba(assets["model"], X, assets["version"])
+    assert (cache.misses, cache.hits) == (len(X), len(X))
+    np.testing.assert_array_equal(first, second)
+
+    # Same file name, different model
+    model = assets["model"]
+    model.set_params(n_estimators=model.get_params()["n_estimators"] + 1)
+    model_file.write_bytes(pickle.dumps(model))
+    swapped = load_model_assets(model_file, DATASET_FILE)
+    assert swapped["version"] != assets["version"]
+    assert swapped["version"].startswith("cat_model-")
+
+    cache.predict_proba(swapped["model"], X, swapped["version"])
+    assert (cache.misses, cache.hits) == (2 * len(X), len(X))
+    cache.close()
@@ -0,0 +1,70 @@
+import numpy as np
+
+from prediction_log import PredictionLogWriter, PredictionLogSpool, iter_records, log_files
+
+COLUMNS = ["age_in_months", "temperature", "breed_Persian"]
+CLASSES = ["At Risk", "Healthy", "Unhealthy"]
+
+
+def _batches(n):
+    rng = np.random.default_rng(1)
+    return [(rng.random((i + 1, len(COLUMNS))).astype(np.float32),
+             rng.dirichlet(np.ones(len(CLASSES)), i + 1).astype(np.float32)) for i in range(n)]
+
+
+def _write(writer, batches):
+    for i, (X, probs) in enumerate(batches):
+        writer.log(f"v{i % 2}", COLUMNS, CLASSES, X, probs, {"preprocess_ms": 1.5, "predict_ms": 2.5})
+    writer.close()
+
+
+def test_background_writer_round_trip(tmp_path):
+    batches = _batches(5)
+    writer = PredictionLogWriter(tmp_path)
+    _write(writer, batches)
+    assert writer.stats()["written"] == 5 and writer.stats()["errors"] == 0
+
+    records = list(iter_records(tmp_path))
+    assert len(records) == 5
+    for i, (record, (X, probs)) in enumerate(zip(records, batches)):
+        assert record["version"] == f"v{i % 2}"
+        assert record["columns"] == COLUMNS and record["classes"] == CLASSES
+        assert (record["preprocess_ms"], record["predict_ms"]) == (1.5, 2.5)
+        np.testing.assert_array_equal(record["features"], X)
+        np.testing.assert_array_equal(record["probs"], probs)
+
+
+def test_spool_round_trip(tmp_path):
+    batches = _batches(3)
+    spool = PredictionLogSpool(tmp_path)
+    spool.log("v0", COLUMNS, CLASSES, *batches[0], {})
+    # Nothing touches the disk until close() (after the response)
+    assert list(iter_records(tmp_path)) == [] and spool.stats()["queued"] == 1
+    _write(spool, batches[1:])
+    assert spool.stats()["written"] == 3
+    records = list(iter_records(tmp_path))
+    assert [len(r["features"]) for r in records] == [1, 2, 3]
+    assert all(r["columns"] == COLUMNS for r in records)
+
+
+def test_resume_from_offsets(tmp_path):
+    batches = _batches(6)
+    _write(PredictionLogWriter(tmp_path), batches)
+    first = list(iter_records(tmp_path))
+    stop = first[2]
+
+    resumed = list(iter_records(tmp_path, {stop["file"]: stop["end_offset"]}))
+    assert len(resumed) == 3
+    # Schemas written before the offset still resolve
+    assert all(r["columns"] == COLUMNS for r in resumed)
+    for record, (X, _) in zip(resumed, batches[3:]):
+        np.testing.assert_array_equal(record["features"], X)
+    assert list(iter_records(tmp_path, {stop["file"]: first[-1]["end_offset"]})) == []
+
+
+def test_truncated_last_record_is_skipped(tmp_path):
+    _write(PredictionLogWriter(tmp_path), _batches(3))
+    (file,) = log_files(tmp_path)
+    data = file.read_bytes()
+    file.write_bytes(data[:-7])
+    assert len(list(iter_records(tmp_path))) == 2
@@ -0,0 +1,21 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import train_model
+from train_model import FILE_PATH, encode_dataset, encode_dataset_low_memory
+
+DATASET = Path(train_model.__file__).parent / FILE_PATH
+
+
+@pytest.mark.parametrize("chunk_size", [100, 100_000])
+def test_low_memory_encoding_matches_encode_dataset(chunk_size):
+    X, y = encode_dataset(pd.read_csv(DATASET))
+    X_low, y_low = encode_dataset_low_memory(DATASET, chunk_size)
+
+    assert list(X_low.columns) == list(X.columns)
+    # Numerics are downcast to float32, which is also the precision XGBoost trains at
+    np.testing.assert_array_equal(X_low.to_numpy(dtype=np.float32), X.to_numpy(dtype=np.float32))
+    assert list(y_low) == y.tolist()
@@ -0,0 +1,45 @@
+import pytest
+
+from ml_inference import PREDICTION_CACHE_ENV, predict_single, what_if
+from model_registry import ModelRegistry
+
+
+@pytest.fixture
+def registry(assets, monkeypatch):
+    monkeypatch.delenv(PREDICTION_CACHE_ENV, raising=False)
+    registry = ModelRegistry()
+    registry.register("cat", lambda: assets)
+    return registry
+
+
+SWEEPS = [
+    {"feature": "temperature", "start": 36.5, "stop": 41.0, "steps": 10},
+    {"feature": "hydration_status"},
+    {"feature": "vomiting"},
+    {"feature": "breed", "values": ["Persian", "Siamese", "Unlisted Breed"]},
+]
+
+
+def test_variants_match_single_predictions(registry, assets, payloads):
+    for record in payloads[:3]:
+        out = what_if({"record": record, "sweeps": SWEEPS}, registry)
+        assert out["success"], out
+        baseline = predict_single(record, assets)
+        assert out["baseline"]["status"] == baseline["status"]
+        for curve in out["curves"]:
+            for i, value in enumerate(curve["values"]):
+                single = predict_single({**record, curve["feature"]: value}, assets)
+                assert curve["status"][i] == single["status"]
+                for c in assets["classes"]:
+                    assert curve["probabilities"][c][i] == pytest.approx(single["confidence_scores"][c], abs=1e-6)
+
+
+@pytest.mark.parametrize("sweep", [
+    {"feature": "vomiting", "values": ["false"]},
+    {"feature": "vomiting", "values": [2]},
+    {"feature": "temperature", "start": 37, "stop": 40, "steps": 0},
+    {"feature": "hydration_status", "values": ["soaked"]},
+])
+def test_invalid_sweeps_are_rejected(registry, payloads, sweep):
+    out = what_if({"record": payloads[0], "sweeps": [sweep]}, registry)
+    assert not out["success"] and out["error"]
@@ -0,0 +1,85 @@
+import queue
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+import worker_pool
+from worker_pool import PriorityPool, _combine
+
+
+def _done(result=None, error=None):
+    f = Future()
+    f.set_running_or_notify_cancel()
+    if error:
+        f.set_exception(error)
+    else:
+        f.set_result(result)
+    return f
+
+
+def test_failed_chunks_give_one_error_per_record():
+    chunks = [[{"i": 0}, {"i": 1}], [{"i": 2}, {"i": 3}, {"i": 4}], [{"i": 5}]]
+    futures = [
+        _done({"success": True, "results": [{"success": True, "status": "Healthy"}] * 2}),
+        _done({"success": False, "error": "worker crashed"}),
+        _done(error=RuntimeError("broken pipe")),
+    ]
+    out = _combine(futures, chunks).result()
+
+    assert not out["success"]
+    assert len(out["results"]) == 6
+    assert [r["success"] for r in out["results"]] == [True, True, False, False, False, False]
+    assert [r["error"] for r in out["results"][2:]] == ["worker crashed"] * 3 + ["broken pipe"]
+
+
+class FakeWorker:
+    """Stands in for a --serve worker: echoes each record's index, waiting on `gate` first."""
+
+    gate = None
+
+    def __init__(self, env=None):
+        pass
+
+    def request(self, payload):
+        if FakeWorker.gate is not None:
+            FakeWorker.gate.wait(10)
+        return {"success": True, "results": [{"success": True, "i": r["i"]} for r in payload]}
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_workers(monkeypatch):
+    monkeypatch.setattr(worker_pool, "ServeWorker", FakeWorker)
+    FakeWorker.gate = threading.Event()
+    yield FakeWorker.gate
+    FakeWorker.gate.set()
+
+
+def test_batch_larger_than_the_queue_is_admitted(fake_workers):
+    fake_workers.set()
+    pool = PriorityPool(2, queue_sizes={"urgent": 4, "interactive": 4, "batch": 2}, chunk_records=10)
+    try:
+        batch = [{"i": i} for i in range(1000)]  # 100 chunks, queue holds 2 requests
+        out = pool.request(batch, "batch")
+        assert [r["i"] for r in out["results"]] == list(range(1000))
+    finally:
+        pool.close()
+
+
+def test_queue_bound_counts_requests(fake_workers):
+    pool = PriorityPool(2, queue_sizes={"urgent": 4, "interactive": 4, "batch": 2}, chunk_records=10)
+    try:
+        batches = [[{"i": i} for i in range(100)] for _ in range(2)]
+        futures = [pool.submit(b, "batch") for b in batches]
+        with pytest.raises(queue.Full):
+            pool.submit(batches[0], "batch")
+        assert pool.stats()["batch"]["queued"] == 2
+        fake_workers.set()
+        assert all(len(f.result(10)["results"]) == 100 for f in futures)
+        assert pool.stats()["batch"]["queued"] == 0
+        pool.submit(batches[0], "batch").result(10)
+    finally:
+        pool.close()